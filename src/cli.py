@@ -0,0 +1,291 @@
+"""Non-interactive entry point for cron jobs and batch pipelines.
+
+    python -m src.cli [--db PATH] <command> [options]
+
+Every command calls the service layer directly and writes one JSON object per
+line to stdout (JSON Lines); problems go to stderr and make the exit status 1.
+Services are imported inside each command so startup only pays for what the
+command uses.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+from src.repositories import db
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+
+
+def _emit(obj: dict[str, Any]) -> None:
+    sys.stdout.write(_dumps(obj) + "\n")
+
+
+def _fail(message: str) -> None:
+    print(f"error: {message}", file=sys.stderr)
+
+
+def _class_ids(args: argparse.Namespace) -> list[int]:
+    """Classes named on the command line, or every class (of --lecturer) with --all."""
+    if args.class_ids:
+        return args.class_ids
+    if not (args.all or args.lecturer is not None):
+        raise ValueError("give class ids, --all or --lecturer")
+    from src.repositories.class_repo import ClassRepo
+
+    return [c.class_id for c in ClassRepo().list_by_filter(lecturer_id=args.lecturer)]
+
+
+# ---- commands ------------------------------------------------------------
+
+def cmd_summarize(args: argparse.Namespace) -> int:
+    from src.services.report_service import SUMMARY_KEYS, ReportService
+    from src.utils.validators import validate_date_range
+
+    validate_date_range(args.date_from, args.date_to)
+    service = ReportService()
+    for class_id in _class_ids(args):
+        for row in service.iter_summary_rows(class_id, args.date_from, args.date_to):
+            _emit({"class_id": class_id, **dict(zip(SUMMARY_KEYS, row))})
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from src.services.report_service import ReportService
+
+    service = ReportService()
+    if args.format == "xlsx" and (args.all or args.lecturer is not None) and not args.class_ids:
+        result = service.export_excel_bulk(
+            args.out, lecturer_id=args.lecturer, date_from=args.date_from, date_to=args.date_to,
+            max_workers=args.workers,
+        )
+        for item in result.items:
+            _emit(vars(item))
+        return 1 if result.failed else 0
+
+    status = 0
+    for class_id in _class_ids(args):
+        try:
+            if args.format == "xlsx":
+                path = service.export_excel(class_id, args.out, args.date_from, args.date_to)
+            else:
+                path = service.export_flat(
+                    class_id, args.out, fmt=args.format, dataset=args.dataset, compress=args.gzip,
+                    date_from=args.date_from, date_to=args.date_to,
+                )
+            _emit({"class_id": class_id, "file_path": path})
+        except ValueError as e:
+            _emit({"class_id": class_id, "error": str(e)})
+            status = 1
+    return status
+
+
+def _read_rows(path: Path) -> Iterator[dict[str, Any]]:
+    """Rows of a CSV or JSON Lines file (optionally .gz), keys normalised to snake_case.
+
+    Accepts both the detail export headers ("Session ID") and the JSON keys ("session_id").
+    """
+    name = path.name.lower()
+    raw = gzip.open(path, "rb") if name.endswith(".gz") else open(path, "rb")
+    with io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as f:
+        if name.removesuffix(".gz").endswith(".jsonl"):
+            records: Iterable[dict[str, Any]] = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        for rec in records:
+            yield {str(k).strip().lower().replace(" ", "_"): v for k, v in rec.items()}
+
+
+def cmd_import(args: argparse.Namespace) -> int:
+    from src.services.admin_service import AdminService
+
+    path = Path(args.file)
+    if not path.exists():
+        raise ValueError(f"file not found: {path}")
+    result = AdminService().import_records(_read_rows(path), actor_id=args.actor)
+    for row_no, message in result.errors:
+        _emit({"row": row_no, "error": message})
+    _emit({"inserted": result.inserted, "updated": result.updated, "unchanged": result.unchanged,
+           "errors": len(result.errors)})
+    return 1 if result.errors else 0
+
+
+def cmd_search(args: argparse.Namespace) -> int:
+    from src.services.admin_service import AdminService
+    from src.utils.validators import validate_date_range
+
+    validate_date_range(args.date_from, args.date_to)
+    for rec in AdminService().search_attendance(
+        student_id=args.student_id, session_id=args.session_id, class_id=args.class_id,
+        date_from=args.date_from, date_to=args.date_to,
+    ):
+        _emit(rec)
+    return 0
+
+
+def cmd_close_expired(args: argparse.Namespace) -> int:
+    from src.services.session_scheduler import SessionExpiryScheduler
+
+    _emit(vars(SessionExpiryScheduler().run_once()))
+    return 0
+
+
+def cmd_warnings(args: argparse.Namespace) -> int:
+    from src.services.warning_service import WarningService
+
+    service = WarningService()
+    if args.class_id is None:
+        result = service.sweep_all()
+    else:
+        service.evaluate_and_generate_for_class(args.class_id)
+        if service.last_result is None:
+            raise ValueError(f"class {args.class_id} not found")
+        result = service.last_result
+    _emit(vars(result))
+    return 0
+
+
+def cmd_maintenance(args: argparse.Namespace) -> int:
+    from src.services.maintenance_service import MaintenanceService
+
+    service = MaintenanceService()
+    if args.enable_incremental_vacuum:
+        _emit({"enable_incremental_vacuum": service.enable_incremental_vacuum()})
+    if args.rebuild_rollups:
+        _emit({"rebuild_rollups": service.rebuild_rollups()})
+    if args.verify_rollups:
+        check = service.verify_rollups()
+        _emit({"verify_rollups": {**vars(check), "ok": check.ok}})
+        if not check.ok:
+            return 1
+    report = service.run(
+        full_analyze=args.analyze, force_checkpoint=args.checkpoint, backup_dir=args.backup,
+    )
+    _emit(vars(report))
+    return 0
+
+
+# ---- argument parsing ----------------------------------------------------
+
+def _add_class_selection(p: argparse.ArgumentParser) -> None:
+    p.add_argument("class_ids", nargs="*", type=int, metavar="CLASS_ID")
+    p.add_argument("--all", action="store_true", help="every class")
+    p.add_argument("--lecturer", type=int, metavar="USER_ID", help="every class of this lecturer")
+
+
+def _add_date_range(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD")
+    p.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD")
+
+
+def _wants(argv: Sequence[str], prefixes: tuple[str, ...]) -> bool:
+    return any(a.startswith(prefixes) for a in argv)
+
+
+def build_parser(argv: Sequence[str] = ()) -> argparse.ArgumentParser:
+    """The --profile/--metrics options (and their modules) are only added when `argv` uses them, or asks for help."""
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="SAS batch commands (JSON Lines on stdout)")
+    parser.add_argument("--db", help="database path (default: data/sas.db)")
+    parser.set_defaults(profile=False, cprofile=None, metrics_port=None, metrics_file=None)
+    if _wants(argv, ("--profile", "--cprofile", "-h", "--help")):
+        from src.services.profiling import add_profile_arguments
+
+        add_profile_arguments(parser)
+    if _wants(argv, ("--metrics", "-h", "--help")):
+        from src.services.metrics_service import add_metrics_arguments
+
+        add_metrics_arguments(parser)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("summarize", help="per-student attendance totals")
+    _add_class_selection(p)
+    _add_date_range(p)
+    p.set_defaults(func=cmd_summarize)
+
+    p = sub.add_parser("export", help="write report files (one line per file)")
+    _add_class_selection(p)
+    _add_date_range(p)
+    p.add_argument("--out", required=True, help="output folder (or file path for a single class)")
+    p.add_argument("--format", choices=("xlsx", "csv", "jsonl"), default="xlsx")
+    p.add_argument("--dataset", choices=("summary", "detail"), default="summary", help="csv/jsonl only")
+    p.add_argument("--gzip", action="store_true", help="csv/jsonl only")
+    p.add_argument("--workers", type=int, help="processes for xlsx with --all/--lecturer")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="upsert attendance from a detail export (csv/jsonl, .gz ok)")
+    p.add_argument("file")
+    p.add_argument("--actor", type=int, metavar="USER_ID", help="recorded in the audit log")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("search", help="attendance records matching the filters")
+    p.add_argument("--student-id", type=int)
+    p.add_argument("--session-id", type=int)
+    p.add_argument("--class-id", type=int)
+    _add_date_range(p)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("close-expired", help="open scheduled sessions that have started, close sessions past their end time")
+    p.set_defaults(func=cmd_close_expired)
+
+    p = sub.add_parser("warnings", help="generate attendance warnings")
+    p.add_argument("--class-id", type=int, help="only this class (default: whole institution)")
+    p.set_defaults(func=cmd_warnings)
+
+    p = sub.add_parser("maintenance", help="optimize, checkpoint, vacuum, backup, rollup check")
+    p.add_argument("--analyze", action="store_true", help="full ANALYZE instead of PRAGMA optimize")
+    p.add_argument("--checkpoint", action="store_true", help="checkpoint the WAL regardless of its size")
+    p.add_argument("--backup", metavar="DIR", help="write an online backup into DIR")
+    p.add_argument("--verify-rollups", action="store_true", help="compare daily_rollups with the raw records (exit 1 on mismatch)")
+    p.add_argument("--rebuild-rollups", action="store_true", help="recompute daily_rollups from the raw records")
+    p.add_argument("--enable-incremental-vacuum", action="store_true",
+                   help="convert an older database to auto_vacuum=INCREMENTAL (full VACUUM, blocks writers)")
+    p.set_defaults(func=cmd_maintenance)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args = build_parser(argv).parse_args(argv)
+    if args.db:
+        db.DB_PATH = Path(args.db)
+    if not db.DB_PATH.exists():
+        _fail(f"database not found: {db.DB_PATH}")
+        return 1
+
+    func: Callable[[argparse.Namespace], int] = args.func
+    try:
+        if args.profile or args.cprofile:
+            from src.services.profiling import start_from_args
+
+            start_from_args(args)
+        if args.metrics_port is not None or args.metrics_file:
+            from src.services import metrics_service
+
+            metrics_service.start_from_args(args)  # a --metrics-port in use is an OSError
+        return func(args)
+    except ValueError as e:
+        _fail(str(e))
+        return 1
+    except sqlite3.Error as e:  # includes DatabaseBusyError (lock held through every retry)
+        _fail(f"database error: {e}")
+        return 1
+    except BrokenPipeError:
+        # `... | head` closed stdout; not an error for a pipeline
+        import os
+
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except OSError as e:
+        _fail(str(e))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,45 @@
 from __future__ import annotations
 
+import sys
+from typing import Optional
+
 from src.repositories.db import init_db
+from src.services.maintenance_service import MaintenanceScheduler
+from src.services.session_scheduler import SessionExpiryDaemon
 from src.services.auth_service import AuthService
 from src.ui.menus import show_main_menu
 from src.ui.prompts import prompt_choice, prompt_text, prompt_password
 from src.models.enums import Role
-from src.ui.student_handlers import run_student_dashboard
-from src.ui.lecturer_handlers import run_lecturer_dashboard
-from src.ui.admin_handlers import AdminHandlers
 
 
-def run() -> None:
-    """Entry point: init DB -> main menu -> login -> role dashboards."""
+def run(argv: Optional[list[str]] = None) -> None:
+    """Entry point: init DB -> main menu -> login -> role dashboards.
+
+    Role dashboards are imported on first use so a student check-in never pays
+    for the lecturer/admin modules (and openpyxl behind ReportService).
+    Command-line flags only switch on profiling and metrics export
+    (src/services/profiling.py, src/services/metrics_service.py).
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        import argparse
+
+        from src.services import metrics_service, profiling
+
+        parser = argparse.ArgumentParser(prog="python -m src.main", description="Student Attendance System console")
+        profiling.add_profile_arguments(parser)
+        metrics_service.add_metrics_arguments(parser)
+        args = parser.parse_args(argv)
+        profiling.start_from_args(args)
+        metrics_service.start_from_args(args)
+
     init_db()
+    maintenance = MaintenanceScheduler()
+    maintenance.start()
+    sessions = SessionExpiryDaemon()   # opens scheduled sessions at their start, closes them at their end
+    sessions.start()
     auth = AuthService()
-    admin_handlers = AdminHandlers()
+    admin_handlers = None
 
     while True:
         show_main_menu()
@@ -22,6 +47,8 @@ def run() -> None:
 
         if c == "2":
             print("Goodbye.")
+            maintenance.stop(timeout=1)
+            sessions.stop(timeout=1)
             return
 
         if c != "1":
@@ -40,10 +67,19 @@ def run() -> None:
 
         role = result.user.role
         if role == Role.STUDENT.value:
+            from src.ui.student_handlers import run_student_dashboard
+
             run_student_dashboard(result.user)
         elif role == Role.LECTURER.value:
+            from src.ui.lecturer_handlers import run_lecturer_dashboard
+
             run_lecturer_dashboard(result.user)
         elif role == Role.ADMIN.value:
+            if admin_handlers is None:
+                from src.ui.admin_handlers import AdminHandlers
+
+                admin_handlers = AdminHandlers()
+            admin_handlers.actor_id = result.user.user_id
             admin_handlers.admin_menu()
         else:
             print("Unknown role. Please contact administrator.")
@@ -9,12 +9,51 @@ class Role(str, Enum):
     ADMIN = "ADMIN"
 
 
-class SessionStatus(str, Enum):
+class CodedEnum(str, Enum):
+    """String enum stored on disk as a small integer code (see `_CODES`).
+
+    Services keep working with the string values; repositories call `encode`
+    on the way in and `decode` on the way out.
+    """
+
+    @property
+    def code(self) -> int:
+        return _CODES[type(self)][self.value]
+
+    @classmethod
+    def encode(cls, value: str) -> int:
+        try:
+            return _CODES[cls][value]
+        except KeyError:
+            return cls(value).code  # members hash by name; unknown values raise ValueError
+
+    @classmethod
+    def decode(cls, code: int) -> str:
+        return _LABELS[cls][code]
+
+    @classmethod
+    def sql_label(cls, column: str) -> str:
+        """SQL CASE expression turning a code column back into its string value."""
+        whens = " ".join(f"WHEN {c} THEN '{v}'" for v, c in _CODES[cls].items())
+        return f"CASE {column} {whens} END"
+
+    @classmethod
+    def sql_check(cls, column: str = "status") -> str:
+        codes = sorted(_CODES[cls].values())
+        if codes == list(range(codes[0], codes[-1] + 1)):
+            # a constant IN list in a CHECK is re-evaluated per written row at several
+            # times the cost of a range test (measured by src.tools.audit_overhead)
+            return f"CHECK ({column} BETWEEN {codes[0]} AND {codes[-1]})"
+        return f"CHECK ({column} IN ({','.join(str(c) for c in codes)}))"
+
+
+class SessionStatus(CodedEnum):
     OPEN = "OPEN"
     CLOSED = "CLOSED"
+    SCHEDULED = "SCHEDULED"   # planned ahead (recurring schedule); the expiry scheduler opens it at its start
 
 
-class AttendanceStatus(str, Enum):
+class AttendanceStatus(CodedEnum):
     PRESENT = "Present"
     LATE = "Late"
     ABSENT = "Absent"
@@ -26,7 +65,51 @@ class RequestType(str, Enum):
     LATE = "Late"
 
 
-class RequestStatus(str, Enum):
+class RequestStatus(CodedEnum):
     PENDING = "PENDING"
     APPROVED = "APPROVED"
     REJECTED = "REJECTED"
+
+
+class ChangeTable(CodedEnum):
+    """Tables whose writes are captured in change_log."""
+    RECORDS = "attendance_records"
+    REQUESTS = "absence_requests"
+    SESSIONS = "attendance_sessions"
+
+
+class ChangeOp(CodedEnum):
+    INSERT = "INSERT"
+    UPDATE = "UPDATE"
+    DELETE = "DELETE"
+
+
+class AuditAction(CodedEnum):
+    RECORD_ADD = "RECORD_ADD"
+    RECORD_EDIT = "RECORD_EDIT"
+    RECORD_DELETE = "RECORD_DELETE"
+    STATUS_UPDATE = "STATUS_UPDATE"
+    MARK_ALL_PRESENT = "MARK_ALL_PRESENT"
+
+
+class JobStatus(CodedEnum):
+    """Lifecycle of a queued report job (see ReportJobService)."""
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+# On-disk codes. Never renumber: they are stored in every row.
+# Absent is 0 so a missing record and a zero-filled matrix mean the same thing.
+_CODES: dict[type, dict[str, int]] = {
+    SessionStatus: {"OPEN": 0, "CLOSED": 1, "SCHEDULED": 2},
+    AttendanceStatus: {"Absent": 0, "Present": 1, "Late": 2, "Excused": 3},
+    RequestStatus: {"PENDING": 0, "APPROVED": 1, "REJECTED": 2},
+    ChangeTable: {"attendance_records": 0, "absence_requests": 1, "attendance_sessions": 2},
+    ChangeOp: {"INSERT": 0, "UPDATE": 1, "DELETE": 2},
+    AuditAction: {"RECORD_ADD": 0, "RECORD_EDIT": 1, "RECORD_DELETE": 2, "STATUS_UPDATE": 3, "MARK_ALL_PRESENT": 4},
+    JobStatus: {"QUEUED": 0, "RUNNING": 1, "DONE": 2, "FAILED": 3, "CANCELLED": 4},
+}
+_LABELS: dict[type, dict[int, str]] = {cls: {c: v for v, c in codes.items()} for cls, codes in _CODES.items()}
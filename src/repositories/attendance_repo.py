@@ -4,7 +4,9 @@ import sqlite3
 from dataclasses import dataclass
 from typing import Optional
 
+from src.models.enums import AttendanceStatus, SessionStatus
 from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
 
 
 @dataclass
@@ -17,6 +19,22 @@ class AttendanceRow:
     note: Optional[str]
 
 
+@dataclass
+class CheckinState:
+    """Why a conditional check-in inserted nothing (see AttendanceRepo.checkin)."""
+    status: str
+    pin_enabled: int
+    pin_code: Optional[str]
+    enrolled: bool
+    checked_in: bool
+
+
+def _to_row(r: sqlite3.Row) -> AttendanceRow:
+    d = dict(r)
+    d["status"] = AttendanceStatus.decode(d["status"])
+    return AttendanceRow(**d)
+
+
 class AttendanceRepo:
     def __init__(self, conn: sqlite3.Connection | None = None) -> None:
         self._external_conn = conn
@@ -29,7 +47,7 @@ class AttendanceRepo:
         row = conn.execute("SELECT * FROM attendance_records WHERE record_id=?", (record_id,)).fetchone()
         if self._external_conn is None:
             conn.close()
-        return AttendanceRow(**dict(row)) if row else None
+        return _to_row(row) if row else None
 
     def get_by_session_student(self, session_id: int, student_id: int) -> Optional[AttendanceRow]:
         conn = self._conn()
@@ -39,7 +57,7 @@ class AttendanceRepo:
         ).fetchone()
         if self._external_conn is None:
             conn.close()
-        return AttendanceRow(**dict(row)) if row else None
+        return _to_row(row) if row else None
 
     def list_by_filter(
         self,
@@ -88,7 +106,82 @@ class AttendanceRepo:
 
         if self._external_conn is None:
             conn.close()
-        return [AttendanceRow(**dict(r)) for r in rows]
+        return [_to_row(r) for r in rows]
+
+    def checkin(self, session_id: int, student_id: int, pin: Optional[str], *, checkin_time: str) -> bool:
+        """Insert a PRESENT record if the session is OPEN, the student is enrolled and the PIN matches.
+
+        One statement: the checks are the WHERE of the INSERT ... SELECT and a
+        duplicate is absorbed by ON CONFLICT, so concurrent submissions cannot
+        race between check and insert. Returns False if nothing was inserted;
+        get_checkin_state tells why.
+        """
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute(
+            """
+            INSERT INTO attendance_records(session_id, student_id, status, checkin_time, note)
+            SELECT s.session_id, e.student_id, ?, ?, NULL
+            FROM attendance_sessions s
+            JOIN enrollments e ON e.class_id = s.class_id AND e.student_id = ?
+            WHERE s.session_id = ? AND s.status = ? AND (s.pin_enabled = 0 OR s.pin_code = ?)
+            ON CONFLICT (session_id, student_id) DO NOTHING
+            """,
+            (AttendanceStatus.PRESENT.code, checkin_time, student_id, session_id, SessionStatus.OPEN.code, pin or None),
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return cur.rowcount == 1
+
+    def get_checkin_state(self, session_id: int, student_id: int) -> Optional[CheckinState]:
+        """Session status/PIN plus enrollment and existing-record flags; None if the session does not exist."""
+        conn = self._conn()
+        row = conn.execute(
+            """
+            SELECT s.status, s.pin_enabled, s.pin_code,
+                   EXISTS (SELECT 1 FROM enrollments e WHERE e.class_id = s.class_id AND e.student_id = ?),
+                   EXISTS (SELECT 1 FROM attendance_records ar WHERE ar.session_id = s.session_id AND ar.student_id = ?)
+            FROM attendance_sessions s
+            WHERE s.session_id = ?
+            """,
+            (student_id, student_id, session_id),
+        ).fetchone()
+        if self._external_conn is None:
+            conn.close()
+        if row is None:
+            return None
+        return CheckinState(SessionStatus.decode(row[0]), row[1], row[2], bool(row[3]), bool(row[4]))
+
+    def set_status_for_roster(self, session_id: int, class_id: int, status: str) -> int:
+        """Give every enrolled student of `class_id` a record with `status` in the session (update + insert-missing).
+
+        Returns how many records changed; notes and check-in times are kept.
+        """
+        code = AttendanceStatus.encode(status)
+        conn = self._conn()
+
+        def write() -> int:
+            updated = conn.execute(
+                """
+                UPDATE attendance_records SET status=?
+                WHERE session_id=? AND status<>?
+                  AND student_id IN (SELECT student_id FROM enrollments WHERE class_id=?)
+                """,
+                (code, session_id, code, class_id),
+            ).rowcount
+            inserted = conn.execute(
+                """
+                INSERT INTO attendance_records(session_id, student_id, status, checkin_time, note)
+                SELECT ?, e.student_id, ?, NULL, NULL FROM enrollments e WHERE e.class_id = ?
+                ON CONFLICT (session_id, student_id) DO NOTHING
+                """,
+                (session_id, code, class_id),
+            ).rowcount
+            return updated + inserted
+
+        changed = run_write(conn, write)
+        if self._external_conn is None:
+            conn.close()
+        return changed
 
     def create(
         self,
@@ -100,14 +193,13 @@ class AttendanceRepo:
         note: Optional[str] = None,
     ) -> int:
         conn = self._conn()
-        cur = conn.execute(
+        cur = run_write(conn, lambda: conn.execute(
             """
             INSERT INTO attendance_records(session_id, student_id, status, checkin_time, note)
             VALUES (?,?,?,?,?)
             """,
-            (session_id, student_id, status, checkin_time, note),
-        )
-        conn.commit()
+            (session_id, student_id, AttendanceStatus.encode(status), checkin_time, note),
+        ))
         if self._external_conn is None:
             conn.close()
             
@@ -129,7 +221,7 @@ class AttendanceRepo:
         fields, params = [], []
         if status is not None:
             fields.append("status=?")
-            params.append(status)
+            params.append(AttendanceStatus.encode(status))
         if checkin_time is not None:
             fields.append("checkin_time=?")
             params.append(checkin_time)
@@ -141,17 +233,17 @@ class AttendanceRepo:
         params.extend([session_id, student_id])
 
         conn = self._conn()
-        conn.execute(
+        run_write(conn, lambda: conn.execute(
             f"UPDATE attendance_records SET {', '.join(fields)} WHERE session_id=? AND student_id=?",
             tuple(params),
-        )
-        conn.commit()
+        ))
         if self._external_conn is None:
             conn.close()
 
     def delete(self, session_id: int, student_id: int) -> None:
         conn = self._conn()
-        conn.execute("DELETE FROM attendance_records WHERE session_id=? AND student_id=?", (session_id, student_id))
-        conn.commit()
+        run_write(conn, lambda: conn.execute(
+            "DELETE FROM attendance_records WHERE session_id=? AND student_id=?", (session_id, student_id)
+        ))
         if self._external_conn is None:
             conn.close()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Optional
+
+from src.models.enums import AttendanceStatus, AuditAction
+from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
+
+
+@dataclass
+class AuditEntry:
+    """One change to one attendance record, before it is written."""
+    action: str
+    session_id: int
+    student_id: int
+    before_status: Optional[str] = None
+    after_status: Optional[str] = None
+    before_note: Optional[str] = None
+    after_note: Optional[str] = None
+
+
+@dataclass
+class AuditRow:
+    audit_id: int
+    at: int
+    actor_id: Optional[int]
+    action: str
+    session_id: int
+    student_id: int
+    before_status: Optional[str]
+    after_status: Optional[str]
+    before_note: Optional[str]
+    after_note: Optional[str]
+
+
+def _status_code(status: Optional[str]) -> Optional[int]:
+    return None if status is None else AttendanceStatus.encode(status)
+
+
+def _status_label(code: Optional[int]) -> Optional[str]:
+    return None if code is None else AttendanceStatus.decode(code)
+
+
+def _to_row(r: sqlite3.Row) -> AuditRow:
+    return AuditRow(
+        audit_id=r["audit_id"],
+        at=r["at"],
+        actor_id=r["actor_id"],
+        action=AuditAction.decode(r["action"]),
+        session_id=r["session_id"],
+        student_id=r["student_id"],
+        before_status=_status_label(r["before_status"]),
+        after_status=_status_label(r["after_status"]),
+        before_note=r["before_note"],
+        after_note=r["after_note"],
+    )
+
+
+class AuditRepo:
+    """audit_log is append-only: there is no update/delete (triggers reject them too)."""
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        self._external_conn = conn
+
+    def _conn(self) -> sqlite3.Connection:
+        return self._external_conn or get_conn()
+
+    def create_many(self, entries: list[AuditEntry], *, actor_id: Optional[int], at: int) -> int:
+        """Append entries with one executemany (inside the caller's transaction, if any)."""
+        if not entries:
+            return 0
+        rows = [
+            (
+                at, actor_id, AuditAction.encode(e.action), e.session_id, e.student_id,
+                _status_code(e.before_status), _status_code(e.after_status), e.before_note, e.after_note, e.session_id,
+            )
+            for e in entries
+        ]
+        conn = self._conn()
+        run_write(conn, lambda: conn.executemany(
+            """
+            INSERT INTO audit_log(at, actor_id, action, session_id, student_id,
+                                  before_status, after_status, before_note, after_note, class_id)
+            VALUES (?,?,?,?,?,?,?,?,?, COALESCE((SELECT class_id FROM attendance_sessions WHERE session_id = ?), 0))
+            """,
+            rows,
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return len(rows)
+
+    def create_roster_changes(
+        self, session_id: int, class_id: int, *, action: str, after_status: str, actor_id: Optional[int], at: int
+    ) -> int:
+        """Append one entry per enrolled student whose record in the session is missing or not `after_status`.
+
+        One INSERT ... SELECT reading the "before" state, so it must run in the
+        caller's transaction ahead of the write it describes.
+        """
+        after_code = AttendanceStatus.encode(after_status)
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute(
+            """
+            INSERT INTO audit_log(at, actor_id, action, session_id, student_id,
+                                  before_status, after_status, before_note, after_note, class_id)
+            SELECT ?, ?, ?, ?, e.student_id, ar.status, ?, ar.note, ar.note, e.class_id
+            FROM enrollments e
+            LEFT JOIN attendance_records ar ON ar.session_id = ? AND ar.student_id = e.student_id
+            WHERE e.class_id = ? AND ar.status IS NOT ?
+            """,
+            (at, actor_id, AuditAction.encode(action), session_id, after_code, session_id, class_id, after_code),
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return cur.rowcount
+
+    def list_page(
+        self,
+        *,
+        student_id: Optional[int] = None,
+        session_id: Optional[int] = None,
+        actor_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> list[AuditRow]:
+        """Newest first; pass the last audit_id seen as `before_id` for the next page (keyset).
+
+        Each filter has an (x, audit_id) index, so a page costs `limit` index steps.
+        """
+        clauses, params = [], []
+        if student_id is not None:
+            clauses.append("a.student_id=?")
+            params.append(student_id)
+        if session_id is not None:
+            clauses.append("a.session_id=?")
+            params.append(session_id)
+        if actor_id is not None:
+            clauses.append("a.actor_id=?")
+            params.append(actor_id)
+        if before_id is not None:
+            clauses.append("a.audit_id<?")
+            params.append(before_id)
+        params.append(limit)
+
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        conn = self._conn()
+        rows = conn.execute(f"SELECT a.* FROM audit_log a {where} ORDER BY a.audit_id DESC LIMIT ?", tuple(params)).fetchall()
+        if self._external_conn is None:
+            conn.close()
+        return [_to_row(r) for r in rows]
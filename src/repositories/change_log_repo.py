@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Optional
+
+from src.models.enums import ChangeOp, ChangeTable
+from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
+
+
+@dataclass
+class ChangeRow:
+    seq: int
+    table: str
+    op: str
+    row_id: int
+    changed_at: int
+
+
+@dataclass
+class ConsumerRow:
+    name: str
+    cursor: int
+    updated_at: str
+
+
+def _to_row(r: sqlite3.Row) -> ChangeRow:
+    return ChangeRow(
+        seq=r["seq"],
+        table=ChangeTable.decode(r["tbl"]),
+        op=ChangeOp.decode(r["op"]),
+        row_id=r["row_id"],
+        changed_at=r["changed_at"],
+    )
+
+
+class ChangeLogRepo:
+    """change_log (written only by triggers) and the cursors of its consumers."""
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        self._external_conn = conn
+
+    def _conn(self) -> sqlite3.Connection:
+        return self._external_conn or get_conn()
+
+    def list_since(self, cursor: int, limit: int) -> list[ChangeRow]:
+        conn = self._conn()
+        rows = conn.execute("SELECT * FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?", (cursor, limit)).fetchall()
+        if self._external_conn is None:
+            conn.close()
+        return [_to_row(r) for r in rows]
+
+    def head(self) -> int:
+        """Highest seq ever assigned (still correct after compaction emptied the table)."""
+        conn = self._conn()
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='change_log'").fetchone()
+        if self._external_conn is None:
+            conn.close()
+        return int(row[0]) if row else 0
+
+    def compacted_through(self) -> int:
+        """Highest seq removed by compaction (0 if none): everything below the oldest kept entry, else up to head."""
+        conn = self._conn()
+        oldest = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+        if self._external_conn is None:
+            conn.close()
+        return oldest - 1 if oldest is not None else self.head()
+
+    def get_consumer(self, name: str) -> Optional[ConsumerRow]:
+        conn = self._conn()
+        row = conn.execute("SELECT * FROM change_consumers WHERE name=?", (name,)).fetchone()
+        if self._external_conn is None:
+            conn.close()
+        return ConsumerRow(**dict(row)) if row else None
+
+    def list_consumers(self) -> list[ConsumerRow]:
+        conn = self._conn()
+        rows = conn.execute("SELECT * FROM change_consumers ORDER BY name").fetchall()
+        if self._external_conn is None:
+            conn.close()
+        return [ConsumerRow(**dict(r)) for r in rows]
+
+    def set_cursor(self, name: str, cursor: int, *, updated_at: str) -> None:
+        conn = self._conn()
+        run_write(conn, lambda: conn.execute(
+            """
+            INSERT INTO change_consumers(name, cursor, updated_at) VALUES (?,?,?)
+                ON CONFLICT(name) DO UPDATE SET cursor=excluded.cursor, updated_at=excluded.updated_at
+            """,
+            (name, cursor, updated_at),
+        ))
+        if self._external_conn is None:
+            conn.close()
+
+    def delete_consumer(self, name: str) -> None:
+        conn = self._conn()
+        run_write(conn, lambda: conn.execute("DELETE FROM change_consumers WHERE name=?", (name,)))
+        if self._external_conn is None:
+            conn.close()
+
+    def delete_through(self, seq: int) -> int:
+        """Drop every entry with seq <= `seq`. Returns how many were removed."""
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute("DELETE FROM change_log WHERE seq <= ?", (seq,)))
+        if self._external_conn is None:
+            conn.close()
+        return cur.rowcount
@@ -5,6 +5,8 @@ from dataclasses import dataclass
 from typing import Optional
 
 from src.repositories.db import get_conn
+from src.repositories.identity_map import IdentityMap, default_identity_map
+from src.repositories.transactions import run_write
 
 
 @dataclass
@@ -16,19 +18,38 @@ class ClassRow:
 
 
 class ClassRepo:
-    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+    def __init__(self, conn: sqlite3.Connection | None = None, identity_map: IdentityMap | None = None) -> None:
         self._external_conn = conn
+        # an external connection may hold uncommitted writes: only cache reads on our own connections
+        self._identity_map = identity_map or (default_identity_map() if conn is None else None)
 
     def _conn(self) -> sqlite3.Connection:
         return self._external_conn or get_conn()
 
+    def _forget(self, class_id: int) -> None:
+        if self._identity_map is not None:
+            self._identity_map.invalidate("classes", class_id)
+
     def get_by_id(self, class_id: int) -> Optional[ClassRow]:
+        if self._identity_map is not None:
+            return self._identity_map.get("classes", class_id, lambda: self._fetch_by_id(class_id))
+        return self._fetch_by_id(class_id)
+
+    def _fetch_by_id(self, class_id: int) -> Optional[ClassRow]:
         conn = self._conn()
         row = conn.execute("SELECT * FROM classes WHERE class_id=?", (class_id,)).fetchone()
         if self._external_conn is None:
             conn.close()
         return ClassRow(**dict(row)) if row else None
 
+    def get_version(self, class_id: int) -> int:
+        """Change counter bumped by triggers on any session/record/enrollment write for the class."""
+        conn = self._conn()
+        row = conn.execute("SELECT version FROM class_versions WHERE class_id=?", (class_id,)).fetchone()
+        if self._external_conn is None:
+            conn.close()
+        return int(row["version"]) if row else 0
+
     def list_by_filter(self, *, lecturer_id: Optional[int] = None) -> list[ClassRow]:
         conn = self._conn()
         if lecturer_id is None:
@@ -41,11 +62,10 @@ class ClassRepo:
 
     def create(self, class_code: str, class_name: str, lecturer_id: int) -> int:
         conn = self._conn()
-        cur = conn.execute(
+        cur = run_write(conn, lambda: conn.execute(
             "INSERT INTO classes(class_code, class_name, lecturer_id) VALUES (?,?,?)",
             (class_code, class_name, lecturer_id),
-        )
-        conn.commit()
+        ))
         if self._external_conn is None:
             conn.close()
         new_id = cur.lastrowid
@@ -66,14 +86,14 @@ class ClassRepo:
             return
         params.append(class_id)
         conn = self._conn()
-        conn.execute(f"UPDATE classes SET {', '.join(fields)} WHERE class_id=?", tuple(params))
-        conn.commit()
+        run_write(conn, lambda: conn.execute(f"UPDATE classes SET {', '.join(fields)} WHERE class_id=?", tuple(params)))
+        self._forget(class_id)
         if self._external_conn is None:
             conn.close()
 
     def delete(self, class_id: int) -> None:
         conn = self._conn()
-        conn.execute("DELETE FROM classes WHERE class_id=?", (class_id,))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("DELETE FROM classes WHERE class_id=?", (class_id,)))
+        self._forget(class_id)
         if self._external_conn is None:
             conn.close()
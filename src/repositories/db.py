@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import os
 import sqlite3
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from src.models.enums import (
     Role,
@@ -10,38 +12,27 @@ from src.models.enums import (
     AttendanceStatus,
     RequestType,
     RequestStatus,
+    ChangeOp,
+    ChangeTable,
+    AuditAction,
+    JobStatus,
 )
 from src.utils.security import hash_password
 from src.utils.time_utils import now
 
 DB_PATH = Path("data") / "sas.db"
 
+# How long a connection waits on another writer's lock before SQLITE_BUSY
+# (transactions.run_write then retries with backoff).
+BUSY_TIMEOUT_MS = int(os.environ.get("SAS_BUSY_TIMEOUT_MS", 5000))
 
-def get_conn(path: Optional[Path] = None) -> sqlite3.Connection:
-    """Open SQLite connection with common PRAGMAs enabled."""
-    db_path = path or DB_PATH
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    conn.execute("PRAGMA journal_mode = WAL;")
-    return conn
-
-
-def init_db() -> None:
-    """
-    Initialize DB schema + indexes + seed demo data.
-
-    Note: Adjust columns if your Stage 2 design has extra fields,
-    but this schema is safe and supports all use cases.
-    """
-    conn = get_conn()
-    cur = conn.cursor()
+# Bumped whenever a migration in src/repositories/migrations.py is added.
+SCHEMA_VERSION = 7
 
-    # --- Schema (with constraints + ON DELETE rules) ---
-    cur.executescript(
-        f"""
+# --- Schema (with constraints + ON DELETE rules) ---
+# Status columns hold the small integer codes from src/models/enums.py.
+TABLES: dict[str, str] = {
+    "users": f"""
         CREATE TABLE IF NOT EXISTS users (
             user_id         INTEGER PRIMARY KEY AUTOINCREMENT,
             username        TEXT NOT NULL UNIQUE,
@@ -51,7 +42,8 @@ def init_db() -> None:
             failed_attempts INTEGER NOT NULL DEFAULT 0 CHECK (failed_attempts >= 0),
             locked_until    TEXT NULL
         );
-
+    """,
+    "classes": """
         CREATE TABLE IF NOT EXISTS classes (
             class_id    INTEGER PRIMARY KEY AUTOINCREMENT,
             class_code  TEXT NOT NULL UNIQUE,
@@ -59,15 +51,17 @@ def init_db() -> None:
             lecturer_id INTEGER NOT NULL,
             FOREIGN KEY (lecturer_id) REFERENCES users(user_id) ON DELETE RESTRICT
         );
-
+    """,
+    "enrollments": """
         CREATE TABLE IF NOT EXISTS enrollments (
             class_id   INTEGER NOT NULL,
             student_id INTEGER NOT NULL,
             PRIMARY KEY (class_id, student_id),
             FOREIGN KEY (class_id) REFERENCES classes(class_id) ON DELETE CASCADE,
             FOREIGN KEY (student_id) REFERENCES users(user_id) ON DELETE CASCADE
-        );
-
+        ) WITHOUT ROWID;
+    """,
+    "attendance_sessions": f"""
         CREATE TABLE IF NOT EXISTS attendance_sessions (
             session_id   INTEGER PRIMARY KEY AUTOINCREMENT,
             class_id     INTEGER NOT NULL,
@@ -76,27 +70,26 @@ def init_db() -> None:
             duration_min INTEGER NOT NULL CHECK (duration_min > 0),
             pin_enabled  INTEGER NOT NULL DEFAULT 0 CHECK (pin_enabled IN (0,1)),
             pin_code     TEXT NULL,
-            status       TEXT NOT NULL CHECK (status IN ('{SessionStatus.OPEN.value}','{SessionStatus.CLOSED.value}')),
+            status       INTEGER NOT NULL {SessionStatus.sql_check()},
             created_at   TEXT NOT NULL,
             FOREIGN KEY (class_id) REFERENCES classes(class_id) ON DELETE CASCADE,
             UNIQUE (class_id, session_date, start_time)
         );
-
+    """,
+    "attendance_records": f"""
         CREATE TABLE IF NOT EXISTS attendance_records (
             record_id     INTEGER PRIMARY KEY AUTOINCREMENT,
             session_id    INTEGER NOT NULL,
             student_id    INTEGER NOT NULL,
-            status        TEXT NOT NULL CHECK (status IN ('{AttendanceStatus.PRESENT.value}',
-                                                         '{AttendanceStatus.LATE.value}',
-                                                         '{AttendanceStatus.ABSENT.value}',
-                                                         '{AttendanceStatus.EXCUSED.value}')),
+            status        INTEGER NOT NULL {AttendanceStatus.sql_check()},
             checkin_time  TEXT NULL,
             note          TEXT NULL,
             UNIQUE (session_id, student_id),
             FOREIGN KEY (session_id) REFERENCES attendance_sessions(session_id) ON DELETE CASCADE,
             FOREIGN KEY (student_id) REFERENCES users(user_id) ON DELETE CASCADE
         );
-
+    """,
+    "absence_requests": f"""
         CREATE TABLE IF NOT EXISTS absence_requests (
             request_id       INTEGER PRIMARY KEY AUTOINCREMENT,
             student_id       INTEGER NOT NULL,
@@ -104,16 +97,15 @@ def init_db() -> None:
             request_type     TEXT NOT NULL CHECK (request_type IN ('{RequestType.ABSENT.value}','{RequestType.LATE.value}')),
             reason           TEXT NOT NULL,
             evidence_path    TEXT NULL,
-            status           TEXT NOT NULL CHECK (status IN ('{RequestStatus.PENDING.value}',
-                                                            '{RequestStatus.APPROVED.value}',
-                                                            '{RequestStatus.REJECTED.value}')),
+            status           INTEGER NOT NULL {RequestStatus.sql_check()},
             lecturer_comment TEXT NULL,
             created_at       TEXT NOT NULL,
             updated_at       TEXT NOT NULL,
             FOREIGN KEY (student_id) REFERENCES users(user_id) ON DELETE CASCADE,
             FOREIGN KEY (session_id) REFERENCES attendance_sessions(session_id) ON DELETE CASCADE
         );
-
+    """,
+    "warnings": """
         CREATE TABLE IF NOT EXISTS warnings (
             warning_id INTEGER PRIMARY KEY AUTOINCREMENT,
             student_id INTEGER NOT NULL,
@@ -124,18 +116,426 @@ def init_db() -> None:
             FOREIGN KEY (student_id) REFERENCES users(user_id) ON DELETE CASCADE,
             FOREIGN KEY (class_id) REFERENCES classes(class_id) ON DELETE CASCADE
         );
-        """
-    )
+    """,
+    "warning_rules": """
+        CREATE TABLE IF NOT EXISTS warning_rules (
+            rule_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+            class_id  INTEGER NULL,        -- NULL = default for every class
+            kind      TEXT NOT NULL,
+            threshold REAL NOT NULL CHECK (threshold > 0),
+            enabled   INTEGER NOT NULL DEFAULT 1 CHECK (enabled IN (0,1)),
+            FOREIGN KEY (class_id) REFERENCES classes(class_id) ON DELETE CASCADE
+        );
+    """,
+    # Per-class change counter (report cache validation)
+    "class_versions": """
+        CREATE TABLE IF NOT EXISTS class_versions (
+            class_id INTEGER PRIMARY KEY,
+            version  INTEGER NOT NULL DEFAULT 0
+        );
+    """,
+    # Change-data-capture outbox, filled by the trg_*_cdc triggers. Only the key
+    # is logged; consumers read the row's current state (ChangeFeedService).
+    # AUTOINCREMENT keeps seq monotonic after compaction empties the table.
+    "change_log": f"""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+            tbl        INTEGER NOT NULL {ChangeTable.sql_check('tbl')},
+            op         INTEGER NOT NULL {ChangeOp.sql_check('op')},
+            row_id     INTEGER NOT NULL,
+            changed_at INTEGER NOT NULL    -- unix seconds
+        );
+    """,
+    "change_consumers": """
+        CREATE TABLE IF NOT EXISTS change_consumers (
+            name       TEXT PRIMARY KEY,
+            cursor     INTEGER NOT NULL DEFAULT 0 CHECK (cursor >= 0),
+            updated_at TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """,
+    # A student's attendance records keyed in date order, so history pages are
+    # PK range reads (AttendanceService.student_history_page). Maintained by
+    # the trg_*_history triggers; status/note stay in attendance_records.
+    "student_history": """
+        CREATE TABLE IF NOT EXISTS student_history (
+            student_id   INTEGER NOT NULL,
+            session_date TEXT NOT NULL,
+            start_time   TEXT NOT NULL,
+            session_id   INTEGER NOT NULL,
+            class_id     INTEGER NOT NULL,
+            PRIMARY KEY (student_id, session_date, start_time, session_id)
+        ) WITHOUT ROWID;
+    """,
+    # Per (class, student, day) Present/Late/Excused counts plus running totals
+    # since the first day, so any date range is two lookups per student
+    # (ReportService.iter_summary_rows). Days with no such record have no row.
+    # Maintained by the trg_*_rollup triggers; Absent = sessions - the rest.
+    # Records of SCHEDULED sessions are left out until the session opens.
+    "daily_rollups": """
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            class_id    INTEGER NOT NULL,
+            student_id  INTEGER NOT NULL,
+            day         TEXT NOT NULL,       -- session_date
+            present     INTEGER NOT NULL,
+            late        INTEGER NOT NULL,
+            excused     INTEGER NOT NULL,
+            cum_present INTEGER NOT NULL,    -- sums over every day <= this one
+            cum_late    INTEGER NOT NULL,
+            cum_excused INTEGER NOT NULL,
+            PRIMARY KEY (class_id, student_id, day)
+        ) WITHOUT ROWID;
+    """,
+    # Report exports queued from the console and run by ReportJobWorker threads
+    # or a separate worker process (src/services/report_job_service.py).
+    "report_jobs": f"""
+        CREATE TABLE IF NOT EXISTS report_jobs (
+            job_id           INTEGER PRIMARY KEY,
+            owner_id         INTEGER NULL,        -- users.user_id who queued it
+            params           TEXT NOT NULL,       -- JSON: format, class / lecturer, date range, output
+            status           INTEGER NOT NULL {JobStatus.sql_check('status')},
+            attempts         INTEGER NOT NULL DEFAULT 0,
+            max_attempts     INTEGER NOT NULL DEFAULT 3,
+            run_after        INTEGER NOT NULL,    -- unix seconds; retries wait here
+            progress_done    INTEGER NOT NULL DEFAULT 0,
+            progress_total   INTEGER NOT NULL DEFAULT 0,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            worker           TEXT NULL,
+            heartbeat_at     INTEGER NULL,        -- a RUNNING job with a stale heartbeat lost its worker
+            result_paths     TEXT NULL,           -- JSON list of files written
+            error            TEXT NULL,
+            created_at       INTEGER NOT NULL,
+            started_at       INTEGER NULL,
+            finished_at      INTEGER NULL,
+            FOREIGN KEY (owner_id) REFERENCES users(user_id) ON DELETE SET NULL
+        );
+    """,
+    # Append-only history of manual attendance edits (see AuditService). No
+    # foreign keys: entries outlive the users/sessions they mention.
+    "audit_log": f"""
+        CREATE TABLE IF NOT EXISTS audit_log (
+            audit_id      INTEGER PRIMARY KEY,
+            at            INTEGER NOT NULL,    -- unix seconds
+            actor_id      INTEGER NULL,        -- users.user_id; NULL = script / system
+            action        INTEGER NOT NULL {AuditAction.sql_check('action')},
+            session_id    INTEGER NOT NULL,
+            student_id    INTEGER NOT NULL,
+            before_status INTEGER NULL {AttendanceStatus.sql_check('before_status')},
+            after_status  INTEGER NULL {AttendanceStatus.sql_check('after_status')},
+            before_note   TEXT NULL,
+            after_note    TEXT NULL,
+            class_id      INTEGER NOT NULL DEFAULT 0   -- the session's class when written; 0 = unknown
+        );
+    """,
+}
+
+# --- Indexes (performance) ---
+# attendance_records(session_id) is served by the UNIQUE (session_id, student_id) index.
+# Every statement's plan is checked by `python -m src.tools.query_plans`.
+INDEXES_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_records_student_session ON attendance_records(student_id, session_id);
+    CREATE INDEX IF NOT EXISTS idx_sessions_class_date ON attendance_sessions(class_id, session_date);
+    CREATE INDEX IF NOT EXISTS idx_sessions_status_date ON attendance_sessions(status, session_date, start_time);
+    CREATE INDEX IF NOT EXISTS idx_requests_session_status ON absence_requests(session_id, status);
+    CREATE INDEX IF NOT EXISTS idx_requests_student_created ON absence_requests(student_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_warnings_student_created ON warnings(student_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_warnings_class_created ON warnings(class_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_classes_lecturer_code ON classes(lecturer_id, class_code);
+    CREATE INDEX IF NOT EXISTS idx_enrollments_student ON enrollments(student_id);
+    CREATE INDEX IF NOT EXISTS idx_audit_student ON audit_log(student_id, audit_id);
+    CREATE INDEX IF NOT EXISTS idx_audit_session ON audit_log(session_id, audit_id);
+    CREATE INDEX IF NOT EXISTS idx_audit_actor ON audit_log(actor_id, audit_id);
+    CREATE INDEX IF NOT EXISTS idx_report_jobs_status_run ON report_jobs(status, run_after);
+    CREATE INDEX IF NOT EXISTS idx_report_jobs_owner ON report_jobs(owner_id, job_id);
+"""
+
+
+def _bump_version(class_expr: str) -> str:
+    return f"""
+            INSERT INTO class_versions(class_id, version) {class_expr}
+                ON CONFLICT(class_id) DO UPDATE SET version = version + 1;"""
+
+
+_RECORD_CLASS = "SELECT class_id, 1 FROM attendance_sessions WHERE session_id = {}"
+
 
-    # --- Indexes (performance) ---
-    cur.executescript(
-        """
-        CREATE INDEX IF NOT EXISTS idx_records_session_id ON attendance_records(session_id);
-        CREATE INDEX IF NOT EXISTS idx_records_student_id ON attendance_records(student_id);
-        CREATE INDEX IF NOT EXISTS idx_sessions_class_date ON attendance_sessions(class_id, session_date);
-        CREATE INDEX IF NOT EXISTS idx_requests_session_status ON absence_requests(session_id, status);
-        """
+_HISTORY_INSERT = """
+        INSERT OR IGNORE INTO student_history(student_id, session_date, start_time, session_id, class_id)
+            SELECT NEW.student_id, session_date, start_time, session_id, class_id
+            FROM attendance_sessions WHERE session_id = NEW.session_id;"""
+_HISTORY_DELETE = """
+        DELETE FROM student_history
+        WHERE student_id = OLD.student_id
+          AND session_date = (SELECT session_date FROM attendance_sessions WHERE session_id = OLD.session_id)
+          AND start_time = (SELECT start_time FROM attendance_sessions WHERE session_id = OLD.session_id)
+          AND session_id = OLD.session_id;"""
+# Every history row of one session, found by full primary key per enrolled record.
+_HISTORY_OF_SESSION = """
+        WHERE student_id IN (SELECT student_id FROM attendance_records WHERE session_id = OLD.session_id)
+          AND session_date = OLD.session_date AND start_time = OLD.start_time AND session_id = OLD.session_id;"""
+
+
+_P, _L, _E = AttendanceStatus.PRESENT.code, AttendanceStatus.LATE.code, AttendanceStatus.EXCUSED.code
+_COUNTED = f"IN ({_P}, {_L}, {_E})"
+# A SCHEDULED session has not taken place: it is not counted anywhere (its
+# records, e.g. an absence approved ahead, count from the moment it opens).
+_SCHEDULED = SessionStatus.SCHEDULED.code
+
+
+def _rollup_of_record(ref: str, sign: str) -> str:
+    """Add (sign '') or remove (sign '-') one record's counts at its session's class and day."""
+    return f"""
+        INSERT INTO rollup_delta(class_id, student_id, day, present, late, excused)
+            SELECT class_id, {ref}.student_id, session_date,
+                   {sign}({ref}.status = {_P}), {sign}({ref}.status = {_L}), {sign}({ref}.status = {_E})
+            FROM attendance_sessions
+            WHERE session_id = {ref}.session_id AND {ref}.status {_COUNTED}
+              AND attendance_sessions.status <> {_SCHEDULED};"""
+
+
+def _rollup_of_session(ref: str, sign: str) -> str:
+    """Add or remove the counts of every record of one session at ref's class and day."""
+    return f"""
+        INSERT INTO rollup_delta(class_id, student_id, day, present, late, excused)
+            SELECT {ref}.class_id, student_id, {ref}.session_date,
+                   {sign}(status = {_P}), {sign}(status = {_L}), {sign}(status = {_E})
+            FROM attendance_records
+            WHERE session_id = {ref}.session_id AND status {_COUNTED} AND {ref}.status <> {_SCHEDULED};"""
+
+
+# The same rows as daily_rollups, computed from the raw records (migration
+# backfill, MaintenanceService.verify_rollups / rebuild_rollups).
+DAILY_ROLLUPS_SELECT = f"""
+    SELECT class_id, student_id, day, present, late, excused,
+           SUM(present) OVER w, SUM(late) OVER w, SUM(excused) OVER w
+    FROM (
+        SELECT s.class_id, ar.student_id, s.session_date AS day,
+               SUM(ar.status = {_P}) AS present, SUM(ar.status = {_L}) AS late, SUM(ar.status = {_E}) AS excused
+        FROM attendance_records ar
+        JOIN attendance_sessions s ON s.session_id = ar.session_id
+        WHERE ar.status {_COUNTED} AND s.status <> {_SCHEDULED}
+        GROUP BY s.class_id, ar.student_id, s.session_date
     )
+    WINDOW w AS (PARTITION BY class_id, student_id ORDER BY day)
+"""
+
+
+def _cdc_triggers(table: ChangeTable, key: str) -> str:
+    """AFTER INSERT/UPDATE/DELETE triggers appending (table, op, key) to change_log."""
+    sql = ""
+    for op, ref in ((ChangeOp.INSERT, "NEW"), (ChangeOp.UPDATE, "NEW"), (ChangeOp.DELETE, "OLD")):
+        sql += f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table.value}_{op.value.lower()}_cdc AFTER {op.value} ON {table.value} BEGIN
+        INSERT INTO change_log(tbl, op, row_id, changed_at)
+            VALUES ({table.code}, {op.code}, {ref}.{key}, CAST(strftime('%s', 'now') AS INTEGER));
+    END;"""
+    return sql
+
+
+# --- Triggers ---
+TRIGGERS_SQL = f"""
+    CREATE TRIGGER IF NOT EXISTS trg_records_ins_version AFTER INSERT ON attendance_records BEGIN
+        {_bump_version(_RECORD_CLASS.format("NEW.session_id"))}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_records_upd_version AFTER UPDATE ON attendance_records BEGIN
+        {_bump_version(_RECORD_CLASS.format("OLD.session_id") + " OR session_id = NEW.session_id")}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_records_del_version AFTER DELETE ON attendance_records BEGIN
+        {_bump_version(_RECORD_CLASS.format("OLD.session_id"))}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_ins_version AFTER INSERT ON attendance_sessions BEGIN
+        {_bump_version("VALUES (NEW.class_id, 1)")}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_upd_version AFTER UPDATE ON attendance_sessions BEGIN
+        {_bump_version("VALUES (OLD.class_id, 1)")}
+        {_bump_version("VALUES (NEW.class_id, 1)")}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_del_version AFTER DELETE ON attendance_sessions BEGIN
+        {_bump_version("VALUES (OLD.class_id, 1)")}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_enrollments_ins_version AFTER INSERT ON enrollments BEGIN
+        {_bump_version("VALUES (NEW.class_id, 1)")}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_enrollments_del_version AFTER DELETE ON enrollments BEGIN
+        {_bump_version("VALUES (OLD.class_id, 1)")}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_records_ins_history AFTER INSERT ON attendance_records BEGIN{_HISTORY_INSERT}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_records_upd_history AFTER UPDATE OF session_id, student_id ON attendance_records BEGIN{_HISTORY_DELETE}{_HISTORY_INSERT}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_records_del_history AFTER DELETE ON attendance_records BEGIN{_HISTORY_DELETE}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_upd_history
+        AFTER UPDATE OF session_date, start_time, class_id ON attendance_sessions BEGIN
+        UPDATE student_history SET session_date = NEW.session_date, start_time = NEW.start_time, class_id = NEW.class_id{_HISTORY_OF_SESSION}
+    END;
+    -- BEFORE: the records (and their session's date) are still there to find the history rows
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_del_history BEFORE DELETE ON attendance_sessions BEGIN
+        DELETE FROM student_history{_HISTORY_OF_SESSION}
+    END;
+
+    -- Writes to rollup_delta apply one (class, student, day) change to daily_rollups:
+    -- create the day's row from the previous running totals, add the delta to it
+    -- and every later day, and drop the row again if its counts fell to zero.
+    CREATE VIEW IF NOT EXISTS rollup_delta(class_id, student_id, day, present, late, excused) AS
+        SELECT 0, 0, '', 0, 0, 0 WHERE 0;
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_delta INSTEAD OF INSERT ON rollup_delta BEGIN
+        INSERT INTO daily_rollups(class_id, student_id, day, present, late, excused, cum_present, cum_late, cum_excused)
+            SELECT NEW.class_id, NEW.student_id, NEW.day, 0, 0, 0,
+                   COALESCE(prev.cum_present, 0), COALESCE(prev.cum_late, 0), COALESCE(prev.cum_excused, 0)
+            FROM (SELECT 1) LEFT JOIN (
+                SELECT cum_present, cum_late, cum_excused FROM daily_rollups
+                WHERE class_id = NEW.class_id AND student_id = NEW.student_id AND day < NEW.day
+                ORDER BY day DESC LIMIT 1
+            ) prev
+            WHERE 1
+            ON CONFLICT DO NOTHING;
+        UPDATE daily_rollups SET
+            present = present + (day = NEW.day) * NEW.present,
+            late = late + (day = NEW.day) * NEW.late,
+            excused = excused + (day = NEW.day) * NEW.excused,
+            cum_present = cum_present + NEW.present,
+            cum_late = cum_late + NEW.late,
+            cum_excused = cum_excused + NEW.excused
+        WHERE class_id = NEW.class_id AND student_id = NEW.student_id AND day >= NEW.day;
+        DELETE FROM daily_rollups
+        WHERE class_id = NEW.class_id AND student_id = NEW.student_id AND day = NEW.day
+          AND present = 0 AND late = 0 AND excused = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_records_ins_rollup AFTER INSERT ON attendance_records BEGIN{_rollup_of_record("NEW", "")}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_records_upd_rollup AFTER UPDATE OF status, session_id, student_id ON attendance_records
+        WHEN OLD.status IS NOT NEW.status OR OLD.session_id IS NOT NEW.session_id OR OLD.student_id IS NOT NEW.student_id
+    BEGIN{_rollup_of_record("OLD", "-")}{_rollup_of_record("NEW", "")}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_records_del_rollup AFTER DELETE ON attendance_records BEGIN{_rollup_of_record("OLD", "-")}
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_upd_rollup AFTER UPDATE OF session_date, class_id, status ON attendance_sessions
+        WHEN OLD.session_date IS NOT NEW.session_date OR OLD.class_id IS NOT NEW.class_id
+          OR (OLD.status = {_SCHEDULED}) IS NOT (NEW.status = {_SCHEDULED})
+    BEGIN{_rollup_of_session("OLD", "-")}{_rollup_of_session("NEW", "")}
+    END;
+    -- BEFORE, like trg_sessions_del_history: the cascaded record deletes no longer find the session
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_del_rollup BEFORE DELETE ON attendance_sessions BEGIN{_rollup_of_session("OLD", "-")}
+    END;
+    {_cdc_triggers(ChangeTable.RECORDS, "record_id")}
+    {_cdc_triggers(ChangeTable.REQUESTS, "request_id")}
+    {_cdc_triggers(ChangeTable.SESSIONS, "session_id")}
+
+    CREATE TRIGGER IF NOT EXISTS trg_audit_no_update BEFORE UPDATE ON audit_log BEGIN
+        SELECT RAISE(ABORT, 'audit_log is append-only');
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_audit_no_delete BEFORE DELETE ON audit_log BEGIN
+        SELECT RAISE(ABORT, 'audit_log is append-only');
+    END;
+"""
+
+
+# Callbacks receiving every SQL statement run on connections from get_conn()
+# (with parameters expanded). Used by the query-plan check and profiling tools.
+_statement_hooks: list[Callable[[str], None]] = []
+
+
+def add_statement_hook(hook: Callable[[str], None]) -> None:
+    _statement_hooks.append(hook)
+
+
+def remove_statement_hook(hook: Callable[[str], None]) -> None:
+    if hook in _statement_hooks:
+        _statement_hooks.remove(hook)
+
+
+def _dispatch_statement(sql: str) -> None:
+    for hook in list(_statement_hooks):
+        hook(sql)
+
+
+class ThreadConnection(sqlite3.Connection):
+    """Connection bound to one thread by bind_thread_connection().
+
+    Every get_conn() on that thread returns it, so close() is a no-op for the
+    repos/services that call it; release() really closes it.
+    """
+
+    def close(self) -> None:
+        pass
+
+    def release(self) -> None:
+        super().close()
+
+
+_bound = threading.local()
+
+
+def _open(db_path: Path, **kwargs) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    kwargs.setdefault("timeout", BUSY_TIMEOUT_MS / 1000)
+    conn = sqlite3.connect(str(db_path), **kwargs)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    # Only takes effect on a fresh database (must precede WAL + first table);
+    # lets MaintenanceService reclaim free pages without a full VACUUM.
+    # Skipped on existing files: setting it there commits a write on every open.
+    if conn.execute("PRAGMA page_count;").fetchone()[0] == 0:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    return conn
+
+
+def get_conn(path: Optional[Path] = None) -> sqlite3.Connection:
+    """Open SQLite connection with common PRAGMAs enabled (or return this thread's bound one)."""
+    db_path = path or DB_PATH
+    conn = getattr(_bound, "conn", None)
+    if conn is not None and _bound.path == db_path:
+        conn.set_trace_callback(_dispatch_statement if _statement_hooks else None)
+        return conn
+
+    conn = _open(db_path)
+    if _statement_hooks:
+        conn.set_trace_callback(_dispatch_statement)
+    return conn
+
+
+def bind_thread_connection(path: Optional[Path] = None) -> ThreadConnection:
+    """Make get_conn() on the calling thread reuse one connection until unbind_thread_connection().
+
+    The connection is created with check_same_thread=False so its owner can
+    release() it (and others can interrupt it) from any thread.
+    """
+    db_path = path or DB_PATH
+    conn = _open(db_path, factory=ThreadConnection, check_same_thread=False)
+    _bound.conn, _bound.path = conn, db_path
+    return conn
+
+
+def unbind_thread_connection() -> None:
+    conn = getattr(_bound, "conn", None)
+    _bound.conn = _bound.path = None
+    if conn is not None:
+        conn.release()
+
+
+def init_db() -> None:
+    """
+    Initialize DB schema + indexes + seed demo data.
+
+    Note: Adjust columns if your Stage 2 design has extra fields,
+    but this schema is safe and supports all use cases.
+    Databases created by older versions are upgraded in place
+    (see src/repositories/migrations.py).
+    """
+    from src.repositories.migrations import migrate
+
+    conn = get_conn()
+    cur = conn.cursor()
+
+    cur.executescript("".join(TABLES.values()))
+    migrate(conn)
+    cur.executescript(INDEXES_SQL)
+    cur.executescript(TRIGGERS_SQL)
 
     # --- Seed demo data (only if empty users) ---
     n_users = cur.execute("SELECT COUNT(*) AS n FROM users;").fetchone()["n"]
@@ -181,7 +581,7 @@ def init_db() -> None:
                 pin_enabled, pin_code, status, created_at
             ) VALUES (?,?,?,?,?,?,?,?)
             """,
-            (class_id, "2026-01-01", "09:00", 60, 0, None, SessionStatus.OPEN.value, now().isoformat()),
+            (class_id, "2026-01-01", "09:00", 60, 0, None, SessionStatus.OPEN.code, now().isoformat()),
         )
 
     conn.commit()
@@ -4,6 +4,8 @@ import sqlite3
 from dataclasses import dataclass
 
 from src.repositories.db import get_conn
+from src.repositories.identity_map import IdentityMap, default_identity_map
+from src.repositories.transactions import run_write
 
 
 @dataclass
@@ -13,13 +15,22 @@ class EnrollmentRow:
 
 
 class EnrollmentRepo:
-    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+    def __init__(self, conn: sqlite3.Connection | None = None, identity_map: IdentityMap | None = None) -> None:
         self._external_conn = conn
+        # an external connection may hold uncommitted writes: only cache reads on our own connections
+        self._identity_map = identity_map or (default_identity_map() if conn is None else None)
 
     def _conn(self) -> sqlite3.Connection:
         return self._external_conn or get_conn()
 
     def get_by_id(self, class_id: int, student_id: int) -> EnrollmentRow | None:
+        if self._identity_map is not None:
+            return self._identity_map.get(
+                "enrollments", (class_id, student_id), lambda: self._fetch_by_id(class_id, student_id)
+            )
+        return self._fetch_by_id(class_id, student_id)
+
+    def _fetch_by_id(self, class_id: int, student_id: int) -> EnrollmentRow | None:
         conn = self._conn()
         row = conn.execute(
             "SELECT * FROM enrollments WHERE class_id=? AND student_id=?",
@@ -43,15 +54,15 @@ class EnrollmentRepo:
 
     def create(self, class_id: int, student_id: int) -> None:
         conn = self._conn()
-        conn.execute("INSERT INTO enrollments(class_id, student_id) VALUES (?,?)", (class_id, student_id))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("INSERT INTO enrollments(class_id, student_id) VALUES (?,?)", (class_id, student_id)))
         if self._external_conn is None:
             conn.close()
 
     def delete(self, class_id: int, student_id: int) -> None:
         conn = self._conn()
-        conn.execute("DELETE FROM enrollments WHERE class_id=? AND student_id=?", (class_id, student_id))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("DELETE FROM enrollments WHERE class_id=? AND student_id=?", (class_id, student_id)))
+        if self._identity_map is not None:
+            self._identity_map.invalidate("enrollments", (class_id, student_id))
         if self._external_conn is None:
             conn.close()
 
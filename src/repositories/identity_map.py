@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional, TypeVar
+
+from src.repositories import db
+
+DEFAULT_MAX_ENTRIES = 4096
+
+T = TypeVar("T")
+
+
+@dataclass
+class IdentityMapStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    stale: int = 0
+    evictions: int = 0
+    entries: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class IdentityMap:
+    """Bounded LRU of rows keyed by (table, primary key), shared by the repos that use it.
+
+    Repos drop their own rows on update/delete. Every other write (another
+    process, another repo, an ON DELETE CASCADE) is caught with
+    PRAGMA data_version on a dedicated watch connection: the value changes
+    whenever any other connection commits, and the whole map is then flushed.
+    Only rows that exist are cached, so inserts never need an invalidation.
+    """
+
+    def __init__(self, *, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, Hashable], object] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: dict[str, IdentityMapStats] = {}
+        self._watch: Optional[sqlite3.Connection] = None
+        self._watch_path: Optional[str] = None
+        self._data_version: Optional[int] = None
+        self._generation = 0   # bumped by every flush/invalidate; a load started before one is not stored
+
+    def get(self, table: str, key: Hashable, load: Callable[[], Optional[T]]) -> Optional[T]:
+        """Cached row for (table, key); on a miss `load()` runs outside the lock.
+
+        The loaded row is only stored if nothing was committed or invalidated
+        while it loaded; otherwise it may predate that write and is returned
+        uncached.
+        """
+        with self._lock:
+            self._check_fresh()
+            stats = self._table_stats(table)
+            row = self._entries.get((table, key))
+            if row is not None:
+                self._entries.move_to_end((table, key))
+                stats.hits += 1
+                return row  # type: ignore[return-value]
+            stats.misses += 1
+            generation = self._generation
+
+        row = load()
+        if row is not None:
+            with self._lock:
+                self._check_fresh()
+                if generation != self._generation:
+                    return row
+                self._entries[(table, key)] = row
+                while len(self._entries) > self.max_entries:
+                    (evicted_table, _), _ = self._entries.popitem(last=False)
+                    self._table_stats(evicted_table).evictions += 1
+        return row
+
+    def invalidate(self, table: str, key: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop((table, key), None) is not None:
+                self._table_stats(table).invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self, table: Optional[str] = None) -> IdentityMapStats:
+        """Counters for one table, or summed over all tables."""
+        with self._lock:
+            picked = [self._stats.get(table, IdentityMapStats())] if table else list(self._stats.values())
+            total = IdentityMapStats()
+            for s in picked:
+                total.hits += s.hits
+                total.misses += s.misses
+                total.invalidations += s.invalidations
+                total.stale += s.stale
+                total.evictions += s.evictions
+            total.entries = sum(1 for t, _ in self._entries if table is None or t == table)
+            return total
+
+    def close(self) -> None:
+        with self._lock:
+            if self._watch is not None:
+                self._watch.close()
+            self._watch = self._watch_path = self._data_version = None
+            self._generation += 1
+            self._entries.clear()
+
+    def _table_stats(self, table: str) -> IdentityMapStats:
+        stats = self._stats.get(table)
+        if stats is None:
+            stats = self._stats[table] = IdentityMapStats()
+        return stats
+
+    def _check_fresh(self) -> None:
+        """Flush everything if another connection committed since the last lookup. Caller holds the lock."""
+        path = str(db.DB_PATH)
+        if self._watch is None or self._watch_path != path:
+            if self._watch is not None:
+                self._watch.close()
+            self._watch = sqlite3.connect(path, check_same_thread=False)
+            self._watch_path = path
+            self._data_version = None
+        version = self._watch.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._generation += 1
+            if self._entries:
+                for table, _ in self._entries:
+                    self._table_stats(table).stale += 1
+                self._entries.clear()
+            self._data_version = version
+
+
+_default_map: Optional[IdentityMap] = None
+
+
+def default_identity_map() -> Optional[IdentityMap]:
+    """Process-wide map for ClassRepo/SessionRepo/EnrollmentRepo; SAS_IDENTITY_MAP_SIZE=0 turns it off."""
+    global _default_map
+    if _default_map is None:
+        size = int(os.environ.get("SAS_IDENTITY_MAP_SIZE", DEFAULT_MAX_ENTRIES))
+        if size <= 0:
+            return None
+        _default_map = IdentityMap(max_entries=size)
+    return _default_map
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from src.models.enums import AttendanceStatus, RequestStatus, SessionStatus
+from src.repositories import db
+
+
+@dataclass
+class MigrationReport:
+    from_version: int
+    to_version: int
+    applied: list[str] = field(default_factory=list)
+    size_before: int = 0
+    size_after: int = 0
+    scan_ms_before: float = 0.0
+    scan_ms_after: float = 0.0
+
+
+def _sql_encode(enum_cls: type, column: str) -> str:
+    """CASE expression mapping legacy string values to their integer codes."""
+    whens = " ".join(f"WHEN '{m.value}' THEN {m.code}" for m in enum_cls)
+    return f"CASE {column} {whens} END"
+
+
+def _column_type(conn: sqlite3.Connection, table: str, column: str) -> Optional[str]:
+    for row in conn.execute(f"PRAGMA table_info({table})"):
+        if row[1] == column:
+            return str(row[2]).upper()
+    return None
+
+
+def _rebuild(conn: sqlite3.Connection, table: str, select_sql: str) -> None:
+    """SQLite's create-copy-drop-rename table rebuild, using the current DDL from db.TABLES."""
+    ddl = db.TABLES[table].replace(f"CREATE TABLE IF NOT EXISTS {table} (", f"CREATE TABLE {table}__new (")
+    conn.execute(ddl)
+    conn.execute(f"INSERT INTO {table}__new {select_sql}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}__new RENAME TO {table}")
+
+
+def _m001_integer_status_codes(conn: sqlite3.Connection) -> None:
+    """TEXT status columns -> integer codes; enrollments -> WITHOUT ROWID."""
+    _rebuild(
+        conn,
+        "attendance_sessions",
+        f"""SELECT session_id, class_id, session_date, start_time, duration_min, pin_enabled, pin_code,
+                   {_sql_encode(SessionStatus, 'status')}, created_at
+            FROM attendance_sessions""",
+    )
+    _rebuild(
+        conn,
+        "attendance_records",
+        f"""SELECT record_id, session_id, student_id, {_sql_encode(AttendanceStatus, 'status')}, checkin_time, note
+            FROM attendance_records""",
+    )
+    _rebuild(
+        conn,
+        "absence_requests",
+        f"""SELECT request_id, student_id, session_id, request_type, reason, evidence_path,
+                   {_sql_encode(RequestStatus, 'status')}, lecturer_comment, created_at, updated_at
+            FROM absence_requests""",
+    )
+    _rebuild(conn, "enrollments", "SELECT class_id, student_id FROM enrollments")
+    conn.execute("DROP INDEX IF EXISTS idx_records_session_id")
+
+
+def _m002_query_plan_indexes(conn: sqlite3.Connection) -> None:
+    """idx_records_student_id is superseded by idx_records_student_session (created by init_db)."""
+    conn.execute("DROP INDEX IF EXISTS idx_records_student_id")
+
+
+def _m003_student_history(conn: sqlite3.Connection) -> None:
+    """Backfill student_history (created empty by init_db) from the existing records."""
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO student_history(student_id, session_date, start_time, session_id, class_id)
+        SELECT ar.student_id, s.session_date, s.start_time, s.session_id, s.class_id
+        FROM attendance_records ar
+        JOIN attendance_sessions s ON s.session_id = ar.session_id
+        """
+    )
+
+
+def _m004_daily_rollups(conn: sqlite3.Connection) -> None:
+    """Backfill daily_rollups (created empty by init_db) from the existing records."""
+    conn.execute("DELETE FROM daily_rollups")
+    conn.execute(f"INSERT INTO daily_rollups {db.DAILY_ROLLUPS_SELECT}")
+
+
+def _m005_audit_by_class(conn: sqlite3.Connection) -> None:
+    """audit_log gains class_id (the session's class when written), backfilled from attendance_sessions."""
+    if _column_type(conn, "audit_log", "class_id") is None:
+        conn.execute("ALTER TABLE audit_log ADD COLUMN class_id INTEGER NOT NULL DEFAULT 0")
+    conn.execute(
+        """
+        UPDATE audit_log SET class_id = s.class_id
+        FROM attendance_sessions s WHERE s.session_id = audit_log.session_id
+        """
+    )
+
+
+def _m006_scheduled_sessions(conn: sqlite3.Connection) -> None:
+    """Allow SessionStatus.SCHEDULED. Existing sessions keep their status (create_session still creates OPEN)."""
+    _rebuild(
+        conn,
+        "attendance_sessions",
+        """SELECT session_id, class_id, session_date, start_time, duration_min, pin_enabled, pin_code, status, created_at
+           FROM attendance_sessions""",
+    )
+
+
+def _m007_audit_by_student(conn: sqlite3.Connection) -> None:
+    """Drop idx_audit_class and audit_student_classes; init_db recreates idx_audit_student(student_id, audit_id)."""
+    conn.execute("DROP INDEX IF EXISTS idx_audit_class")
+    conn.execute("DROP TABLE IF EXISTS audit_student_classes")
+
+
+# (version, name, function) in order; each brings the schema to `version`.
+MIGRATIONS = [
+    (1, "integer_status_codes", _m001_integer_status_codes),
+    (2, "query_plan_indexes", _m002_query_plan_indexes),
+    (3, "student_history", _m003_student_history),
+    (4, "daily_rollups", _m004_daily_rollups),
+    (5, "audit_by_class", _m005_audit_by_class),
+    (6, "scheduled_sessions", _m006_scheduled_sessions),
+    (7, "audit_by_student", _m007_audit_by_student),
+]
+
+
+def needs_migration(conn: sqlite3.Connection) -> bool:
+    return conn.execute("PRAGMA user_version").fetchone()[0] < db.SCHEMA_VERSION
+
+
+def migrate(conn: sqlite3.Connection) -> list[str]:
+    """Bring the schema up to db.SCHEMA_VERSION. Returns the names of the migrations applied.
+
+    A database whose tables were just created from db.TABLES is already current
+    and is only stamped with the version. Triggers are dropped while tables are
+    rebuilt; the caller must re-run db.INDEXES_SQL and db.TRIGGERS_SQL afterwards.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= db.SCHEMA_VERSION:
+        return []
+
+    if version == 0 and _column_type(conn, "attendance_records", "status") == "INTEGER":
+        conn.execute(f"PRAGMA user_version = {db.SCHEMA_VERSION}")
+        return []
+
+    applied: list[str] = []
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = OFF")  # no-op inside a transaction, so set first
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        # Triggers reference the tables being rebuilt; the caller recreates them with the indexes.
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger'").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+        for target, name, fn in MIGRATIONS:
+            if target <= version:
+                continue
+            fn(conn)
+            applied.append(name)
+        problems = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if problems:
+            raise sqlite3.IntegrityError(f"Foreign key check failed after migration: {len(problems)} row(s)")
+        conn.execute(f"PRAGMA user_version = {db.SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+    return applied
+
+
+def _scan_ms(conn: sqlite3.Connection, repeat: int = 3) -> float:
+    """Best-of-N full scan of attendance_records grouped by status."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        conn.execute("SELECT status, COUNT(*) FROM attendance_records GROUP BY status").fetchall()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+def _db_size(path: Path) -> int:
+    return sum(os.path.getsize(p) for p in (str(path), f"{path}-wal") if os.path.exists(p))
+
+
+def migrate_with_report(path: Optional[Path] = None, *, vacuum: bool = True) -> MigrationReport:
+    """Migrate, then VACUUM, and measure file size and scan speed before/after."""
+    db_path = path or db.DB_PATH
+    conn = db.get_conn(db_path)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        report = MigrationReport(
+            from_version=conn.execute("PRAGMA user_version").fetchone()[0],
+            to_version=db.SCHEMA_VERSION,
+            size_before=_db_size(db_path),
+            scan_ms_before=_scan_ms(conn),
+        )
+        conn.executescript("".join(db.TABLES.values()))   # tables added since (backfilled below), as init_db does
+        report.applied = migrate(conn)
+        conn.executescript(db.INDEXES_SQL)
+        conn.executescript(db.TRIGGERS_SQL)
+        if vacuum:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")   # applied by this VACUUM on older files
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        report.size_after = _db_size(db_path)
+        report.scan_ms_after = _scan_ms(conn)
+    finally:
+        conn.close()
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Upgrade the SAS database schema")
+    parser.add_argument("--db", help="database path (default: data/sas.db)")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM after migrating")
+    args = parser.parse_args(argv)
+
+    path = Path(args.db) if args.db else db.DB_PATH
+    if not path.exists():
+        print(f"Database not found: {path}")
+        return 1
+    r = migrate_with_report(path, vacuum=not args.no_vacuum)
+    print(f"Schema version: {r.from_version} -> {r.to_version} ({', '.join(r.applied) or 'nothing to apply'})")
+    print(f"File size:      {r.size_before:,} -> {r.size_after:,} bytes")
+    print(f"Records scan:   {r.scan_ms_before:.1f} -> {r.scan_ms_after:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from src.models.enums import JobStatus
+from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
+
+
+@dataclass
+class ReportJobRow:
+    job_id: int
+    owner_id: Optional[int]
+    params: dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: int
+    progress_done: int
+    progress_total: int
+    cancel_requested: int
+    worker: Optional[str]
+    heartbeat_at: Optional[int]
+    result_paths: list[str]
+    error: Optional[str]
+    created_at: int
+    started_at: Optional[int]
+    finished_at: Optional[int]
+
+
+def _to_row(r: sqlite3.Row) -> ReportJobRow:
+    d = dict(r)
+    d["params"] = json.loads(d["params"])
+    d["status"] = JobStatus.decode(d["status"])
+    d["result_paths"] = json.loads(d["result_paths"]) if d["result_paths"] else []
+    return ReportJobRow(**d)
+
+
+_ACTIVE = (JobStatus.QUEUED.code, JobStatus.RUNNING.code)
+
+
+class ReportJobRepo:
+    """report_jobs is the queue itself: workers claim rows with a conditional UPDATE under BEGIN IMMEDIATE.
+
+    Every later write by the worker is fenced on (worker, RUNNING): once a job
+    was requeue_stale'd (and maybe claimed by another worker), the old worker's
+    writes match no row.
+    """
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        self._external_conn = conn
+
+    def _conn(self) -> sqlite3.Connection:
+        return self._external_conn or get_conn()
+
+    def create(self, *, owner_id: Optional[int], params: dict[str, Any], max_attempts: int, now: int) -> int:
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute(
+            """
+            INSERT INTO report_jobs(owner_id, params, status, max_attempts, run_after, created_at)
+            VALUES (?,?,?,?,?,?)
+            """,
+            (owner_id, json.dumps(params), JobStatus.QUEUED.code, max_attempts, now, now),
+        ))
+        if self._external_conn is None:
+            conn.close()
+        new_id = cur.lastrowid
+        if new_id is None:
+            raise RuntimeError("Insert failed: lastrowid is None")
+        return int(new_id)
+
+    def get_by_id(self, job_id: int) -> Optional[ReportJobRow]:
+        conn = self._conn()
+        row = conn.execute("SELECT * FROM report_jobs WHERE job_id=?", (job_id,)).fetchone()
+        if self._external_conn is None:
+            conn.close()
+        return _to_row(row) if row else None
+
+    def list_by_owner(self, owner_id: int, *, limit: int = 20) -> list[ReportJobRow]:
+        """Newest first."""
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT * FROM report_jobs WHERE owner_id=? ORDER BY job_id DESC LIMIT ?", (owner_id, limit)
+        ).fetchall()
+        if self._external_conn is None:
+            conn.close()
+        return [_to_row(r) for r in rows]
+
+    def count_active(self, owner_id: Optional[int] = None) -> dict[str, int]:
+        """{QUEUED: n, RUNNING: n} (optionally for one owner); finished jobs are not counted."""
+        sql = f"SELECT status, COUNT(*) FROM report_jobs WHERE status IN ({_ACTIVE[0]}, {_ACTIVE[1]})"
+        params: tuple = ()
+        if owner_id is not None:
+            sql += " AND owner_id=?"
+            params = (owner_id,)
+        conn = self._conn()
+        rows = conn.execute(sql + " GROUP BY status", params).fetchall()
+        if self._external_conn is None:
+            conn.close()
+        counts = {JobStatus.QUEUED.value: 0, JobStatus.RUNNING.value: 0}
+        counts.update({JobStatus.decode(s): n for s, n in rows})
+        return counts
+
+    def claim_next(self, worker: str, *, now: int) -> Optional[ReportJobRow]:
+        """Mark the oldest due QUEUED job RUNNING for `worker` and return it (None if the queue is empty)."""
+        conn = self._conn()
+
+        def claim() -> Optional[sqlite3.Row]:
+            row = conn.execute(
+                "SELECT job_id FROM report_jobs WHERE status=? AND run_after <= ? ORDER BY run_after, job_id LIMIT 1",
+                (JobStatus.QUEUED.code, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE report_jobs
+                SET status=?, worker=?, attempts=attempts + 1, started_at=?, heartbeat_at=?,
+                    progress_done=0, progress_total=0, error=NULL
+                WHERE job_id=?
+                """,
+                (JobStatus.RUNNING.code, worker, now, now, row[0]),
+            )
+            return conn.execute("SELECT * FROM report_jobs WHERE job_id=?", (row[0],)).fetchone()
+
+        row = run_write(conn, claim)
+        if self._external_conn is None:
+            conn.close()
+        return _to_row(row) if row else None
+
+    def set_progress(self, job_id: int, worker: str, done: int, total: int, *, now: int) -> Optional[bool]:
+        """Record progress (also the heartbeat). Returns whether cancellation was requested,
+        or None if `worker` no longer holds the job."""
+        conn = self._conn()
+        row = run_write(conn, lambda: conn.execute(
+            """
+            UPDATE report_jobs SET progress_done=?, progress_total=?, heartbeat_at=?
+            WHERE job_id=? AND worker=? AND status=?
+            RETURNING cancel_requested
+            """,
+            (done, total, now, job_id, worker, JobStatus.RUNNING.code),
+        ).fetchone())
+        if self._external_conn is None:
+            conn.close()
+        return bool(row[0]) if row else None
+
+    def heartbeat(self, job_id: int, worker: str, *, now: int) -> bool:
+        """False if `worker` no longer holds the job."""
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute(
+            "UPDATE report_jobs SET heartbeat_at=? WHERE job_id=? AND worker=? AND status=?",
+            (now, job_id, worker, JobStatus.RUNNING.code),
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return cur.rowcount > 0
+
+    def finish(
+        self, job_id: int, worker: str, status: str, *, now: int,
+        result_paths: Optional[list[str]] = None, error: Optional[str] = None,
+    ) -> bool:
+        """False (nothing written) if `worker` no longer holds the job."""
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute(
+            """
+            UPDATE report_jobs SET status=?, finished_at=?, heartbeat_at=NULL, result_paths=?, error=?
+            WHERE job_id=? AND worker=? AND status=?
+            """,
+            (JobStatus.encode(status), now, json.dumps(result_paths) if result_paths else None, error,
+             job_id, worker, JobStatus.RUNNING.code),
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return cur.rowcount > 0
+
+    def retry(self, job_id: int, worker: str, *, run_after: int, error: str) -> bool:
+        """Put a failed attempt back in the queue, due at `run_after`. False if `worker` no longer holds the job."""
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute(
+            """
+            UPDATE report_jobs SET status=?, run_after=?, worker=NULL, heartbeat_at=NULL, error=?
+            WHERE job_id=? AND worker=? AND status=?
+            """,
+            (JobStatus.QUEUED.code, run_after, error, job_id, worker, JobStatus.RUNNING.code),
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return cur.rowcount > 0
+
+    def request_cancel(self, job_id: int, *, now: int) -> Optional[str]:
+        """Cancel a QUEUED job at once; flag a RUNNING one for its worker. Returns the status afterwards."""
+        conn = self._conn()
+
+        def cancel() -> Optional[str]:
+            conn.execute(
+                "UPDATE report_jobs SET status=?, finished_at=? WHERE job_id=? AND status=?",
+                (JobStatus.CANCELLED.code, now, job_id, JobStatus.QUEUED.code),
+            )
+            conn.execute(
+                "UPDATE report_jobs SET cancel_requested=1 WHERE job_id=? AND status=?",
+                (job_id, JobStatus.RUNNING.code),
+            )
+            row = conn.execute("SELECT status FROM report_jobs WHERE job_id=?", (job_id,)).fetchone()
+            return JobStatus.decode(row[0]) if row else None
+
+        status = run_write(conn, cancel)
+        if self._external_conn is None:
+            conn.close()
+        return status
+
+    def requeue_stale(self, *, stale_before: int, now: int) -> int:
+        """RUNNING jobs whose heartbeat stopped (worker killed, console closed): requeue, or fail if out of attempts."""
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute(
+            """
+            UPDATE report_jobs
+            SET status = CASE WHEN cancel_requested THEN ? WHEN attempts >= max_attempts THEN ? ELSE ? END,
+                finished_at = CASE WHEN cancel_requested OR attempts >= max_attempts THEN ? END,
+                run_after = ?, worker = NULL, heartbeat_at = NULL,
+                error = COALESCE(error, 'worker stopped responding')
+            WHERE status=? AND heartbeat_at < ?
+            """,
+            (
+                JobStatus.CANCELLED.code, JobStatus.FAILED.code, JobStatus.QUEUED.code,
+                now, now, JobStatus.RUNNING.code, stale_before,
+            ),
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return cur.rowcount
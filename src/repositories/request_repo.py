@@ -4,7 +4,9 @@ import sqlite3
 from dataclasses import dataclass
 from typing import Optional
 
+from src.models.enums import RequestStatus
 from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
 
 
 @dataclass
@@ -21,6 +23,12 @@ class RequestRow:
     updated_at: str
 
 
+def _to_row(r: sqlite3.Row) -> RequestRow:
+    d = dict(r)
+    d["status"] = RequestStatus.decode(d["status"])
+    return RequestRow(**d)
+
+
 class RequestRepo:
     def __init__(self, conn: sqlite3.Connection | None = None) -> None:
         self._external_conn = conn
@@ -33,7 +41,7 @@ class RequestRepo:
         row = conn.execute("SELECT * FROM absence_requests WHERE request_id=?", (request_id,)).fetchone()
         if self._external_conn is None:
             conn.close()
-        return RequestRow(**dict(row)) if row else None
+        return _to_row(row) if row else None
 
     def list_by_filter(
         self,
@@ -51,7 +59,7 @@ class RequestRepo:
             params.append(student_id)
         if status is not None:
             clauses.append("status=?")
-            params.append(status)
+            params.append(RequestStatus.encode(status))
 
         where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
         sql = f"SELECT * FROM absence_requests {where} ORDER BY created_at DESC"
@@ -60,7 +68,7 @@ class RequestRepo:
         rows = conn.execute(sql, tuple(params)).fetchall()
         if self._external_conn is None:
             conn.close()
-        return [RequestRow(**dict(r)) for r in rows]
+        return [_to_row(r) for r in rows]
 
     def create(
         self,
@@ -75,16 +83,18 @@ class RequestRepo:
         updated_at: str,
     ) -> int:
         conn = self._conn()
-        cur = conn.execute(
+        cur = run_write(conn, lambda: conn.execute(
             """
             INSERT INTO absence_requests(
                 student_id, session_id, request_type, reason, evidence_path,
                 status, lecturer_comment, created_at, updated_at
             ) VALUES (?,?,?,?,?,?,?,?,?)
             """,
-            (student_id, session_id, request_type, reason, evidence_path, status, None, created_at, updated_at),
-        )
-        conn.commit()
+            (
+                student_id, session_id, request_type, reason, evidence_path,
+                RequestStatus.encode(status), None, created_at, updated_at,
+            ),
+        ))
         if self._external_conn is None:
             conn.close()
         new_id = cur.lastrowid
@@ -97,7 +107,7 @@ class RequestRepo:
         fields, params = [], []
         if status is not None:
             fields.append("status=?")
-            params.append(status)
+            params.append(RequestStatus.encode(status))
         if lecturer_comment is not None:
             fields.append("lecturer_comment=?")
             params.append(lecturer_comment)
@@ -109,14 +119,12 @@ class RequestRepo:
         params.append(request_id)
 
         conn = self._conn()
-        conn.execute(f"UPDATE absence_requests SET {', '.join(fields)} WHERE request_id=?", tuple(params))
-        conn.commit()
+        run_write(conn, lambda: conn.execute(f"UPDATE absence_requests SET {', '.join(fields)} WHERE request_id=?", tuple(params)))
         if self._external_conn is None:
             conn.close()
 
     def delete(self, request_id: int) -> None:
         conn = self._conn()
-        conn.execute("DELETE FROM absence_requests WHERE request_id=?", (request_id,))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("DELETE FROM absence_requests WHERE request_id=?", (request_id,)))
         if self._external_conn is None:
             conn.close()
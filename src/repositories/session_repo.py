@@ -4,7 +4,12 @@ import sqlite3
 from dataclasses import dataclass
 from typing import Optional
 
+from src.models.enums import SessionStatus
 from src.repositories.db import get_conn
+from src.repositories.identity_map import IdentityMap, default_identity_map
+from src.repositories.transactions import run_write
+
+_IN_CHUNK = 500   # ids per IN (...) list; older SQLite builds allow 999 variables
 
 
 @dataclass
@@ -20,19 +25,36 @@ class SessionRow:
     created_at: str
 
 
+def _to_row(r: sqlite3.Row) -> SessionRow:
+    d = dict(r)
+    d["status"] = SessionStatus.decode(d["status"])
+    return SessionRow(**d)
+
+
 class SessionRepo:
-    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+    def __init__(self, conn: sqlite3.Connection | None = None, identity_map: IdentityMap | None = None) -> None:
         self._external_conn = conn
+        # an external connection may hold uncommitted writes: only cache reads on our own connections
+        self._identity_map = identity_map or (default_identity_map() if conn is None else None)
 
     def _conn(self) -> sqlite3.Connection:
         return self._external_conn or get_conn()
 
+    def _forget(self, session_id: int) -> None:
+        if self._identity_map is not None:
+            self._identity_map.invalidate("attendance_sessions", session_id)
+
     def get_by_id(self, session_id: int) -> Optional[SessionRow]:
+        if self._identity_map is not None:
+            return self._identity_map.get("attendance_sessions", session_id, lambda: self._fetch_by_id(session_id))
+        return self._fetch_by_id(session_id)
+
+    def _fetch_by_id(self, session_id: int) -> Optional[SessionRow]:
         conn = self._conn()
         row = conn.execute("SELECT * FROM attendance_sessions WHERE session_id=?", (session_id,)).fetchone()
         if self._external_conn is None:
             conn.close()
-        return SessionRow(**dict(row)) if row else None
+        return _to_row(row) if row else None
 
     def list_by_filter(
         self,
@@ -48,7 +70,7 @@ class SessionRepo:
             params.append(class_id)
         if status is not None:
             clauses.append("status=?")
-            params.append(status)
+            params.append(SessionStatus.encode(status))
         if date_from is not None:
             clauses.append("session_date >= ?")
             params.append(date_from)
@@ -63,7 +85,16 @@ class SessionRepo:
         rows = conn.execute(sql, tuple(params)).fetchall()
         if self._external_conn is None:
             conn.close()
-        return [SessionRow(**dict(r)) for r in rows]
+        return [_to_row(r) for r in rows]
+
+    def count_by_status(self, status: str) -> int:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT COUNT(*) FROM attendance_sessions WHERE status=?", (SessionStatus.encode(status),)
+        ).fetchone()
+        if self._external_conn is None:
+            conn.close()
+        return int(row[0])
 
     def create(
         self,
@@ -78,16 +109,18 @@ class SessionRepo:
         created_at: str,
     ) -> int:
         conn = self._conn()
-        cur = conn.execute(
+        cur = run_write(conn, lambda: conn.execute(
             """
             INSERT INTO attendance_sessions(
                 class_id, session_date, start_time, duration_min,
                 pin_enabled, pin_code, status, created_at
             ) VALUES (?,?,?,?,?,?,?,?)
             """,
-            (class_id, session_date, start_time, duration_min, pin_enabled, pin_code, status, created_at),
-        )
-        conn.commit()
+            (
+                class_id, session_date, start_time, duration_min,
+                pin_enabled, pin_code, SessionStatus.encode(status), created_at,
+            ),
+        ))
         if self._external_conn is None:
             conn.close()
         new_id = cur.lastrowid
@@ -96,11 +129,47 @@ class SessionRepo:
         return int(new_id)
 
 
+    def create_many(self, rows: list[tuple[int, str, str, int, int, Optional[str], str, str]]) -> int:
+        """Insert (class_id, session_date, start_time, duration_min, pin_enabled, pin_code, status, created_at)
+        rows with one executemany (inside the caller's transaction, if any)."""
+        if not rows:
+            return 0
+        params = [(*r[:6], SessionStatus.encode(r[6]), r[7]) for r in rows]
+        conn = self._conn()
+        run_write(conn, lambda: conn.executemany(
+            """
+            INSERT INTO attendance_sessions(
+                class_id, session_date, start_time, duration_min,
+                pin_enabled, pin_code, status, created_at
+            ) VALUES (?,?,?,?,?,?,?,?)
+            """,
+            params,
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return len(params)
+
+    def list_keys(self, class_ids: list[int], *, date_from: str, date_to: str) -> set[tuple[int, str, str]]:
+        """(class_id, session_date, start_time) of existing sessions in the range: the UNIQUE key, for clash checks."""
+        if not class_ids:
+            return set()
+        conn = self._conn()
+        rows = conn.execute(
+            f"""
+            SELECT class_id, session_date, start_time FROM attendance_sessions
+            WHERE class_id IN ({','.join('?' * len(class_ids))}) AND session_date BETWEEN ? AND ?
+            """,
+            (*class_ids, date_from, date_to),
+        ).fetchall()
+        if self._external_conn is None:
+            conn.close()
+        return {(r[0], r[1], r[2]) for r in rows}
+
     def update(self, session_id: int, *, status: Optional[str] = None, pin_code: Optional[str] = None) -> None:
         fields, params = [], []
         if status is not None:
             fields.append("status=?")
-            params.append(status)
+            params.append(SessionStatus.encode(status))
         if pin_code is not None:
             fields.append("pin_code=?")
             params.append(pin_code)
@@ -109,14 +178,45 @@ class SessionRepo:
         params.append(session_id)
 
         conn = self._conn()
-        conn.execute(f"UPDATE attendance_sessions SET {', '.join(fields)} WHERE session_id=?", tuple(params))
-        conn.commit()
+        run_write(conn, lambda: conn.execute(f"UPDATE attendance_sessions SET {', '.join(fields)} WHERE session_id=?", tuple(params)))
+        self._forget(session_id)
+        if self._external_conn is None:
+            conn.close()
+
+    def set_status_many(self, session_ids: list[int], *, from_status: str, to_status: str) -> list[int]:
+        """Move the given sessions from one status to another in one transaction.
+
+        Returns the ids this call changed (those still in `from_status`).
+        """
+        if not session_ids:
+            return []
+        from_code, to_code = SessionStatus.encode(from_status), SessionStatus.encode(to_status)
+        conn = self._conn()
+
+        def write() -> list[int]:
+            changed: list[int] = []
+            for i in range(0, len(session_ids), _IN_CHUNK):
+                chunk = session_ids[i:i + _IN_CHUNK]
+                changed.extend(r[0] for r in conn.execute(
+                    f"""
+                    UPDATE attendance_sessions SET status=?
+                    WHERE session_id IN ({','.join('?' * len(chunk))}) AND status=?
+                    RETURNING session_id
+                    """,
+                    (to_code, *chunk, from_code),
+                ).fetchall())
+            return changed
+
+        changed = run_write(conn, write)
+        for sid in session_ids:
+            self._forget(sid)
         if self._external_conn is None:
             conn.close()
+        return changed
 
     def delete(self, session_id: int) -> None:
         conn = self._conn()
-        conn.execute("DELETE FROM attendance_sessions WHERE session_id=?", (session_id,))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("DELETE FROM attendance_sessions WHERE session_id=?", (session_id,)))
+        self._forget(session_id)
         if self._external_conn is None:
             conn.close()
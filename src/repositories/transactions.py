@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+from src.utils.metrics import default_registry
+
+# Retries after the busy timeout (db.BUSY_TIMEOUT_MS) has already expired once.
+WRITE_RETRIES = int(os.environ.get("SAS_WRITE_RETRIES", 5))
+BACKOFF_BASE_S = 0.01
+BACKOFF_CAP_S = 0.5
+
+T = TypeVar("T")
+
+
+class DatabaseBusyError(sqlite3.OperationalError):
+    """Another writer held the database lock through every retry."""
+
+
+@dataclass
+class WriteStats:
+    transactions: int = 0
+    retries: int = 0
+    busy_failures: int = 0
+    lock_wait_ms_total: float = 0.0
+    lock_wait_ms_max: float = 0.0
+
+    @property
+    def lock_wait_ms_mean(self) -> float:
+        return self.lock_wait_ms_total / self.transactions if self.transactions else 0.0
+
+
+_stats = WriteStats()
+_stats_lock = threading.Lock()
+
+_LOCK_WAIT = default_registry().histogram(
+    "sas_db_lock_wait_seconds", "Time write transactions waited for the database lock (busy timeout + backoff)")
+_WRITE_TIME = default_registry().histogram(
+    "sas_db_write_seconds", "Write transaction latency from BEGIN IMMEDIATE to COMMIT, including lock waits")
+
+
+def write_stats() -> WriteStats:
+    """Process-wide counters for run_write (a copy)."""
+    with _stats_lock:
+        return WriteStats(**vars(_stats))
+
+
+def reset_write_stats() -> None:
+    global _stats
+    with _stats_lock:
+        _stats = WriteStats()
+
+
+def _record(waited_s: float, elapsed_s: float, retries: int, *, failed: bool = False) -> None:
+    _LOCK_WAIT.observe(waited_s)
+    _WRITE_TIME.observe(elapsed_s)
+    waited_ms = waited_s * 1000
+    with _stats_lock:
+        _stats.transactions += 1
+        _stats.retries += retries
+        _stats.busy_failures += int(failed)
+        _stats.lock_wait_ms_total += waited_ms
+        _stats.lock_wait_ms_max = max(_stats.lock_wait_ms_max, waited_ms)
+
+
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def backoff_delay(attempt: int) -> float:
+    """Capped exponential backoff with +/-50% jitter so competing writers spread out."""
+    return min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def run_write(conn: sqlite3.Connection, fn: Callable[[], T], *, retries: int | None = None) -> T:
+    """Run `fn()` inside BEGIN IMMEDIATE ... COMMIT on `conn`, retrying while the database is busy.
+
+    Taking the write lock up front means a transaction never fails halfway
+    when upgrading from a read lock. `fn` must only issue SQL on `conn`: it is
+    re-run from scratch after a rollback. If `conn` is already inside a
+    transaction, the caller owns it and `fn` just runs as part of it.
+    Time spent waiting for the lock (busy timeout + backoff) is recorded in
+    write_stats().
+    """
+    if conn.in_transaction:
+        return fn()
+
+    retries = WRITE_RETRIES if retries is None else retries
+    waited = 0.0
+    started = time.perf_counter()
+    for attempt in range(retries + 1):
+        t0 = time.perf_counter()
+        locked = False
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            locked = True
+            waited += time.perf_counter() - t0
+            result = fn()
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not _is_busy(e):
+                raise
+            if not locked:
+                waited += time.perf_counter() - t0
+            if attempt == retries:
+                _record(waited, time.perf_counter() - started, attempt, failed=True)
+                raise DatabaseBusyError("Database is busy (another user is saving); please try again.") from e
+            delay = backoff_delay(attempt)
+            time.sleep(delay)
+            waited += delay
+            continue
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        _record(waited, time.perf_counter() - started, attempt)
+        return result
+    raise AssertionError("unreachable")
@@ -5,6 +5,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
 
 
 @dataclass
@@ -38,21 +39,18 @@ class UserRepo:
 
     def update_failed_attempts(self, user_id: int, failed_attempts: int) -> None:
         conn = self._conn()
-        conn.execute("UPDATE users SET failed_attempts=? WHERE user_id=?", (failed_attempts, user_id))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("UPDATE users SET failed_attempts=? WHERE user_id=?", (failed_attempts, user_id)))
         if self._external_conn is None:
             conn.close()
 
     def set_lock(self, user_id: int, locked_until_iso: Optional[str]) -> None:
         conn = self._conn()
-        conn.execute("UPDATE users SET locked_until=? WHERE user_id=?", (locked_until_iso, user_id))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("UPDATE users SET locked_until=? WHERE user_id=?", (locked_until_iso, user_id)))
         if self._external_conn is None:
             conn.close()
 
     def reset_login_state(self, user_id: int) -> None:
         conn = self._conn()
-        conn.execute("UPDATE users SET failed_attempts=0, locked_until=NULL WHERE user_id=?", (user_id,))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("UPDATE users SET failed_attempts=0, locked_until=NULL WHERE user_id=?", (user_id,)))
         if self._external_conn is None:
             conn.close()
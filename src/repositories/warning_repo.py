@@ -4,6 +4,7 @@ import sqlite3
 from dataclasses import dataclass
 
 from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
 
 
 @dataclass
@@ -52,11 +53,10 @@ class WarningRepo:
 
     def create(self, *, student_id: int, class_id: int, message: str, created_at: str) -> int:
         conn = self._conn()
-        cur = conn.execute(
+        cur = run_write(conn, lambda: conn.execute(
             "INSERT INTO warnings(student_id, class_id, message, created_at, seen) VALUES (?,?,?,?,0)",
             (student_id, class_id, message, created_at),
-        )
-        conn.commit()
+        ))
         if self._external_conn is None:
             conn.close()
         new_id = cur.lastrowid
@@ -65,16 +65,40 @@ class WarningRepo:
         return int(new_id)
 
 
+    def create_many(self, rows: list[tuple[int, int, str, str]]) -> int:
+        """Insert (student_id, class_id, message, created_at) rows in one transaction."""
+        if not rows:
+            return 0
+        conn = self._conn()
+        run_write(conn, lambda: conn.executemany(
+            "INSERT INTO warnings(student_id, class_id, message, created_at, seen) VALUES (?,?,?,?,0)",
+            rows,
+        ))
+        if self._external_conn is None:
+            conn.close()
+        return len(rows)
+
+    def list_keys(self, *, class_id: int | None = None) -> set[tuple[int, int, str]]:
+        """(student_id, class_id, message) triples of existing warnings, for dedupe."""
+        sql = "SELECT student_id, class_id, message FROM warnings"
+        params: tuple = ()
+        if class_id is not None:
+            sql += " WHERE class_id=?"
+            params = (class_id,)
+        conn = self._conn()
+        rows = conn.execute(sql, params).fetchall()
+        if self._external_conn is None:
+            conn.close()
+        return {(r["student_id"], r["class_id"], r["message"]) for r in rows}
+
     def update(self, warning_id: int, *, seen: int) -> None:
         conn = self._conn()
-        conn.execute("UPDATE warnings SET seen=? WHERE warning_id=?", (seen, warning_id))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("UPDATE warnings SET seen=? WHERE warning_id=?", (seen, warning_id)))
         if self._external_conn is None:
             conn.close()
 
     def delete(self, warning_id: int) -> None:
         conn = self._conn()
-        conn.execute("DELETE FROM warnings WHERE warning_id=?", (warning_id,))
-        conn.commit()
+        run_write(conn, lambda: conn.execute("DELETE FROM warnings WHERE warning_id=?", (warning_id,)))
         if self._external_conn is None:
             conn.close()
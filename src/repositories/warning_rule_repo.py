@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Optional
+
+from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
+
+
+@dataclass
+class WarningRuleRow:
+    rule_id: int
+    class_id: Optional[int]  # NULL = institution default
+    kind: str
+    threshold: float
+    enabled: int
+
+
+class WarningRuleRepo:
+    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+        self._external_conn = conn
+
+    def _conn(self) -> sqlite3.Connection:
+        return self._external_conn or get_conn()
+
+    def list_by_filter(self, *, class_id: int | None = None, enabled_only: bool = False) -> list[WarningRuleRow]:
+        clauses, params = [], []
+        if class_id is not None:
+            clauses.append("class_id=?")
+            params.append(class_id)
+        if enabled_only:
+            clauses.append("enabled=1")
+
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        conn = self._conn()
+        rows = conn.execute(f"SELECT * FROM warning_rules {where} ORDER BY class_id, rule_id", tuple(params)).fetchall()
+        if self._external_conn is None:
+            conn.close()
+        return [WarningRuleRow(**dict(r)) for r in rows]
+
+    def create(self, *, class_id: Optional[int], kind: str, threshold: float) -> int:
+        conn = self._conn()
+        cur = run_write(conn, lambda: conn.execute(
+            "INSERT INTO warning_rules(class_id, kind, threshold, enabled) VALUES (?,?,?,1)",
+            (class_id, kind, threshold),
+        ))
+        if self._external_conn is None:
+            conn.close()
+        new_id = cur.lastrowid
+        if new_id is None:
+            raise RuntimeError("Insert failed: lastrowid is None")
+        return int(new_id)
+
+    def update(self, rule_id: int, *, threshold: Optional[float] = None, enabled: Optional[int] = None) -> None:
+        fields, params = [], []
+        if threshold is not None:
+            fields.append("threshold=?")
+            params.append(threshold)
+        if enabled is not None:
+            fields.append("enabled=?")
+            params.append(enabled)
+        if not fields:
+            return
+        params.append(rule_id)
+        conn = self._conn()
+        run_write(conn, lambda: conn.execute(f"UPDATE warning_rules SET {', '.join(fields)} WHERE rule_id=?", tuple(params)))
+        if self._external_conn is None:
+            conn.close()
+
+    def delete(self, rule_id: int) -> None:
+        conn = self._conn()
+        run_write(conn, lambda: conn.execute("DELETE FROM warning_rules WHERE rule_id=?", (rule_id,)))
+        if self._external_conn is None:
+            conn.close()
@@ -1,11 +1,27 @@
 from __future__ import annotations
 
-from typing import Optional, Any
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
 
-from src.models.enums import AttendanceStatus
+from src.models.enums import AttendanceStatus, AuditAction
 from src.repositories.attendance_repo import AttendanceRepo
+from src.repositories.audit_repo import AuditEntry
 from src.repositories.session_repo import SessionRepo
 from src.repositories.enrollment_repo import EnrollmentRepo
+from src.services.audit_service import audited_write
+
+# Rows per transaction when importing (each batch commits with its audit entries).
+IMPORT_BATCH = 500
+# How exports write a missing note (ReportService.iter_detail_rows).
+_EMPTY_NOTES = ("", "-")
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)  # (row number, message)
 
 
 class AdminService:
@@ -34,19 +50,117 @@ class AdminService:
         )
         return [vars(r) for r in records]
 
-    def add_record(self, session_id: int, student_id: int, status: str, note: Optional[str] = None) -> int:
+    # Every change below commits together with its audit_log entry (actor_id = who made it).
+    def add_record(
+        self, session_id: int, student_id: int, status: str, note: Optional[str] = None, *, actor_id: Optional[int] = None
+    ) -> int:
         self._validate_record(session_id, student_id, status)
-        return self._attendance_repo.create(session_id=session_id, student_id=student_id, status=status, note=note)
 
-    def edit_record(self, session_id: int, student_id: int, status: str, note: Optional[str] = None) -> None:
+        def write(conn) -> tuple[int, list[AuditEntry]]:
+            record_id = AttendanceRepo(conn).create(session_id=session_id, student_id=student_id, status=status, note=note)
+            return record_id, [AuditEntry(
+                AuditAction.RECORD_ADD.value, session_id, student_id, after_status=status, after_note=note,
+            )]
+
+        return audited_write(actor_id, write)
+
+    def edit_record(
+        self, session_id: int, student_id: int, status: str, note: Optional[str] = None, *, actor_id: Optional[int] = None
+    ) -> None:
         self._validate_record(session_id, student_id, status)
-        rec = self._attendance_repo.get_by_session_student(session_id, student_id)
-        if not rec:
-            raise ValueError("Record not found.")
-        self._attendance_repo.update(session_id=session_id, student_id=student_id, status=status, note=note)
 
-    def delete_record(self, session_id: int, student_id: int) -> None:
-        self._attendance_repo.delete(session_id=session_id, student_id=student_id)
+        def write(conn) -> tuple[None, list[AuditEntry]]:
+            repo = AttendanceRepo(conn)
+            rec = repo.get_by_session_student(session_id, student_id)
+            if not rec:
+                raise ValueError("Record not found.")
+            repo.update(session_id=session_id, student_id=student_id, status=status, note=note)
+            return None, [AuditEntry(
+                AuditAction.RECORD_EDIT.value, session_id, student_id,
+                before_status=rec.status, after_status=status,
+                before_note=rec.note, after_note=rec.note if note is None else note,
+            )]
+
+        audited_write(actor_id, write)
+
+    def delete_record(self, session_id: int, student_id: int, *, actor_id: Optional[int] = None) -> None:
+        def write(conn) -> tuple[None, list[AuditEntry]]:
+            repo = AttendanceRepo(conn)
+            rec = repo.get_by_session_student(session_id, student_id)
+            if not rec:
+                return None, []
+            repo.delete(session_id=session_id, student_id=student_id)
+            return None, [AuditEntry(
+                AuditAction.RECORD_DELETE.value, session_id, student_id,
+                before_status=rec.status, before_note=rec.note,
+            )]
+
+        audited_write(actor_id, write)
+
+    def import_records(self, rows: Iterable[dict[str, Any]], *, actor_id: Optional[int] = None) -> ImportResult:
+        """Upsert attendance from dicts with session_id, student_id, status and optional note.
+
+        That is the shape of the detail export (CSV/JSONL), so an edited export
+        can be fed back in. Each row is validated like add_record; bad rows are
+        reported in `errors` and skipped. Valid rows are written IMPORT_BATCH at
+        a time, each batch in one transaction with its audit entries. Rows that
+        would not change anything are counted as unchanged and not written.
+        """
+        result = ImportResult()
+        batch: list[tuple[int, int, str, Optional[str]]] = []
+        for n, row in enumerate(rows, start=1):
+            try:
+                session_id, student_id = int(row["session_id"]), int(row["student_id"])
+                status = str(row["status"]).strip()
+                note = row.get("note")
+                note = None if note is None or str(note).strip() in _EMPTY_NOTES else str(note)
+                self._validate_record(session_id, student_id, status)
+            except (KeyError, TypeError, ValueError) as e:
+                result.errors.append((n, f"missing column {e}" if isinstance(e, KeyError) else str(e)))
+                continue
+            batch.append((session_id, student_id, status, note))
+            if len(batch) == IMPORT_BATCH:
+                self._import_batch(batch, actor_id, result)
+                batch = []
+        if batch:
+            self._import_batch(batch, actor_id, result)
+        return result
+
+    def _import_batch(
+        self, batch: list[tuple[int, int, str, Optional[str]]], actor_id: Optional[int], result: ImportResult
+    ) -> None:
+        def write(conn) -> tuple[tuple[int, int, int], list[AuditEntry]]:
+            repo = AttendanceRepo(conn)
+            inserted = updated = unchanged = 0
+            entries = []
+            for session_id, student_id, status, note in batch:
+                rec = repo.get_by_session_student(session_id, student_id)
+                if rec and rec.status == status and (note is None or note == rec.note):
+                    unchanged += 1
+                    continue
+                if not rec and status == AttendanceStatus.ABSENT.value and note is None:
+                    unchanged += 1   # reports already show a missing record as Absent
+                    continue
+                if rec:
+                    repo.update(session_id=session_id, student_id=student_id, status=status, note=note)
+                    updated += 1
+                    entries.append(AuditEntry(
+                        AuditAction.RECORD_EDIT.value, session_id, student_id,
+                        before_status=rec.status, after_status=status,
+                        before_note=rec.note, after_note=rec.note if note is None else note,
+                    ))
+                else:
+                    repo.create(session_id=session_id, student_id=student_id, status=status, note=note)
+                    inserted += 1
+                    entries.append(AuditEntry(
+                        AuditAction.RECORD_ADD.value, session_id, student_id, after_status=status, after_note=note,
+                    ))
+            return (inserted, updated, unchanged), entries
+
+        inserted, updated, unchanged = audited_write(actor_id, write)
+        result.inserted += inserted
+        result.updated += updated
+        result.unchanged += unchanged
 
     def _validate_record(self, session_id: int, student_id: int, status: str) -> None:
         if session_id <= 0 or student_id <= 0:
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+from src.models.enums import AttendanceStatus, SessionStatus
+from src.repositories.db import get_conn
+from src.repositories.enrollment_repo import EnrollmentRepo
+
+# int8 codes stored in the matrix are the on-disk codes; a missing record is Absent (0)
+STATUS_CODES: dict[str, int] = {s.value: s.code for s in AttendanceStatus}
+ABSENT, PRESENT, LATE, EXCUSED = (s.code for s in (
+    AttendanceStatus.ABSENT, AttendanceStatus.PRESENT, AttendanceStatus.LATE, AttendanceStatus.EXCUSED,
+))
+
+
+@dataclass
+class AttendanceMatrix:
+    """students x sessions int8 status matrix for one class."""
+    class_id: int
+    student_ids: np.ndarray   # (n_students,)
+    session_ids: np.ndarray   # (n_sessions,), chronological
+    session_dates: list[str]
+    codes: np.ndarray         # (n_students, n_sessions) int8
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.codes.shape
+
+    def counts(self, code: int) -> np.ndarray:
+        return (self.codes == code).sum(axis=1)
+
+    def attendance_rate(self) -> np.ndarray:
+        """(Present + Late) / sessions per student."""
+        n = self.codes.shape[1]
+        if n == 0:
+            return np.zeros(len(self.student_ids))
+        return ((self.codes == PRESENT) | (self.codes == LATE)).sum(axis=1) / n
+
+    def late_ratio(self) -> np.ndarray:
+        """Late / (Present + Late) per student (0 when never attended)."""
+        late = self.counts(LATE)
+        attended = late + self.counts(PRESENT)
+        return np.divide(late, attended, out=np.zeros(len(late), dtype=float), where=attended > 0)
+
+    def longest_absence_streak(self) -> np.ndarray:
+        absent = self.codes == ABSENT
+        n = absent.shape[1]
+        if n == 0:
+            return np.zeros(len(self.student_ids), dtype=np.int64)
+        idx = np.arange(n)
+        # index of the last non-absent session at or before each position (-1 = none yet)
+        last_reset = np.maximum.accumulate(np.where(absent, -1, idx), axis=1)
+        return np.where(absent, idx - last_reset, 0).max(axis=1)
+
+    def session_turnout(self) -> np.ndarray:
+        """Fraction of enrolled students Present or Late, per session."""
+        if len(self.student_ids) == 0:
+            return np.zeros(len(self.session_ids))
+        return ((self.codes == PRESENT) | (self.codes == LATE)).mean(axis=0)
+
+    def at_risk(self, *, limit: int = 10, max_rate: float = 0.8) -> list[dict[str, Any]]:
+        """Students below `max_rate` attendance, worst first (lowest rate, then longest streak)."""
+        rate = self.attendance_rate()
+        streak = self.longest_absence_streak()
+        absences = self.counts(ABSENT)
+        order = np.lexsort((-streak, rate))
+        out: list[dict[str, Any]] = []
+        for i in order:
+            if rate[i] >= max_rate or len(out) >= limit:
+                break
+            out.append({
+                "student_id": int(self.student_ids[i]),
+                "attendance_rate": round(float(rate[i]), 4),
+                "absences": int(absences[i]),
+                "longest_absence_streak": int(streak[i]),
+            })
+        return out
+
+
+def load_matrix(
+    class_id: int,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    conn: sqlite3.Connection | None = None,
+) -> AttendanceMatrix:
+    """Load a class's attendance with one query over sessions x enrollments.
+
+    Rows come back ordered session-major with the same student order in every
+    session block, so the flat code column reshapes straight into the matrix.
+    """
+    params: list[Any] = [ABSENT, class_id, SessionStatus.SCHEDULED.code]
+    date_sql = ""
+    if date_from is not None:
+        date_sql += " AND s.session_date >= ?"
+        params.append(date_from)
+    if date_to is not None:
+        date_sql += " AND s.session_date <= ?"
+        params.append(date_to)
+
+    c = conn or get_conn()
+    cur = c.cursor()
+    cur.row_factory = None  # plain tuples; ~1 row per matrix cell
+    rows = cur.execute(
+        f"""
+        SELECT s.session_id, s.session_date, e.student_id,
+               COALESCE(ar.status, ?) AS code
+        FROM attendance_sessions s
+        JOIN enrollments e ON e.class_id = s.class_id
+        LEFT JOIN attendance_records ar
+            ON ar.session_id = s.session_id AND ar.student_id = e.student_id
+        WHERE s.class_id = ? AND s.status <> ?{date_sql}
+        ORDER BY s.session_date, s.start_time, s.session_id, e.student_id
+        """,
+        tuple(params),
+    ).fetchall()
+    if conn is None:
+        c.close()
+
+    if not rows:
+        students = [e.student_id for e in EnrollmentRepo(conn).list_by_filter(class_id=class_id)]
+        return AttendanceMatrix(
+            class_id=class_id,
+            student_ids=np.array(students, dtype=np.int64),
+            session_ids=np.array([], dtype=np.int64),
+            session_dates=[],
+            codes=np.zeros((len(students), 0), dtype=np.int8),
+        )
+
+    first_session = rows[0][0]
+    n_students = next((i for i, r in enumerate(rows) if r[0] != first_session), len(rows))
+    n_sessions = len(rows) // n_students
+    codes = np.fromiter((r[3] for r in rows), dtype=np.int8, count=len(rows)).reshape(n_sessions, n_students).T
+    return AttendanceMatrix(
+        class_id=class_id,
+        student_ids=np.fromiter((r[2] for r in rows[:n_students]), dtype=np.int64, count=n_students),
+        session_ids=np.fromiter((r[0] for r in rows[::n_students]), dtype=np.int64, count=n_sessions),
+        session_dates=[r[1] for r in rows[::n_students]],
+        codes=np.ascontiguousarray(codes),
+    )
+
+
+def class_analytics(matrix: AttendanceMatrix, *, top: int = 10) -> dict[str, Any]:
+    """JSON-friendly analytics summary for one class."""
+    rate = matrix.attendance_rate()
+    turnout = matrix.session_turnout()
+    streak = matrix.longest_absence_streak()
+    return {
+        "class_id": matrix.class_id,
+        "students": int(matrix.shape[0]),
+        "sessions": int(matrix.shape[1]),
+        "mean_attendance_rate": round(float(rate.mean()), 4) if rate.size else 0.0,
+        "mean_late_ratio": round(float(matrix.late_ratio().mean()), 4) if rate.size else 0.0,
+        "max_absence_streak": int(streak.max()) if streak.size else 0,
+        "session_turnout": [
+            {"session_id": int(sid), "session_date": d, "turnout": round(float(t), 4)}
+            for sid, d, t in zip(matrix.session_ids, matrix.session_dates, turnout)
+        ],
+        "at_risk": matrix.at_risk(limit=top),
+    }
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+from src.repositories import db
+from src.services.attendance_service import AttendanceService
+from src.services.auth_service import AuthService
+from src.services.request_service import RequestService
+
+DEFAULT_WORKERS = 8
+# SQLite VM instructions between cancellation checks on a running statement
+PROGRESS_STEPS = 1000
+
+T = TypeVar("T")
+
+
+class _Job:
+    __slots__ = ("cancelled",)
+
+    def __init__(self) -> None:
+        self.cancelled = False
+
+
+class DbExecutor:
+    """Bounded pool of worker threads, each holding one SQLite connection.
+
+    Every get_conn() made by service code on a worker returns that worker's
+    connection. At most `max_workers` jobs are handed to the pool at a time;
+    other callers wait on an asyncio semaphore, so a timed-out or cancelled
+    coroutine that never started costs nothing. A job cancelled while running
+    is stopped by the connection's progress handler: its current (and any
+    later) statement fails with sqlite3.OperationalError("interrupted") and
+    the open transaction, if any, is rolled back.
+    """
+
+    def __init__(self, *, max_workers: int = DEFAULT_WORKERS, db_path: Optional[Path] = None) -> None:
+        self.max_workers = max_workers
+        self.db_path = db_path
+        self._conns: list[db.ThreadConnection] = []
+        self._conns_lock = threading.Lock()
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sas-db", initializer=self._init_worker
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _init_worker(self) -> None:
+        conn = db.bind_thread_connection(self.db_path)
+        conn.set_progress_handler(self._should_abort, PROGRESS_STEPS)
+        with self._conns_lock:
+            self._conns.append(conn)
+
+    def _should_abort(self) -> int:
+        job = getattr(self._local, "job", None)
+        return 1 if job is not None and job.cancelled else 0
+
+    def _execute(self, job: _Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        if job.cancelled:
+            raise asyncio.CancelledError()
+        self._local.job = job
+        conn = db.get_conn(self.db_path)
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, types.GeneratorType):
+                result = list(result)  # drain on the worker, never on the event loop
+            return result
+        finally:
+            self._local.job = None
+            if conn.in_transaction:
+                conn.rollback()
+
+    async def run(self, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+        """Run fn(*args, **kwargs) on a worker; raises TimeoutError / CancelledError like asyncio.wait_for."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        job = _Job()
+
+        async def _submit() -> T:
+            async with self._slots:
+                future = self._pool.submit(self._execute, job, fn, args, kwargs)
+                try:
+                    return await asyncio.wrap_future(future)
+                except asyncio.CancelledError:
+                    job.cancelled = True
+                    future.cancel()
+                    raise
+
+        return await asyncio.wait_for(_submit(), timeout)
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        if wait:
+            with self._conns_lock:
+                for conn in self._conns:
+                    conn.release()
+                self._conns.clear()
+
+    async def __aenter__(self) -> DbExecutor:
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+
+
+class AsyncServiceFacade:
+    """Awaitable versions of a synchronous service's public methods.
+
+    `await facade.method(*args, timeout=None, **kwargs)` runs `service.method`
+    on the executor. Generators (e.g. ReportService.iter_summary_rows) are
+    returned as lists.
+    """
+
+    def __init__(self, service: Any, executor: DbExecutor) -> None:
+        self._service = service
+        self._executor = executor
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self._service, name)
+        if not callable(method):
+            raise AttributeError(f"{type(self._service).__name__}.{name} is not a method")
+
+        async def call(*args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+            return await self._executor.run(method, *args, timeout=timeout, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+
+class AsyncServices:
+    """The service layer for asyncio callers, sharing one DbExecutor.
+
+        async with AsyncServices(max_workers=8) as svc:
+            result = await svc.auth.login("stu1", "123456", timeout=2)
+            roster = await svc.attendance.get_roster_for_session(5)
+    """
+
+    def __init__(self, *, max_workers: int = DEFAULT_WORKERS, db_path: Optional[Path] = None) -> None:
+        from src.services.report_service import ReportService  # pulls in report cache / exporters
+
+        self.executor = DbExecutor(max_workers=max_workers, db_path=db_path)
+        self.attendance = AsyncServiceFacade(AttendanceService(), self.executor)
+        self.requests = AsyncServiceFacade(RequestService(), self.executor)
+        self.reports = AsyncServiceFacade(ReportService(), self.executor)
+        self.auth = AsyncServiceFacade(AuthService(), self.executor)
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def __aenter__(self) -> AsyncServices:
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
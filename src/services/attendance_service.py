@@ -1,14 +1,41 @@
 from __future__ import annotations
 
+import time
+from dataclasses import dataclass, field
 from typing import Optional, Any
 from datetime import datetime
 
-from src.models.enums import AttendanceStatus, SessionStatus
+from src.models.enums import AttendanceStatus, AuditAction, SessionStatus
 from src.utils.validators import validate_pin, validate_date_range
 from src.repositories.session_repo import SessionRepo
 from src.repositories.attendance_repo import AttendanceRepo
 from src.repositories.enrollment_repo import EnrollmentRepo
+from src.repositories.audit_repo import AuditEntry, AuditRepo
 from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
+from src.services.audit_service import audited_write
+from src.utils.metrics import default_registry
+
+_CHECKINS = default_registry().counter("sas_checkins_total", "Student check-ins by outcome (ok, rejected)", ("result",))
+
+HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 500
+
+# (session_date, start_time, session_id) of the last row shown; the next page starts after it.
+HistoryCursor = tuple[str, str, int]
+
+
+@dataclass
+class HistoryPage:
+    rows: list[dict[str, Any]]
+    next_cursor: Optional[HistoryCursor]   # None = last page
+
+
+@dataclass
+class AttendanceTotals:
+    by_status: dict[str, int]                                            # every status, 0 if none
+    by_class: dict[int, dict[str, int]] = field(default_factory=dict)    # class_id -> status -> count
+    total: int = 0
 
 
 class AttendanceService:
@@ -23,36 +50,38 @@ class AttendanceService:
     # UC02: Student check-in
     # -----------------------
     def student_checkin(self, student_id: int, session_id: int, pin_input: Optional[str]) -> None:
-        session = self.session_repo.get_by_id(session_id)
-        if not session:
+        try:
+            self._checkin(student_id, session_id, pin_input)
+        except ValueError:
+            _CHECKINS.inc(labels=("rejected",))
+            raise
+        _CHECKINS.inc(labels=("ok",))
+
+    def _checkin(self, student_id: int, session_id: int, pin_input: Optional[str]) -> None:
+        # Checks and insert are one statement; the state is only read to explain a rejection.
+        now_s = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if self.attendance_repo.checkin(session_id, student_id, pin_input, checkin_time=now_s):
+            return
+
+        state = self.attendance_repo.get_checkin_state(session_id, student_id)
+        if not state:
             raise ValueError("Session does not exist.")
-        if session.status != SessionStatus.OPEN.value:
+        if state.status == SessionStatus.SCHEDULED.value:
+            raise ValueError("Session has not started yet.")
+        if state.status != SessionStatus.OPEN.value:
             raise ValueError("Session is not open.")
-
-        # Student must be enrolled in the class
-        if not self.enrollment_repo.get_by_id(session.class_id, student_id):
+        if not state.enrolled:
             raise ValueError("You are not enrolled in this class.")
-
-        # PIN validation if enabled
-        if int(session.pin_enabled) == 1:
+        if int(state.pin_enabled) == 1:
             if not pin_input:
                 raise ValueError("PIN is required.")
             validate_pin(pin_input)
-            if pin_input != (session.pin_code or ""):
+            if pin_input != (state.pin_code or ""):
                 raise ValueError("Invalid PIN.")
-
-        # Prevent duplicate
-        if self.attendance_repo.get_by_session_student(session_id, student_id):
+        if state.checked_in:
             raise ValueError("Already checked-in.")
-
-        now_s = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.attendance_repo.create(
-            session_id=session_id,
-            student_id=student_id,
-            status=AttendanceStatus.PRESENT.value,
-            checkin_time=now_s,
-            note=None,
-        )
+        # every check passed on the second read: the session was opened/enrolled in between
+        raise ValueError("Check-in failed, please try again.")
 
     # -----------------------
     # UC03: View Attendance
@@ -88,7 +117,7 @@ class AttendanceService:
                 s.session_date,
                 s.start_time,
                 s.class_id,
-                ar.status,
+                {AttendanceStatus.sql_label('ar.status')} AS status,
                 COALESCE(ar.note,'-') AS note
             FROM attendance_records ar
             JOIN attendance_sessions s ON ar.session_id = s.session_id
@@ -101,15 +130,125 @@ class AttendanceService:
 
         return [dict(r) for r in rows]
 
+    def student_history_page(
+        self,
+        student_id: int,
+        *,
+        class_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        cursor: Optional[HistoryCursor] = None,
+        limit: int = HISTORY_PAGE_SIZE,
+    ) -> HistoryPage:
+        """One page of list_student_attendance, newest first (keyset on session date/time).
+
+        Rows come from student_history in primary-key order, so a page costs
+        `limit` index steps however long the student's history is. With
+        `class_id`, rows of the student's other classes are skipped on the way.
+        """
+        validate_date_range(date_from, date_to)
+        if not 1 <= limit <= MAX_HISTORY_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_HISTORY_PAGE_SIZE}")
+
+        where, params = self._history_filter(student_id, class_id, date_from, date_to)
+        if cursor is not None:
+            where.append("(h.session_date, h.start_time, h.session_id) < (?, ?, ?)")
+            params.extend(cursor)
+        params.append(limit + 1)   # one extra row tells whether another page exists
+
+        conn = get_conn()
+        rows = conn.execute(
+            f"""
+            SELECT
+                h.session_id,
+                h.session_date,
+                h.start_time,
+                h.class_id,
+                {AttendanceStatus.sql_label('ar.status')} AS status,
+                COALESCE(ar.note,'-') AS note
+            FROM student_history h
+            JOIN attendance_records ar ON ar.session_id = h.session_id AND ar.student_id = h.student_id
+            WHERE {' AND '.join(where)}
+            ORDER BY h.session_date DESC, h.start_time DESC, h.session_id DESC
+            LIMIT ?
+            """,
+            tuple(params),
+        ).fetchall()
+        conn.close()
+
+        page = [dict(r) for r in rows[:limit]]
+        last = page[-1] if len(rows) > limit else None
+        return HistoryPage(page, (last["session_date"], last["start_time"], last["session_id"]) if last else None)
+
+    def student_attendance_totals(
+        self,
+        student_id: int,
+        *,
+        class_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> AttendanceTotals:
+        """Per-status and per-class counts over the same rows as student_history_page, in one GROUP BY."""
+        validate_date_range(date_from, date_to)
+        where, params = self._history_filter(student_id, class_id, date_from, date_to)
+
+        conn = get_conn()
+        rows = conn.execute(
+            f"""
+            SELECT h.class_id, ar.status, COUNT(*) AS n
+            FROM student_history h
+            JOIN attendance_records ar ON ar.session_id = h.session_id AND ar.student_id = h.student_id
+            WHERE {' AND '.join(where)}
+            GROUP BY h.class_id, ar.status
+            """,
+            tuple(params),
+        ).fetchall()
+        conn.close()
+
+        totals = AttendanceTotals(by_status={s.value: 0 for s in AttendanceStatus})
+        for class_id_, code, n in rows:
+            status = AttendanceStatus.decode(code)
+            per_class = totals.by_class.setdefault(class_id_, {s.value: 0 for s in AttendanceStatus})
+            per_class[status] += n
+            totals.by_status[status] += n
+            totals.total += n
+        return totals
+
+    @staticmethod
+    def _history_filter(
+        student_id: int, class_id: Optional[int], date_from: Optional[str], date_to: Optional[str]
+    ) -> tuple[list[str], list[Any]]:
+        where, params = ["h.student_id = ?"], [student_id]
+        if class_id is not None:
+            where.append("h.class_id = ?")
+            params.append(class_id)
+        if date_from is not None:
+            where.append("h.session_date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            where.append("h.session_date <= ?")
+            params.append(date_to)
+        return where, params
+
     # -----------------------
     # UC07: Lecturer record attendance
     # -----------------------
-    def update_status(self, session_id: int, student_id: int, status: str, note: Optional[str] = None) -> None:
+    def update_status(
+        self,
+        session_id: int,
+        student_id: int,
+        status: str,
+        note: Optional[str] = None,
+        *,
+        actor_id: Optional[int] = None,
+    ) -> None:
         session = self.session_repo.get_by_id(session_id)
         if not session:
             raise ValueError("Session not found.")
         if session.status == SessionStatus.CLOSED.value:
             raise ValueError("Cannot update attendance. Session is closed.")
+        if session.status == SessionStatus.SCHEDULED.value:
+            raise ValueError("Cannot update attendance. Session has not started yet.")
 
         # Student must be enrolled
         if not self.enrollment_repo.get_by_id(session.class_id, student_id):
@@ -119,38 +258,52 @@ class AttendanceService:
         if status not in allowed:
             raise ValueError(f"Invalid status. Allowed: {', '.join(sorted(allowed))}.")
 
-        rec = self.attendance_repo.get_by_session_student(session_id, student_id)
-        if rec:
-            self.attendance_repo.update(session_id, student_id, status=status, note=note)
-        else:
-            self.attendance_repo.create(
-                session_id=session_id,
-                student_id=student_id,
-                status=status,
-                checkin_time=None,
-                note=note,
+        def write(conn) -> tuple[None, list[AuditEntry]]:
+            repo = AttendanceRepo(conn)
+            rec = repo.get_by_session_student(session_id, student_id)
+            if rec:
+                repo.update(session_id, student_id, status=status, note=note)
+            else:
+                repo.create(
+                    session_id=session_id,
+                    student_id=student_id,
+                    status=status,
+                    checkin_time=None,
+                    note=note,
+                )
+            entry = AuditEntry(
+                AuditAction.STATUS_UPDATE.value, session_id, student_id,
+                before_status=rec.status if rec else None, after_status=status,
+                before_note=rec.note if rec else None,
+                after_note=note if note is not None or not rec else rec.note,
             )
+            return None, [entry]
+
+        audited_write(actor_id, write)
 
-    def mark_all_present(self, session_id: int) -> None:
+    def mark_all_present(self, session_id: int, *, actor_id: Optional[int] = None) -> None:
         session = self.session_repo.get_by_id(session_id)
         if not session:
             raise ValueError("Session not found.")
         if session.status == SessionStatus.CLOSED.value:
             raise ValueError("Cannot mark attendance. Session is closed.")
+        if session.status == SessionStatus.SCHEDULED.value:
+            raise ValueError("Cannot mark attendance. Session has not started yet.")
 
-        enrollments = self.enrollment_repo.list_by_filter(class_id=session.class_id)
-        for e in enrollments:
-            rec = self.attendance_repo.get_by_session_student(session_id, e.student_id)
-            if rec:
-                self.attendance_repo.update(session_id, e.student_id, status=AttendanceStatus.PRESENT.value)
-            else:
-                self.attendance_repo.create(
-                    session_id=session_id,
-                    student_id=e.student_id,
-                    status=AttendanceStatus.PRESENT.value,
-                    checkin_time=None,
-                    note=None,
+        present = AttendanceStatus.PRESENT.value
+        conn = get_conn()
+        try:
+            def write() -> None:
+                # set-based: the audit rows are selected from the "before" state, then the roster is written
+                AuditRepo(conn).create_roster_changes(
+                    session_id, session.class_id, action=AuditAction.MARK_ALL_PRESENT.value,
+                    after_status=present, actor_id=actor_id, at=int(time.time()),
                 )
+                AttendanceRepo(conn).set_status_for_roster(session_id, session.class_id, present)
+
+            run_write(conn, write)
+        finally:
+            conn.close()
 
     def get_roster_for_session(self, session_id: int) -> list[dict[str, Any]]:
         session = self.session_repo.get_by_id(session_id)
@@ -159,11 +312,11 @@ class AttendanceService:
 
         conn = get_conn()
         rows = conn.execute(
-            """
+            f"""
             SELECT
                 u.user_id AS student_id,
                 COALESCE(u.full_name, u.username) AS student_name,
-                COALESCE(ar.status, ?) AS status
+                {AttendanceStatus.sql_label('COALESCE(ar.status, ?)')} AS status
             FROM enrollments e
             JOIN users u ON e.student_id = u.user_id
             LEFT JOIN attendance_records ar
@@ -171,7 +324,7 @@ class AttendanceService:
             WHERE e.class_id = ?
             ORDER BY u.full_name, u.username
             """,
-            (AttendanceStatus.ABSENT.value, session_id, session.class_id),
+            (AttendanceStatus.ABSENT.code, session_id, session.class_id),
         ).fetchall()
         conn.close()
         return [dict(r) for r in rows]
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional, TypeVar
+
+from src.repositories.audit_repo import AuditEntry, AuditRepo
+from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+T = TypeVar("T")
+
+
+def audited_write(actor_id: Optional[int], fn: Callable[[sqlite3.Connection], tuple[T, list[AuditEntry]]]) -> T:
+    """Run `fn(conn)` in one write transaction and append the audit entries it returns to that transaction.
+
+    `fn` reads the "before" state and writes through repos built on `conn`;
+    the change and its audit entries commit (or roll back) together.
+    """
+    conn = get_conn()
+    try:
+        def write() -> T:
+            result, entries = fn(conn)
+            AuditRepo(conn).create_many(entries, actor_id=actor_id, at=int(time.time()))
+            return result
+
+        return run_write(conn, write)
+    finally:
+        conn.close()
+
+
+@dataclass
+class AuditPage:
+    rows: list[dict[str, Any]]
+    next_cursor: Optional[int]   # pass as `cursor` for the next (older) page; None = last page
+
+
+class AuditService:
+    """Read side of the audit log: who changed which attendance record, and from what to what."""
+
+    def __init__(self) -> None:
+        self.audit_repo = AuditRepo()
+
+    def history(
+        self,
+        *,
+        student_id: Optional[int] = None,
+        session_id: Optional[int] = None,
+        actor_id: Optional[int] = None,
+        cursor: Optional[int] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> AuditPage:
+        """Entries newest first, filtered by student, session and/or actor (keyset pagination on audit_id)."""
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        rows = self.audit_repo.list_page(
+            student_id=student_id,
+            session_id=session_id,
+            actor_id=actor_id,
+            before_id=cursor,
+            limit=limit + 1,   # one extra row tells whether another page exists
+        )
+        more = len(rows) > limit
+        rows = rows[:limit]
+        out = []
+        for r in rows:
+            d = dict(vars(r))
+            d["at"] = datetime.fromtimestamp(r.at).strftime("%Y-%m-%d %H:%M:%S")
+            out.append(d)
+        return AuditPage(out, rows[-1].audit_id if more else None)
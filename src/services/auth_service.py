@@ -5,12 +5,17 @@ from datetime import datetime
 from typing import Optional
 
 from src.repositories.user_repo import UserRepo, UserRow
+from src.utils.metrics import default_registry
 from src.utils.security import verify_password
 from src.utils.time_utils import now, minutes_from_now
 
 LOCK_AFTER_FAILS = 5
 LOCK_MINUTES = 10
 
+_LOGINS = default_registry().counter(
+    "sas_login_attempts_total", "Login attempts by outcome (ok, bad_password, unknown_user, locked)", ("result",))
+_LOCKOUTS = default_registry().counter("sas_account_lockouts_total", "Accounts locked after too many failed logins")
+
 
 @dataclass
 class AuthResult:
@@ -28,6 +33,7 @@ class AuthService:
     def login(self, username: str, password: str) -> AuthResult:
         user = self.user_repo.get_by_username(username)
         if not user:
+            _LOGINS.inc(labels=("unknown_user",))
             return AuthResult(False, "Username or password is incorrect.")
 
         # If locked, refuse login until lock expires
@@ -35,23 +41,28 @@ class AuthService:
             try:
                 locked_until = datetime.fromisoformat(user.locked_until)
                 if locked_until > now():
+                    _LOGINS.inc(labels=("locked",))
                     return AuthResult(False, f"Account is locked until {locked_until.isoformat(sep=' ', timespec='minutes')}.")
             except Exception:
+                _LOGINS.inc(labels=("locked",))
                 return AuthResult(False, "Account is locked. Please contact administrator.")
 
         # Verify password
         if not verify_password(password, user.password_hash):
             fails = user.failed_attempts + 1
+            _LOGINS.inc(labels=("bad_password",))
             self.user_repo.update_failed_attempts(user.user_id, fails)
 
             if fails >= LOCK_AFTER_FAILS:
                 locked_until = minutes_from_now(LOCK_MINUTES).isoformat()
                 self.user_repo.set_lock(user.user_id, locked_until)
+                _LOCKOUTS.inc()
                 return AuthResult(False, f"Too many failed attempts. Account locked for {LOCK_MINUTES} minutes.")
 
             return AuthResult(False, f"Username or password is incorrect. ({fails}/{LOCK_AFTER_FAILS})")
 
         # Success: reset fail/lock state
         self.user_repo.reset_login_state(user.user_id)
+        _LOGINS.inc(labels=("ok",))
         user = self.user_repo.get_by_username(username)
         return AuthResult(True, "Login successful.", user=user)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from src.models.enums import AttendanceStatus, ChangeOp, ChangeTable, RequestStatus, SessionStatus
+from src.repositories.change_log_repo import ChangeLogRepo, ChangeRow
+from src.repositories.db import get_conn
+from src.utils.time_utils import now
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+# Current state of a changed row, statuses as their string values. class_id is
+# included everywhere so integrations can route changes per class.
+_ROW_SQL = {
+    ChangeTable.RECORDS: f"""
+        SELECT ar.record_id, ar.session_id, s.class_id, ar.student_id,
+               {AttendanceStatus.sql_label('ar.status')} AS status, ar.checkin_time, ar.note
+        FROM attendance_records ar
+        JOIN attendance_sessions s ON s.session_id = ar.session_id
+        WHERE ar.record_id IN ({{marks}})
+    """,
+    ChangeTable.REQUESTS: f"""
+        SELECT r.request_id, r.student_id, r.session_id, s.class_id, r.request_type, r.reason,
+               r.evidence_path, {RequestStatus.sql_label('r.status')} AS status, r.lecturer_comment,
+               r.created_at, r.updated_at
+        FROM absence_requests r
+        JOIN attendance_sessions s ON s.session_id = r.session_id
+        WHERE r.request_id IN ({{marks}})
+    """,
+    ChangeTable.SESSIONS: f"""
+        SELECT session_id, class_id, session_date, start_time, duration_min, pin_enabled,
+               {SessionStatus.sql_label('status')} AS status, created_at
+        FROM attendance_sessions
+        WHERE session_id IN ({{marks}})
+    """,
+}
+
+
+class ChangesCompacted(ValueError):
+    """The entries right after a cursor were removed by compact(); the consumer must resync."""
+
+
+@dataclass
+class Change:
+    seq: int
+    table: str
+    op: str
+    row_id: int
+    changed_at: int
+    row: Optional[dict[str, Any]]   # current state; None once the row is gone
+
+
+@dataclass
+class ChangeBatch:
+    changes: list[Change]
+    cursor: int       # pass back to changes_since() / ack() after processing
+    has_more: bool
+
+
+class ChangeFeedService:
+    """Incremental feed of writes to attendance records, absence requests and sessions.
+
+    Triggers append (table, op, key) to change_log in the writing transaction,
+    so a committed change is never missing from the feed and a rolled-back one
+    never appears. Entries carry the row's *current* state: a consumer that
+    applies them in order converges on the database, and several updates to
+    one row simply repeat the latest values.
+
+    Typical consumer:
+        feed.register("lms")                 # cursor = head
+        ... full export once ...
+        batch = feed.changes_since(feed.cursor_for("lms"))
+        ... apply batch.changes ...
+        feed.ack("lms", batch.cursor)
+    and, periodically, feed.compact() to drop what every consumer has acked.
+    """
+
+    def __init__(self) -> None:
+        self.repo = ChangeLogRepo()
+
+    def head(self) -> int:
+        return self.repo.head()
+
+    def changes_since(self, cursor: int, limit: int = DEFAULT_LIMIT, *, with_rows: bool = True) -> ChangeBatch:
+        """Up to `limit` changes with seq > cursor, oldest first."""
+        if cursor < 0:
+            raise ValueError("cursor must be >= 0")
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+
+        conn = get_conn()
+        try:
+            # one read snapshot: a commit landing between the reads cannot look like a hole
+            began = not conn.in_transaction
+            if began:
+                conn.execute("BEGIN")
+            try:
+                repo = ChangeLogRepo(conn)
+                if cursor < repo.compacted_through():
+                    raise ChangesCompacted(f"Changes after cursor {cursor} were already compacted; resync with a full export.")
+                entries = repo.list_since(cursor, limit)
+                rows = self._current_rows(conn, entries) if with_rows else {}
+            finally:
+                if began:
+                    conn.commit()
+        finally:
+            conn.close()
+        changes = [
+            Change(e.seq, e.table, e.op, e.row_id, e.changed_at, rows.get((e.table, e.row_id)))
+            for e in entries
+        ]
+        return ChangeBatch(changes, entries[-1].seq if entries else cursor, len(entries) == limit)
+
+    def iter_changes(self, cursor: int, *, batch_size: int = DEFAULT_LIMIT) -> Iterator[ChangeBatch]:
+        """Batches from `cursor` up to the current end of the log."""
+        while True:
+            batch = self.changes_since(cursor, batch_size)
+            if batch.changes:
+                yield batch
+            if not batch.has_more:
+                return
+            cursor = batch.cursor
+
+    def register(self, consumer: str, *, cursor: Optional[int] = None) -> int:
+        """Create (or reset) a consumer at `cursor`, default the current head. Returns the cursor."""
+        if not consumer.strip():
+            raise ValueError("Consumer name is required.")
+        start = self.repo.head() if cursor is None else cursor
+        self._check_cursor(start)
+        self.repo.set_cursor(consumer, start, updated_at=now().isoformat())
+        return start
+
+    def cursor_for(self, consumer: str) -> int:
+        row = self.repo.get_consumer(consumer)
+        if not row:
+            raise ValueError(f"Unknown consumer '{consumer}'.")
+        return row.cursor
+
+    def ack(self, consumer: str, cursor: int) -> None:
+        """Record that `consumer` has applied every change up to and including `cursor`."""
+        current = self.cursor_for(consumer)
+        self._check_cursor(cursor)
+        if cursor < current:
+            raise ValueError(f"Cursor cannot move backwards ({cursor} < {current}).")
+        self.repo.set_cursor(consumer, cursor, updated_at=now().isoformat())
+
+    def unregister(self, consumer: str) -> None:
+        self.repo.delete_consumer(consumer)
+
+    def compact(self) -> int:
+        """Delete entries acknowledged by every registered consumer. Returns how many were removed."""
+        consumers = self.repo.list_consumers()
+        if not consumers:
+            return 0
+        return self.repo.delete_through(min(c.cursor for c in consumers))
+
+    def _check_cursor(self, cursor: int) -> None:
+        if cursor < 0 or cursor > self.repo.head():
+            raise ValueError(f"Cursor {cursor} is outside the change log (0..{self.repo.head()}).")
+
+    def _current_rows(self, conn: sqlite3.Connection, entries: list[ChangeRow]) -> dict[tuple[str, int], dict[str, Any]]:
+        keys: dict[ChangeTable, set[int]] = {}
+        for e in entries:
+            if e.op != ChangeOp.DELETE.value:
+                keys.setdefault(ChangeTable(e.table), set()).add(e.row_id)
+
+        rows: dict[tuple[str, int], dict[str, Any]] = {}
+        for table, ids in keys.items():
+            sql = _ROW_SQL[table].format(marks=",".join("?" * len(ids)))
+            for r in conn.execute(sql, tuple(ids)):
+                rows[(table.value, r[0])] = dict(r)
+        return rows
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from src.models.enums import AttendanceStatus, ChangeOp, ChangeTable, SessionStatus
+from src.repositories.change_log_repo import ChangeLogRepo
+from src.repositories.db import get_conn
+from src.repositories.session_repo import SessionRepo
+
+# Statuses that count as "arrived" (checked in or marked in by the lecturer).
+ARRIVED = (AttendanceStatus.PRESENT.value, AttendanceStatus.LATE.value)
+# Students without a record are shown as Absent, like get_roster_for_session.
+NO_RECORD = AttendanceStatus.ABSENT.value
+
+
+@dataclass
+class RosterEntry:
+    student_id: int
+    student_name: str
+    status: str
+    record_id: Optional[int] = None
+    checkin_time: Optional[str] = None
+
+
+@dataclass
+class RosterDelta:
+    changed: list[RosterEntry] = field(default_factory=list)
+    arrivals: list[RosterEntry] = field(default_factory=list)   # subset of `changed`: now Present/Late
+    reloaded: bool = False        # the change log had been compacted past our cursor; roster re-read in full
+    session_closed: bool = False
+
+
+class LiveRoster:
+    """Roster of one session that is read once, then kept current from the change log.
+
+    load() runs the full enrollments x users x records join (sorted by name)
+    and notes the change-log head in the same read snapshot. poll() then
+    walks the change_log entries after that cursor and looks up each
+    record by id, keeping this session's; edits and deletes are caught as well as new check-ins. The order never changes
+    (enrollment does not change during a session), so nothing is re-sorted.
+    """
+
+    def __init__(self, session_id: int) -> None:
+        self.session_id = session_id
+        self.session_repo = SessionRepo()
+        self.entries: list[RosterEntry] = []
+        self.cursor = 0
+        self.session_status: Optional[str] = None
+        self.loaded_at = 0.0
+        self.arrivals_since_load = 0
+        self._by_student: dict[int, RosterEntry] = {}
+        self._by_record: dict[int, RosterEntry] = {}
+
+    def load(self) -> list[RosterEntry]:
+        session = self.session_repo.get_by_id(self.session_id)
+        if not session:
+            raise ValueError("Session not found.")
+        self.session_status = session.status
+
+        conn = get_conn()
+        try:
+            conn.execute("BEGIN")   # one snapshot: no change can fall between the head and the roster
+            cursor = ChangeLogRepo(conn).head()
+            rows = conn.execute(
+                f"""
+                SELECT
+                    u.user_id AS student_id,
+                    COALESCE(u.full_name, u.username) AS student_name,
+                    {AttendanceStatus.sql_label('COALESCE(ar.status, ?)')} AS status,
+                    ar.record_id,
+                    ar.checkin_time
+                FROM enrollments e
+                JOIN users u ON e.student_id = u.user_id
+                LEFT JOIN attendance_records ar
+                    ON ar.session_id = ? AND ar.student_id = u.user_id
+                WHERE e.class_id = ?
+                ORDER BY u.full_name, u.username
+                """,
+                (AttendanceStatus.ABSENT.code, self.session_id, session.class_id),
+            ).fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+
+        self.entries = [RosterEntry(**dict(r)) for r in rows]
+        self._by_student = {e.student_id: e for e in self.entries}
+        self._by_record = {e.record_id: e for e in self.entries if e.record_id is not None}
+        self.cursor = cursor
+        self.loaded_at = time.monotonic()
+        self.arrivals_since_load = 0
+        return self.entries
+
+    def poll(self) -> RosterDelta:
+        """Apply every change since the last load/poll. Costs O(changes), not O(roster).
+
+        One read snapshot: the session's status, the change_log entries after
+        the cursor joined to their records by primary key and kept when the
+        record is in this session (so changes to other sessions never leave
+        the database), the deletes among our own records, and the new head.
+        Only a change log compacted past the cursor forces a full reload.
+        """
+        if not self.loaded_at:
+            self.load()
+            return RosterDelta()
+
+        records = ChangeTable.RECORDS.code
+        conn = get_conn()
+        try:
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            log = ChangeLogRepo(conn)
+            if self.cursor < log.compacted_through():
+                conn.commit()
+                self.load()
+                return RosterDelta(reloaded=True, session_closed=self.session_status != SessionStatus.OPEN.value)
+            head = log.head()
+            session = conn.execute(
+                "SELECT status FROM attendance_sessions WHERE session_id = ?", (self.session_id,)
+            ).fetchone()
+            changed = list({r[0]: r for r in conn.execute(   # a record changed twice is logged twice
+                """
+                SELECT ar.record_id, ar.student_id, ar.status, ar.checkin_time
+                FROM change_log cl
+                JOIN attendance_records ar ON ar.record_id = cl.row_id
+                WHERE cl.seq > ? AND cl.tbl = ? AND ar.session_id = ?
+                """,
+                (self.cursor, records, self.session_id),
+            )}.values())
+            deleted = {r[0] for r in conn.execute(
+                "SELECT row_id FROM change_log WHERE seq > ? AND tbl = ? AND op = ?",
+                (self.cursor, records, ChangeOp.DELETE.code),
+            ) if r[0] in self._by_record}
+            conn.commit()
+        finally:
+            conn.close()
+
+        delta = RosterDelta()
+        for record_id in deleted - {r[0] for r in changed}:   # a reused rowid is applied below instead
+            entry = self._by_record.pop(record_id)
+            if entry.record_id == record_id:
+                self._apply(entry, NO_RECORD, None, None, delta)
+        for record_id, student_id, status, checkin_time in changed:
+            entry = self._by_student.get(student_id)
+            if entry is None:
+                continue   # enrolled after load(); shows up on the next full load
+            self._by_record[record_id] = entry
+            self._apply(entry, AttendanceStatus.decode(status), record_id, checkin_time, delta)
+        self.session_status = SessionStatus.decode(session[0]) if session else None
+        delta.session_closed = self.session_status != SessionStatus.OPEN.value
+        self.cursor = head
+        return delta
+
+    def counts(self) -> dict[str, int]:
+        out = {s.value: 0 for s in AttendanceStatus}
+        for e in self.entries:
+            out[e.status] += 1
+        return out
+
+    def arrival_rate_per_min(self) -> float:
+        minutes = (time.monotonic() - self.loaded_at) / 60 if self.loaded_at else 0.0
+        return self.arrivals_since_load / minutes if minutes > 0 else 0.0
+
+    def _apply(
+        self, entry: RosterEntry, status: str, record_id: Optional[int], checkin_time: Optional[str], delta: RosterDelta
+    ) -> None:
+        if (entry.status, entry.record_id, entry.checkin_time) == (status, record_id, checkin_time):
+            return
+        arrived = status in ARRIVED and entry.status not in ARRIVED
+        entry.status, entry.record_id, entry.checkin_time = status, record_id, checkin_time
+        delta.changed.append(entry)
+        if arrived:
+            delta.arrivals.append(entry)
+            self.arrivals_since_load += 1
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from src.repositories import db
+from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
+
+WAL_CHECKPOINT_THRESHOLD_BYTES = 16 * 1024 * 1024
+INCREMENTAL_VACUUM_PAGES = 1000
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP_S = 0.005
+BACKUP_KEEP = 7
+MAINTENANCE_INTERVAL_S = 15 * 60
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class MaintenanceReport:
+    actions: list[str] = field(default_factory=list)
+    wal_bytes_before: int = 0
+    wal_bytes_after: int = 0
+    backup_path: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+
+@dataclass
+class RollupCheck:
+    rows: int       # rows in daily_rollups
+    missing: int    # rows the raw records imply that are absent or different in daily_rollups
+    extra: int      # rows in daily_rollups that the raw records do not imply
+
+    @property
+    def ok(self) -> bool:
+        return self.missing == 0 and self.extra == 0
+
+
+class MaintenanceService:
+    """DB housekeeping: planner statistics, WAL checkpoints, incremental vacuum, online backup, rollup checks."""
+
+    def __init__(self, db_path: Optional[Path] = None) -> None:
+        self._db_path = db_path
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path or db.DB_PATH
+
+    def wal_size(self) -> int:
+        wal = Path(str(self.db_path) + "-wal")
+        return wal.stat().st_size if wal.exists() else 0
+
+    def optimize(self, *, full_analyze: bool = False) -> None:
+        """Refresh query planner statistics (`PRAGMA optimize`, or a full ANALYZE)."""
+        conn = get_conn(self._db_path)
+        try:
+            conn.execute("ANALYZE;" if full_analyze else "PRAGMA optimize;")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def checkpoint(self, *, threshold_bytes: int = WAL_CHECKPOINT_THRESHOLD_BYTES, force: bool = False) -> bool:
+        """Run `wal_checkpoint(TRUNCATE)` once the WAL grows past `threshold_bytes`."""
+        if not force and self.wal_size() < threshold_bytes:
+            return False
+        conn = get_conn(self._db_path)
+        try:
+            busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchone()
+        finally:
+            conn.close()
+        return busy == 0
+
+    def auto_vacuum_mode(self) -> int:
+        """0 = NONE, 1 = FULL, 2 = INCREMENTAL."""
+        conn = get_conn(self._db_path)
+        try:
+            return conn.execute("PRAGMA auto_vacuum;").fetchone()[0]
+        finally:
+            conn.close()
+
+    def enable_incremental_vacuum(self) -> bool:
+        """One-off conversion of a database created before auto_vacuum=INCREMENTAL.
+
+        The mode only changes with a full VACUUM, which rewrites the file and
+        blocks writers while it runs: do it in a quiet period. Returns False if
+        the database was already INCREMENTAL.
+        """
+        conn = get_conn(self._db_path)
+        try:
+            if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+            conn.execute("VACUUM;")
+        finally:
+            conn.close()
+        return True
+
+    def incremental_vacuum(self, pages: int = INCREMENTAL_VACUUM_PAGES) -> int:
+        """Release up to `pages` free pages. Returns pages freed (0 if auto_vacuum is not INCREMENTAL)."""
+        conn = get_conn(self._db_path)
+        try:
+            if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != 2:
+                return 0
+            before = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+            # executescript steps the pragma to completion (execute() frees only one page)
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            after = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+        finally:
+            conn.close()
+        return before - after
+
+    def backup(
+        self,
+        backup_dir: str | Path,
+        *,
+        pages: int = BACKUP_PAGES_PER_STEP,
+        sleep: float = BACKUP_STEP_SLEEP_S,
+        keep: int = BACKUP_KEEP,
+    ) -> str:
+        """Online backup via `sqlite3.Connection.backup`, copying `pages` pages per step.
+
+        The source lock is released between steps, so check-ins keep working while
+        a backup runs. Only the newest `keep` backups are retained.
+        """
+        out_dir = Path(backup_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        dest_path = out_dir / f"{self.db_path.stem}-{stamp}.db"
+
+        src = get_conn(self._db_path)
+        dest = sqlite3.connect(str(dest_path))
+        try:
+            src.backup(dest, pages=pages, sleep=sleep)
+        finally:
+            dest.close()
+            src.close()
+
+        backups = sorted(out_dir.glob(f"{self.db_path.stem}-*.db"))
+        for old in backups[:-keep] if keep > 0 else []:
+            old.unlink(missing_ok=True)
+        return str(dest_path)
+
+    def verify_rollups(self) -> RollupCheck:
+        """Compare daily_rollups with the same rows recomputed from attendance_records (one read snapshot)."""
+        conn = get_conn(self._db_path)
+        try:
+            conn.execute("BEGIN")
+            rows = conn.execute("SELECT COUNT(*) FROM daily_rollups").fetchone()[0]
+            missing = conn.execute(
+                f"SELECT COUNT(*) FROM ({db.DAILY_ROLLUPS_SELECT} EXCEPT SELECT * FROM daily_rollups)"
+            ).fetchone()[0]
+            extra = conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT * FROM daily_rollups EXCEPT SELECT * FROM ({db.DAILY_ROLLUPS_SELECT}))"
+            ).fetchone()[0]
+            conn.commit()
+        finally:
+            conn.close()
+        return RollupCheck(rows, missing, extra)
+
+    def rebuild_rollups(self) -> int:
+        """Recompute daily_rollups from attendance_records in one write transaction. Returns the row count."""
+        conn = get_conn(self._db_path)
+        try:
+            def rebuild() -> int:
+                conn.execute("DELETE FROM daily_rollups")
+                return conn.execute(f"INSERT INTO daily_rollups {db.DAILY_ROLLUPS_SELECT}").rowcount
+
+            return run_write(conn, rebuild)
+        finally:
+            conn.close()
+
+    def run(
+        self,
+        *,
+        full_analyze: bool = False,
+        force_checkpoint: bool = False,
+        backup_dir: Optional[str | Path] = None,
+    ) -> MaintenanceReport:
+        """Run one maintenance pass."""
+        t0 = time.perf_counter()
+        report = MaintenanceReport(wal_bytes_before=self.wal_size())
+
+        self.optimize(full_analyze=full_analyze)
+        report.actions.append("analyze" if full_analyze else "optimize")
+
+        if self.checkpoint(force=force_checkpoint):
+            report.actions.append("wal_checkpoint")
+
+        if self.auto_vacuum_mode() != 2:
+            # created before auto_vacuum=INCREMENTAL: free pages are never returned until converted
+            report.actions.append("incremental_vacuum unavailable (run --enable-incremental-vacuum once)")
+        else:
+            freed = self.incremental_vacuum()
+            if freed:
+                report.actions.append(f"incremental_vacuum({freed})")
+
+        if backup_dir is not None:
+            report.backup_path = self.backup(backup_dir)
+            report.actions.append("backup")
+
+        report.wal_bytes_after = self.wal_size()
+        report.elapsed_ms = (time.perf_counter() - t0) * 1000
+        return report
+
+
+class MaintenanceScheduler(threading.Thread):
+    """Background thread running `MaintenanceService.run` every `interval_s` seconds."""
+
+    def __init__(
+        self,
+        service: Optional[MaintenanceService] = None,
+        *,
+        interval_s: float = MAINTENANCE_INTERVAL_S,
+        backup_dir: Optional[str | Path] = None,
+        backup_every: int = 0,
+    ) -> None:
+        super().__init__(name="sas-maintenance", daemon=True)
+        self.service = service or MaintenanceService()
+        self.interval_s = interval_s
+        self.backup_dir = backup_dir
+        self.backup_every = backup_every  # 0 = never back up from the scheduler
+        self.last_report: Optional[MaintenanceReport] = None
+        self.last_error: Optional[Exception] = None
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        passes = 0
+        while not self._stop_event.wait(self.interval_s):
+            passes += 1
+            do_backup = self.backup_dir is not None and self.backup_every > 0 and passes % self.backup_every == 0
+            try:
+                self.last_report = self.service.run(backup_dir=self.backup_dir if do_backup else None)
+                self.last_error = None
+            except (sqlite3.Error, OSError) as e:
+                # never let housekeeping take down the app (DB busy, backup disk full/missing); retry next interval
+                self.last_error = e
+                _log.warning("maintenance pass failed: %s", e)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        self.join(timeout)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SAS database maintenance")
+    parser.add_argument("--db", help="database path (default: data/sas.db)")
+    parser.add_argument("--analyze", action="store_true", help="run a full ANALYZE instead of PRAGMA optimize")
+    parser.add_argument("--checkpoint", action="store_true", help="checkpoint the WAL regardless of its size")
+    parser.add_argument("--backup", metavar="DIR", help="write an online backup into DIR")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="convert an older database to auto_vacuum=INCREMENTAL (full VACUUM, blocks writers)")
+    args = parser.parse_args(argv)
+
+    service = MaintenanceService(Path(args.db) if args.db else None)
+    if not service.db_path.exists():
+        print(f"Database not found: {service.db_path}")
+        return 1
+    if args.enable_incremental_vacuum:
+        print("auto_vacuum: " + ("converted to INCREMENTAL" if service.enable_incremental_vacuum() else "already INCREMENTAL"))
+    report = service.run(full_analyze=args.analyze, force_checkpoint=args.checkpoint, backup_dir=args.backup)
+    print(f"Actions: {', '.join(report.actions)}")
+    print(f"WAL: {report.wal_bytes_before} -> {report.wal_bytes_after} bytes")
+    if report.backup_path:
+        print(f"Backup: {report.backup_path}")
+    print(f"Elapsed: {report.elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+"""Prometheus exposition for long-running modes (console app, session daemon, batch runs).
+
+The services record into the default registry (src/utils/metrics.py) as they
+run. install_runtime_metrics() adds what is read on demand: open sessions,
+change-feed backlog, cache and write-path counters that already exist
+(identity map, report cache, write_stats()) and a SQL statement counter.
+The registry is then served over HTTP (MetricsServer, GET /metrics) or
+written to a file every few seconds (MetricsFileWriter, for node_exporter's
+textfile collector):
+
+    python -m src.services.session_scheduler --daemon --metrics-port 9464
+    python -m src.cli --metrics-file /var/lib/node_exporter/sas.prom warnings
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from src.utils.metrics import MetricsRegistry, default_registry
+
+# src.cli imports this module to build its parser, so the repositories and
+# http.server are only loaded once an exporter is actually started.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_HOST = "127.0.0.1"
+FILE_INTERVAL_S = 15.0
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install_runtime_metrics(registry: Optional[MetricsRegistry] = None) -> None:
+    """Register the read-on-scrape metrics and start counting SQL statements (idempotent)."""
+    from src.models.enums import SessionStatus
+    from src.repositories import db
+    from src.repositories.change_log_repo import ChangeLogRepo
+    from src.repositories.identity_map import default_identity_map
+    from src.repositories.report_job_repo import ReportJobRepo
+    from src.repositories.session_repo import SessionRepo
+    from src.repositories.transactions import write_stats
+    from src.services.report_cache import default_report_cache
+
+    global _installed
+    registry = registry or default_registry()
+    with _install_lock:
+        if _installed:
+            return
+        _installed = True
+
+    statements = registry.counter("sas_db_statements_total", "SQL statements executed (connections opened after startup)")
+    db.add_statement_hook(lambda sql: statements.inc())
+
+    registry.register_callback(
+        "sas_open_sessions", "Attendance sessions currently OPEN",
+        lambda: SessionRepo().count_by_status(SessionStatus.OPEN.value),
+    )
+
+    def feed_backlog() -> dict[tuple[str, ...], float]:
+        repo = ChangeLogRepo()
+        head = repo.head()
+        return {(c.name,): head - c.cursor for c in repo.list_consumers()}
+
+    registry.register_callback(
+        "sas_change_feed_backlog", "Change-log entries not yet acknowledged, per consumer",
+        feed_backlog, labelnames=("consumer",),
+    )
+
+    registry.register_callback(
+        "sas_report_jobs", "Background report jobs waiting or running, per status",
+        lambda: {(status,): n for status, n in ReportJobRepo().count_active().items()}, labelnames=("status",),
+    )
+
+    for field in ("transactions", "retries", "busy_failures"):
+        registry.register_callback(
+            f"sas_db_write_{field}_total", f"run_write {field.replace('_', ' ')} (write_stats())",
+            lambda f=field: getattr(write_stats(), f), kind="counter",
+        )
+
+    for field in ("hits", "misses", "evictions", "invalidations"):
+        def identity(f: str = field) -> float:
+            imap = default_identity_map()
+            return getattr(imap.stats(), f) if imap else 0
+        registry.register_callback(
+            f"sas_identity_map_{field}_total", f"Identity map {field} (class/session/enrollment rows)",
+            identity, kind="counter",
+        )
+    for field in ("hits", "misses", "evictions"):
+        registry.register_callback(
+            f"sas_report_cache_{field}_total", f"Report cache {field}",
+            lambda f=field: getattr(default_report_cache().stats(), f), kind="counter",
+        )
+    registry.register_callback("sas_report_cache_bytes", "Approximate size of cached reports",
+                               lambda: default_report_cache().stats().bytes)
+
+
+def _handler_class(registry: MetricsRegistry) -> type:
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass   # scrapes every few seconds would flood the console
+
+    return MetricsHandler
+
+
+class MetricsServer(threading.Thread):
+    """Serve the registry on http://host:port/metrics from a daemon thread (localhost by default)."""
+
+    def __init__(self, port: int, *, host: str = DEFAULT_HOST, registry: Optional[MetricsRegistry] = None) -> None:
+        from http.server import ThreadingHTTPServer
+
+        super().__init__(name="sas-metrics-http", daemon=True)
+        self.httpd = ThreadingHTTPServer((host, port), _handler_class(registry or default_registry()))
+        self.httpd.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def run(self) -> None:
+        self.httpd.serve_forever(poll_interval=0.5)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.join(timeout)
+
+
+class MetricsFileWriter(threading.Thread):
+    """Rewrite `path` with the registry every `interval_s` seconds (atomic replace), and once more on stop()."""
+
+    def __init__(self, path: str | Path, *, interval_s: float = FILE_INTERVAL_S, registry: Optional[MetricsRegistry] = None) -> None:
+        super().__init__(name="sas-metrics-file", daemon=True)
+        self.path = Path(path)
+        self.interval_s = interval_s
+        self.registry = registry or default_registry()
+        self._stop_event = threading.Event()
+        self.last_error: Optional[BaseException] = None
+
+    def write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(self.registry.render(), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_s):
+            try:
+                self.write()
+            except Exception as e:
+                # never let metrics take down the app; retry next interval
+                self.last_error = e
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        self.join(timeout)
+        self.write()
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("metrics (Prometheus text format)")
+    group.add_argument("--metrics-port", type=int, metavar="PORT", help="serve /metrics on 127.0.0.1:PORT")
+    group.add_argument("--metrics-file", metavar="FILE", help="rewrite FILE periodically and on exit")
+    group.add_argument("--metrics-interval", type=float, default=FILE_INTERVAL_S, metavar="SECONDS")
+
+
+def start_from_args(args: argparse.Namespace) -> list[threading.Thread]:
+    """Start the exporters requested on the command line; they stop when the process exits."""
+    if args.metrics_port is None and not args.metrics_file:
+        return []
+    install_runtime_metrics()
+    started: list[threading.Thread] = []
+    if args.metrics_port is not None:
+        server = MetricsServer(args.metrics_port)
+        server.start()
+        started.append(server)
+    if args.metrics_file:
+        writer = MetricsFileWriter(args.metrics_file, interval_s=args.metrics_interval)
+        writer.start()
+        atexit.register(writer.stop, 1)
+        started.append(writer)
+    return started
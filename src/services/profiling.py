@@ -0,0 +1,308 @@
+"""Opt-in profiling of service calls (`--profile` on src.main / src.cli).
+
+While installed, every public method of the service classes below is timed
+into a per-method latency histogram together with the number of SQL
+statements it ran (statement hook on every connection). One use case can also
+be run under cProfile; its stats are dumped as a .prof file on exit (view with
+`python -m pstats FILE` or snakeviz).
+
+Installing imports every service module up front, so startup is slower than
+usual; the numbers themselves are per call and unaffected.
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import functools
+import importlib
+import json
+import math
+import sys
+import threading
+import time
+import types
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, TextIO
+
+from src.repositories import db
+
+if TYPE_CHECKING:
+    import cProfile
+
+# (module, class) whose public methods are timed.
+SERVICE_CLASSES = (
+    ("src.services.auth_service", "AuthService"),
+    ("src.services.attendance_service", "AttendanceService"),
+    ("src.services.request_service", "RequestService"),
+    ("src.services.admin_service", "AdminService"),
+    ("src.services.session_service", "SessionService"),
+    ("src.services.warning_service", "WarningService"),
+    ("src.services.report_service", "ReportService"),
+    ("src.services.audit_service", "AuditService"),
+    ("src.services.change_feed_service", "ChangeFeedService"),
+    ("src.services.session_scheduler", "SessionExpiryScheduler"),
+    ("src.services.maintenance_service", "MaintenanceService"),
+)
+
+# Use case of each service method, for the report and for picking a cProfile target.
+USE_CASES = {
+    "AuthService.login": "UC01",
+    "AttendanceService.student_checkin": "UC02",
+    "AttendanceService.list_student_attendance": "UC03",
+    "RequestService.submit_request": "UC04",
+    "AdminService.search_attendance": "UC05",
+    "SessionService.create_session": "UC06",
+    "SessionService.close_session": "UC07",
+    "AttendanceService.get_roster_for_session": "UC07",
+    "AttendanceService.update_status": "UC07",
+    "AttendanceService.mark_all_present": "UC07",
+    "RequestService.approve": "UC08",
+    "RequestService.reject": "UC09",
+    "AdminService.add_record": "UC10",
+    "AdminService.edit_record": "UC10",
+    "AdminService.delete_record": "UC10",
+    "AdminService.import_records": "UC10",
+    "WarningService.list_warnings_for_student": "UC11",
+    "WarningService.evaluate_and_generate_for_class": "UC11",
+    "WarningService.sweep_all": "UC11",
+    "ReportService.summarize": "UC12",
+    "ReportService.detail": "UC12",
+    "ReportService.class_analytics": "UC12",
+    "ReportService.iter_summary_rows": "UC12",
+    "ReportService.iter_detail_rows": "UC12",
+    "ReportService.export_excel": "UC13",
+    "ReportService.export_flat": "UC13",
+    "ReportService.export_excel_bulk": "UC13",
+}
+
+# Histogram buckets grow by 10%, so a reported percentile is within 10% of the true value.
+BUCKET_GROWTH = 1.1
+BUCKET_MIN_MS = 0.01
+PERCENTILES = (50, 95, 99)
+DEFAULT_CPROFILE_PATH = "sas.prof"
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram: constant memory, percentiles within BUCKET_GROWTH."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets: dict[int, int] = {}   # bucket index -> count; upper bound = BUCKET_MIN_MS * GROWTH**index
+
+    @staticmethod
+    def bucket_bound(index: int) -> float:
+        return BUCKET_MIN_MS * BUCKET_GROWTH ** index
+
+    def observe(self, ms: float) -> None:
+        index = 0 if ms <= BUCKET_MIN_MS else math.ceil(math.log(ms / BUCKET_MIN_MS, BUCKET_GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.bucket_bound(index), self.max_ms)
+        return self.max_ms
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+
+@dataclass
+class CallStats:
+    name: str
+    use_case: Optional[str]
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    queries_total: int = 0
+    queries_max: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        n = self.latency.count
+        return {
+            "name": self.name,
+            "use_case": self.use_case,
+            "calls": n,
+            "errors": self.errors,
+            **{f"p{p}_ms": round(self.latency.percentile(p), 3) for p in PERCENTILES},
+            "mean_ms": round(self.latency.mean_ms, 3),
+            "max_ms": round(self.latency.max_ms, 3),
+            "queries_per_call": round(self.queries_total / n, 2) if n else 0.0,
+            "queries_max": self.queries_max,
+        }
+
+
+class Profiler:
+    """Times service calls into histograms and counts their SQL statements.
+
+    Counts are inclusive: a statement run by a nested service call (e.g.
+    ReportService.summarize -> iter_summary_rows) counts for both. Calls that
+    return a generator are timed until the generator is exhausted or closed.
+    """
+
+    def __init__(self, *, cprofile_target: Optional[str] = None) -> None:
+        self.stats: dict[str, CallStats] = {}
+        self.cprofile_target = cprofile_target
+        self.cprofile: Optional[cProfile.Profile] = None
+        if cprofile_target:
+            import cProfile
+
+            self.cprofile = cProfile.Profile()
+        self._lock = threading.Lock()
+        self._local = threading.local()   # .frames: query counters of the calls running on this thread
+        self._cprofiling = False
+        self._originals: list[tuple[type, str, Any]] = []
+
+    # ---- install / uninstall --------------------------------------------
+
+    def install(self) -> "Profiler":
+        for module_name, class_name in SERVICE_CLASSES:
+            cls = getattr(importlib.import_module(module_name), class_name)
+            for attr, value in list(vars(cls).items()):
+                if attr.startswith("_") or not isinstance(value, types.FunctionType):
+                    continue
+                self._originals.append((cls, attr, value))
+                setattr(cls, attr, self._wrap(f"{class_name}.{attr}", value))
+        db.add_statement_hook(self._on_statement)
+        return self
+
+    def uninstall(self) -> None:
+        db.remove_statement_hook(self._on_statement)
+        for cls, attr, value in reversed(self._originals):
+            setattr(cls, attr, value)
+        self._originals.clear()
+
+    # ---- recording -------------------------------------------------------
+
+    def _frames(self) -> list[list[Any]]:
+        frames = getattr(self._local, "frames", None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    def _on_statement(self, sql: str) -> None:
+        for frame in self._frames():
+            frame[0] += 1
+
+    def _wants_cprofile(self, name: str, use_case: Optional[str]) -> bool:
+        target = self.cprofile_target
+        return target is not None and (target == use_case or target in name)
+
+    def _wrap(self, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        use_case = USE_CASES.get(name)
+        stats = self.stats.setdefault(name, CallStats(name, use_case))
+        profiled = self._wants_cprofile(name, use_case)
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            frame = self._enter(profiled)
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                self._exit(stats, frame, profiled, failed=True)
+                raise
+            if isinstance(result, types.GeneratorType):
+                return self._timed_iter(result, stats, frame, profiled)
+            self._exit(stats, frame, profiled)
+            return result
+
+        return wrapper
+
+    def _timed_iter(self, gen: Iterator[Any], stats: CallStats, frame: list[Any], profiled: bool) -> Iterator[Any]:
+        failed = True
+        try:
+            yield from gen
+            failed = False
+        except GeneratorExit:
+            failed = False   # consumer stopped early
+            raise
+        finally:
+            self._exit(stats, frame, profiled, failed=failed)
+
+    def _enter(self, profiled: bool) -> list[Any]:
+        frame = [0, time.perf_counter(), False]   # queries, start, owns the cProfile session
+        self._frames().append(frame)
+        if profiled and self.cprofile is not None:
+            with self._lock:
+                # one cProfile session at a time (3.12+ refuses a second one, even on another thread)
+                if not self._cprofiling:
+                    self._cprofiling = frame[2] = True
+                    self.cprofile.enable()
+        return frame
+
+    def _exit(self, stats: CallStats, frame: list[Any], profiled: bool, *, failed: bool = False) -> None:
+        ms = (time.perf_counter() - frame[1]) * 1000
+        if frame[2]:
+            with self._lock:
+                self.cprofile.disable()   # type: ignore[union-attr]
+                self._cprofiling = False
+        frames = self._frames()
+        for i in range(len(frames) - 1, -1, -1):
+            if frames[i] is frame:
+                del frames[i]
+                break
+        with self._lock:
+            stats.latency.observe(ms)
+            stats.queries_total += frame[0]
+            stats.queries_max = max(stats.queries_max, frame[0])
+            stats.errors += failed
+
+    # ---- reporting -------------------------------------------------------
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = [s.as_dict() for s in self.stats.values() if s.latency.count]
+        return sorted(rows, key=lambda r: (r["use_case"] or "UC99", r["name"]))
+
+    def print_report(self, out: TextIO = sys.stderr) -> None:
+        rows = self.snapshot()
+        print("\n[PROFILE] service calls (latency in ms, queries = SQL statements per call)", file=out)
+        if not rows:
+            print("  no service calls recorded", file=out)
+            return
+        print(f"  {'UC':<5} {'call':<46} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'q/call':>7} {'q max':>6}", file=out)
+        for r in rows:
+            print(
+                f"  {r['use_case'] or '-':<5} {r['name']:<46} {r['calls']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                f"{r['p99_ms']:>9.2f} {r['max_ms']:>9.2f} {r['queries_per_call']:>7.1f} {r['queries_max']:>6}",
+                file=out,
+            )
+
+    def dump(self, json_path: Optional[str] = None, cprofile_path: str = DEFAULT_CPROFILE_PATH) -> None:
+        """Print the report; write it as JSON and the cProfile stats if requested."""
+        self.print_report()
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump({"generated_at": time.strftime("%Y-%m-%d %H:%M:%S"), "calls": self.snapshot()}, f, indent=2)
+            print(f"[PROFILE] report written to {json_path}", file=sys.stderr)
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(cprofile_path)
+            print(f"[PROFILE] cProfile stats for '{self.cprofile_target}' written to {cprofile_path}", file=sys.stderr)
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", action="store_true", help="time service calls; print a latency report on exit")
+    group.add_argument("--profile-out", metavar="FILE.json", help="also write the report as JSON")
+    group.add_argument("--cprofile", metavar="USE_CASE",
+                       help="run calls matching this use case (UC02) or method name (summarize) under cProfile")
+    group.add_argument("--cprofile-out", metavar="FILE.prof", default=DEFAULT_CPROFILE_PATH)
+
+
+def start_from_args(args: argparse.Namespace) -> Optional[Profiler]:
+    """Install a Profiler if `--profile`/`--cprofile` was given; it reports when the process exits."""
+    if not (args.profile or args.cprofile):
+        return None
+    profiler = Profiler(cprofile_target=args.cprofile).install()
+    atexit.register(profiler.dump, args.profile_out, args.cprofile_out)
+    return profiler
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Hashable, Optional
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# (database file, class_id, date_from, date_to, report_type); class versions are only comparable within one database
+ReportKey = tuple[str, int, Optional[str], Optional[str], str]
+_KEY_LEN = 5
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _estimate_size(value: Any) -> int:
+    """Rough serialized size: a sequence counts as its length times its first element.
+
+    Report rows are uniform, so this costs one row's worth of work instead of
+    serializing the whole report on every put.
+    """
+    if isinstance(value, (list, tuple)):
+        return 2 + (len(value) * (_estimate_size(value[0]) + 1) if value else 0)
+    if isinstance(value, dict):
+        return 2 + sum(len(str(k)) + 4 + _estimate_size(v) for k, v in value.items())
+    if isinstance(value, str):
+        return len(value) + 2
+    return 8
+
+
+class ReportCache:
+    """LRU cache of report results, validated against a per-class data version.
+
+    An entry is only served while the class's change counter still equals the
+    version it was computed at; anything else is a miss. Size is bounded both
+    by entry count and by an approximate byte budget (see _estimate_size).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        persist_path: Optional[str | Path] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._entries: OrderedDict[Hashable, tuple[int, Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        if self.persist_path and self.persist_path.exists():
+            self.load()
+
+    def get(self, key: ReportKey, version: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            cached_version, value, size = entry
+            if cached_version != version:
+                del self._entries[key]
+                self._stats.bytes -= size
+                self._stats.stale += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def put(self, key: ReportKey, version: int, value: Any) -> None:
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._stats.bytes -= old[2]
+            self._entries[key] = (version, value, size)
+            self._stats.bytes += size
+            while len(self._entries) > self.max_entries or self._stats.bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._stats.bytes -= evicted_size
+                self._stats.evictions += 1
+
+    def invalidate_class(self, class_id: int, db_file: Optional[str] = None) -> None:
+        """Drop a class's entries, in every database unless `db_file` is given."""
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == class_id and db_file in (None, k[0])]:
+                self._stats.bytes -= self._entries.pop(key)[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats.bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**{**vars(self._stats), "entries": len(self._entries)})
+
+    def save(self) -> None:
+        """Write entries to `persist_path` (atomic replace). No-op without a path."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            payload = [[list(k), v, value] for k, (v, value, _) in self._entries.items()]
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.persist_path.with_suffix(self.persist_path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"), default=str)
+        os.replace(tmp, self.persist_path)
+
+    def load(self) -> None:
+        if not self.persist_path:
+            return
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return  # a corrupt/missing cache file is just a cold cache
+        for key, version, value in payload:
+            if len(key) == _KEY_LEN:   # entries saved before keys carried the database file are dropped
+                self.put(tuple(key), version, value)
+
+
+_default_cache: Optional[ReportCache] = None
+
+
+def default_report_cache() -> ReportCache:
+    """Process-wide cache shared by ReportService instances (persisted if SAS_REPORT_CACHE is set)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ReportCache(persist_path=os.environ.get("SAS_REPORT_CACHE") or None)
+        if _default_cache.persist_path:
+            atexit.register(_default_cache.save)
+    return _default_cache
@@ -0,0 +1,255 @@
+"""Background report exports: a SQLite-backed job queue and the workers that drain it.
+
+The console queues an export (ReportJobService.enqueue) and returns to the
+menu; a ReportJobWorker thread started with the lecturer dashboard runs it.
+Jobs live in report_jobs, so they also survive the console: a dedicated
+worker process picks up whatever is queued, including jobs whose worker
+died mid-run (no heartbeat for STALE_AFTER_S):
+
+    python -m src.services.report_job_service --workers 2
+
+A job records its progress (steps done / total), retries transient failures
+with exponential backoff up to max_attempts, can be cancelled (immediately
+when queued, at the next step when running) and stores the paths it wrote.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from src.models.enums import JobStatus
+from src.repositories.report_job_repo import ReportJobRepo, ReportJobRow
+from src.utils.validators import validate_date_range
+
+JOB_FORMATS = ("xlsx", "csv", "jsonl", "xlsx_bulk")
+MAX_ATTEMPTS = 3
+RETRY_DELAY_S = 30            # doubled after every failed attempt
+POLL_INTERVAL_S = 2.0         # idle worker re-checks the queue this often
+HEARTBEAT_S = 10.0
+STALE_AFTER_S = 6 * HEARTBEAT_S
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when its owner asked to cancel it."""
+
+
+class JobLost(Exception):
+    """Raised inside a running job once it was requeued as stale (and maybe claimed by another worker)."""
+
+
+def _now() -> int:
+    return int(time.time())
+
+
+class ReportJobService:
+    def __init__(self, repo: Optional[ReportJobRepo] = None) -> None:
+        self.repo = repo or ReportJobRepo()
+
+    # -----------------------
+    # Console side
+    # -----------------------
+    def enqueue(
+        self,
+        owner_id: Optional[int],
+        *,
+        fmt: str,
+        class_id: Optional[int] = None,
+        lecturer_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        output_dir: str = "reports",
+        compress: bool = False,
+        max_attempts: int = MAX_ATTEMPTS,
+    ) -> int:
+        """Queue one export. `xlsx_bulk` exports every class of `lecturer_id`; the others need `class_id`."""
+        validate_date_range(date_from, date_to)
+        if fmt not in JOB_FORMATS:
+            raise ValueError(f"fmt must be one of {list(JOB_FORMATS)}, got '{fmt}'")
+        if fmt != "xlsx_bulk" and class_id is None:
+            raise ValueError("class_id is required for a single-class export.")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1")
+        params = {
+            "fmt": fmt, "class_id": class_id, "lecturer_id": lecturer_id, "date_from": date_from,
+            # the worker may be another process started elsewhere: pin the directory to the caller's cwd
+            "date_to": date_to, "output_dir": os.path.abspath(output_dir), "compress": compress,
+        }
+        return self.repo.create(owner_id=owner_id, params=params, max_attempts=max_attempts, now=_now())
+
+    def list_jobs(self, owner_id: int, *, limit: int = 20) -> list[ReportJobRow]:
+        return self.repo.list_by_owner(owner_id, limit=limit)
+
+    def get(self, job_id: int) -> Optional[ReportJobRow]:
+        return self.repo.get_by_id(job_id)
+
+    def active_counts(self, owner_id: Optional[int] = None) -> dict[str, int]:
+        return self.repo.count_active(owner_id)
+
+    def cancel(self, job_id: int, *, owner_id: Optional[int] = None) -> str:
+        """Returns CANCELLED, or RUNNING when the worker will stop at its next step."""
+        job = self.repo.get_by_id(job_id)
+        if not job or (owner_id is not None and job.owner_id != owner_id):
+            raise ValueError("Job not found.")
+        if job.status not in (JobStatus.QUEUED.value, JobStatus.RUNNING.value):
+            raise ValueError(f"Job already finished ({job.status}).")
+        status = self.repo.request_cancel(job_id, now=_now())
+        return status or JobStatus.CANCELLED.value
+
+    # -----------------------
+    # Worker side
+    # -----------------------
+    def run_next(self, worker: str) -> Optional[ReportJobRow]:
+        """Claim and run one due job. Returns the job as claimed, or None if nothing was due."""
+        now = _now()
+        self.repo.requeue_stale(stale_before=now - int(STALE_AFTER_S), now=now)
+        job = self.repo.claim_next(worker, now=now)
+        if job is None:
+            return None
+
+        stop_beat = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job.job_id, worker, stop_beat),
+                                name=f"{worker}-heartbeat", daemon=True)
+        beat.start()
+        # finish/retry write nothing if the job was requeued meanwhile: its new run owns the outcome
+        try:
+            paths = self._execute(job, worker)
+        except JobLost:
+            pass
+        except JobCancelled:
+            self.repo.finish(job.job_id, worker, JobStatus.CANCELLED.value, now=_now())
+        except (sqlite3.Error, OSError, RuntimeError) as e:
+            # database busy, disk full, a worker process crashed: worth another attempt
+            if job.attempts >= job.max_attempts:
+                self.repo.finish(job.job_id, worker, JobStatus.FAILED.value, now=_now(), error=str(e))
+            else:
+                delay = RETRY_DELAY_S * 2 ** (job.attempts - 1)
+                self.repo.retry(job.job_id, worker, run_after=_now() + delay, error=f"attempt {job.attempts}: {e}")
+        except Exception as e:
+            # bad parameters (ValueError), a missing dependency, a bug: retrying cannot help
+            self.repo.finish(job.job_id, worker, JobStatus.FAILED.value, now=_now(), error=f"{type(e).__name__}: {e}")
+        else:
+            self.repo.finish(job.job_id, worker, JobStatus.DONE.value, now=_now(), result_paths=paths)
+        finally:
+            stop_beat.set()
+            beat.join()
+        return job
+
+    def _heartbeat(self, job_id: int, worker: str, stop: threading.Event) -> None:
+        while not stop.wait(HEARTBEAT_S):
+            try:
+                if not self.repo.heartbeat(job_id, worker, now=_now()):
+                    return   # requeued; the job notices at its next progress step
+            except sqlite3.Error:
+                pass   # a missed beat is tolerated; STALE_AFTER_S spans several
+
+    def _progress(self, job: ReportJobRow, worker: str, done: int, total: int) -> None:
+        cancelled = self.repo.set_progress(job.job_id, worker, done, total, now=_now())
+        if cancelled is None:
+            raise JobLost()
+        if cancelled:
+            raise JobCancelled()
+
+    def _execute(self, job: ReportJobRow, worker: str) -> list[str]:
+        from src.services.report_service import DATASETS, ReportService
+
+        p: dict[str, Any] = job.params
+        reports = ReportService()
+        fmt, date_from, date_to, out = p["fmt"], p.get("date_from"), p.get("date_to"), p["output_dir"]
+
+        if fmt == "xlsx_bulk":
+            self._progress(job, worker, 0, 0)
+            result = reports.export_excel_bulk(
+                out, lecturer_id=p.get("lecturer_id"), date_from=date_from, date_to=date_to,
+                progress=lambda done, total, item: self._progress(job, worker, done, total),
+            )
+            if result.failed and len(result.failed) == len(result.items):
+                raise RuntimeError(f"every class failed, e.g. {result.failed[0].class_code}: {result.failed[0].error}")
+            return [path for path in (*(i.file_path for i in result.items), result.manifest_path) if path]
+
+        if fmt == "xlsx":
+            self._progress(job, worker, 0, 1)
+            path = reports.export_excel(p["class_id"], out, date_from=date_from, date_to=date_to)
+            self._progress(job, worker, 1, 1)
+            return [path]
+
+        paths = []
+        for n, dataset in enumerate(DATASETS):
+            self._progress(job, worker, n, len(DATASETS))
+            paths.append(reports.export_flat(
+                p["class_id"], out, fmt=fmt, dataset=dataset, compress=p.get("compress", False),
+                date_from=date_from, date_to=date_to,
+            ))
+        self._progress(job, worker, len(DATASETS), len(DATASETS))
+        return paths
+
+
+class ReportJobWorker(threading.Thread):
+    """Drains report_jobs until stop(); sleeps POLL_INTERVAL_S (or until wake()) when the queue is empty."""
+
+    def __init__(self, service: Optional[ReportJobService] = None, *, name: str = "sas-report-jobs",
+                 poll_interval_s: float = POLL_INTERVAL_S) -> None:
+        super().__init__(name=name, daemon=True)
+        self.service = service or ReportJobService()
+        self.worker_id = f"{os.getpid()}:{name}"
+        self.poll_interval_s = poll_interval_s
+        self.last_error: Optional[Exception] = None
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+
+    def wake(self) -> None:
+        """Check the queue now (call after enqueue)."""
+        self._wake.set()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                ran = self.service.run_next(self.worker_id)
+                self.last_error = None
+            except sqlite3.Error as e:
+                # never let the queue take down the app; retry next interval
+                self.last_error, ran = e, None
+            if ran is None:
+                self._wake.wait(self.poll_interval_s)
+                self._wake.clear()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        self._wake.set()
+        self.join(timeout)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from src.services.metrics_service import add_metrics_arguments, start_from_args as start_metrics
+
+    parser = argparse.ArgumentParser(description="Run queued report exports")
+    parser.add_argument("--workers", type=int, default=1, help="worker threads in this process")
+    parser.add_argument("--once", action="store_true", help="drain the queue, then exit")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    start_metrics(args)
+
+    if args.once:
+        service, n = ReportJobService(), 0
+        while service.run_next(f"{os.getpid()}:once"):
+            n += 1
+        print(f"Ran {n} job(s).")
+        return 0
+
+    workers = [ReportJobWorker(name=f"sas-report-jobs-{i}") for i in range(max(1, args.workers))]
+    for w in workers:
+        w.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for w in workers:
+            w.stop(timeout=5)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,64 +1,276 @@
 from __future__ import annotations
 
+import csv
+import gzip
+import json
 import os
-from typing import Optional, Any
+import copy
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Any, TextIO
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-
-from src.models.enums import AttendanceStatus
+from src.models.enums import AttendanceStatus, SessionStatus
 from src.utils.validators import validate_date_range
-from src.repositories.attendance_repo import AttendanceRepo
+from src.repositories import db
+from src.repositories.db import get_conn
 from src.repositories.class_repo import ClassRepo
-from src.repositories.enrollment_repo import EnrollmentRepo
-from src.repositories.session_repo import SessionRepo
+from src.services.report_cache import ReportCache, default_report_cache
+from src.utils.metrics import default_registry
+
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+
+
+MANIFEST_NAME = "manifest.json"
+FLAT_FORMATS = ("csv", "jsonl")
+DATASETS = ("summary", "detail")
+
+SUMMARY_HEADERS = ["Student ID", "Present", "Late", "Absent", "Excused", "Total"]
+SUMMARY_KEYS = ["student_id", "present", "late", "absent", "excused", "total"]
+DETAIL_HEADERS = ["Session ID", "Date", "Time", "Student ID", "Status", "Note"]
+DETAIL_KEYS = ["session_id", "session_date", "start_time", "student_id", "status", "note"]
+_FETCH_SIZE = 1000
+_LAST_DAY = "9999-12-31"   # open-ended date_to for the rollup lookups
+
+_EXPORT_TIME = default_registry().histogram(
+    "sas_export_seconds", "Report export duration by format (xlsx, csv, jsonl, xlsx_bulk)", ("format",))
+
+
+@dataclass
+class BulkExportItem:
+    class_id: int
+    class_code: str
+    file_path: Optional[str] = None
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class BulkExportResult:
+    items: list[BulkExportItem] = field(default_factory=list)
+    manifest_path: Optional[str] = None
+    wall_ms: float = 0.0
+    workers: int = 1
+
+    @property
+    def failed(self) -> list[BulkExportItem]:
+        return [i for i in self.items if i.error]
+
+
+def _export_class_worker(
+    db_path: str,
+    class_id: int,
+    class_code: str,
+    output_dir: str,
+    date_from: Optional[str],
+    date_to: Optional[str],
+) -> BulkExportItem:
+    """Process-pool entry point: one read-only connection, one workbook."""
+    item = BulkExportItem(class_id=class_id, class_code=class_code)
+    t0 = time.perf_counter()
+    conn = get_conn(Path(db_path))
+    conn.execute("PRAGMA query_only = ON;")
+    try:
+        item.file_path = ReportService(conn=conn).export_excel(class_id, output_dir, date_from=date_from, date_to=date_to)
+    except Exception as e:
+        item.error = str(e)
+    finally:
+        conn.close()
+    item.elapsed_ms = (time.perf_counter() - t0) * 1000
+    return item
 
 
 class ReportService:
     """UC12 Summarize attendance; UC13 Export Excel."""
 
-    def __init__(self) -> None:
-        self._attendance_repo = AttendanceRepo()
-        self._enrollment_repo = EnrollmentRepo()
-        self._session_repo = SessionRepo()
-        self._class_repo = ClassRepo()
+    def __init__(self, conn: sqlite3.Connection | None = None, cache: Optional[ReportCache] = None) -> None:
+        self._external_conn = conn
+        self._class_repo = ClassRepo(conn)
+        self._cache = cache if cache is not None else default_report_cache()
+
+    def _conn(self) -> sqlite3.Connection:
+        return self._external_conn or get_conn()
 
     def summarize(self, class_id: int, date_from: Optional[str] = None, date_to: Optional[str] = None) -> list[dict[str, Any]]:
         validate_date_range(date_from, date_to)
+        return self._cached(
+            "summary",
+            class_id,
+            date_from,
+            date_to,
+            lambda: [dict(zip(SUMMARY_KEYS, row)) for row in self.iter_summary_rows(class_id, date_from, date_to)],
+            lambda rows: [dict(r) for r in rows],
+        )
+
+    def detail(self, class_id: int, date_from: Optional[str] = None, date_to: Optional[str] = None) -> list[list[Any]]:
+        validate_date_range(date_from, date_to)
+        return self._cached(
+            "detail",
+            class_id,
+            date_from,
+            date_to,
+            lambda: [list(row) for row in self.iter_detail_rows(class_id, date_from, date_to)],
+            lambda rows: [list(r) for r in rows],
+        )
+
+    def class_analytics(
+        self,
+        class_id: int,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        *,
+        top: int = 10,
+    ) -> dict[str, Any]:
+        """Vectorized per-class analytics (attendance rate, late ratio, streaks, turnout, at-risk)."""
+        validate_date_range(date_from, date_to)
+        try:
+            from src.services.analytics_service import class_analytics, load_matrix
+        except ImportError as e:
+            raise RuntimeError("Class analytics requires numpy (pip install numpy).") from e
+
+        return self._cached(
+            f"analytics:{top}",
+            class_id,
+            date_from,
+            date_to,
+            lambda: class_analytics(load_matrix(class_id, date_from, date_to, conn=self._external_conn), top=top),
+            copy.deepcopy,   # small (top-N lists), nested
+        )
+
+    def cache_stats(self):
+        return self._cache.stats()
+
+    def _cached(
+        self,
+        report_type: str,
+        class_id: int,
+        date_from: Optional[str],
+        date_to: Optional[str],
+        compute: Callable[[], Any],
+        copy_value: Callable[[Any], Any],
+    ) -> Any:
+        """Cached report; callers get their own copy (rows are copied, their scalar cells shared).
+
+        Entries are keyed by database file as well: the cache is process-wide
+        and class versions of two databases can coincide. In-memory databases
+        are not cached.
+        """
+        db_file = self._db_file()
+        if db_file is None:
+            return compute()
+        version = self._class_version(class_id)
+        key = (db_file, class_id, date_from, date_to, report_type)
+        value = self._cache.get(key, version)
+        if value is None:
+            value = compute()
+            self._cache.put(key, version, value)
+        return copy_value(value)
+
+    def _class_version(self, class_id: int) -> int:
+        if self._external_conn is not None:
+            return self._class_repo.get_version(class_id)
+        conn = get_conn()
+        try:
+            return ClassRepo(conn).get_version(class_id)
+        finally:
+            conn.close()
 
-        enrollments = self._enrollment_repo.list_by_filter(class_id=class_id)
-        sessions = self._session_repo.list_by_filter(class_id=class_id, date_from=date_from, date_to=date_to)
-        session_ids = [s.session_id for s in sessions]
-
-        summaries: list[dict[str, Any]] = []
-        for e in enrollments:
-            sid = e.student_id
-            counts = {"student_id": sid, "present": 0, "late": 0, "absent": 0, "excused": 0}
-
-            for sess_id in session_ids:
-                rec = self._attendance_repo.get_by_session_student(sess_id, sid)
-                if not rec:
-                    counts["absent"] += 1
-                    continue
-                st = rec.status
-                if st == AttendanceStatus.PRESENT.value:
-                    counts["present"] += 1
-                elif st == AttendanceStatus.LATE.value:
-                    counts["late"] += 1
-                elif st == AttendanceStatus.ABSENT.value:
-                    counts["absent"] += 1
-                elif st == AttendanceStatus.EXCUSED.value:
-                    counts["excused"] += 1
-                else:
-                    counts["absent"] += 1
-
-            counts["total"] = counts["present"] + counts["late"] + counts["absent"] + counts["excused"]
-            summaries.append(counts)
-
-        return summaries
+    def iter_summary_rows(self, class_id: int, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Iterator[tuple]:
+        """Yield (student_id, present, late, absent, excused, total) per enrolled student.
+
+        Counts come from the daily_rollups running totals: the last row on or
+        before `date_to` minus the last row before `date_from`, i.e. two lookups
+        per student whatever the range. Sessions without a record (or with an
+        unknown status) count as Absent, same as the per-record rule used
+        everywhere else.
+        """
+        date_sql, date_params = self._session_filter(date_from, date_to)
+        sql = """
+            SELECT
+                e.student_id,
+                COALESCE(hi.cum_present, 0) - COALESCE(lo.cum_present, 0) AS present,
+                COALESCE(hi.cum_late, 0) - COALESCE(lo.cum_late, 0) AS late,
+                COALESCE(hi.cum_excused, 0) - COALESCE(lo.cum_excused, 0) AS excused
+            FROM enrollments e
+            LEFT JOIN daily_rollups hi
+                ON hi.class_id = e.class_id AND hi.student_id = e.student_id AND hi.day = (
+                    SELECT MAX(day) FROM daily_rollups
+                    WHERE class_id = e.class_id AND student_id = e.student_id AND day <= ?)
+            LEFT JOIN daily_rollups lo
+                ON lo.class_id = e.class_id AND lo.student_id = e.student_id AND lo.day = (
+                    SELECT MAX(day) FROM daily_rollups
+                    WHERE class_id = e.class_id AND student_id = e.student_id AND day < ?)
+            WHERE e.class_id = ?
+            ORDER BY e.student_id
+        """
+        params = (date_to or _LAST_DAY, date_from or "", class_id)
+        conn = self._conn()
+        began = not conn.in_transaction
+        try:
+            if began:
+                conn.execute("BEGIN")   # one snapshot: a session or record committed in between would skew absent
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM attendance_sessions s WHERE s.class_id = ?{date_sql}", (class_id, *date_params)
+            ).fetchone()[0]
+            for student_id, present, late, excused in self._stream(sql, params, conn):
+                yield student_id, present, late, total - present - late - excused, excused, total
+        finally:
+            if began:
+                conn.commit()
+            if self._external_conn is None:
+                conn.close()
+
+    def iter_detail_rows(self, class_id: int, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Iterator[tuple]:
+        """Yield (session_id, date, time, student_id, status, note) for every session x enrolled student."""
+        date_sql, date_params = self._session_filter(date_from, date_to)
+        sql = f"""
+            SELECT
+                s.session_id, s.session_date, s.start_time, e.student_id,
+                {AttendanceStatus.sql_label('COALESCE(ar.status, ?)')} AS status,
+                COALESCE(NULLIF(ar.note, ''), '-') AS note
+            FROM attendance_sessions s
+            JOIN enrollments e ON e.class_id = s.class_id
+            LEFT JOIN attendance_records ar
+                ON ar.session_id = s.session_id AND ar.student_id = e.student_id
+            WHERE s.class_id = ?{date_sql}
+            ORDER BY s.session_date DESC, s.start_time DESC, e.student_id
+        """
+        yield from self._stream(sql, (AttendanceStatus.ABSENT.code, class_id, *date_params))
+
+    @staticmethod
+    def _session_filter(date_from: Optional[str], date_to: Optional[str]) -> tuple[str, list[Any]]:
+        """Sessions in the date range that have taken place (a SCHEDULED one is not counted yet)."""
+        sql, params = " AND s.status <> ?", [SessionStatus.SCHEDULED.code]
+        if date_from is not None:
+            sql += " AND s.session_date >= ?"
+            params.append(date_from)
+        if date_to is not None:
+            sql += " AND s.session_date <= ?"
+            params.append(date_to)
+        return sql, params
+
+    def _stream(self, sql: str, params: tuple, conn: Optional[sqlite3.Connection] = None) -> Iterator[tuple]:
+        """Rows in batches of _FETCH_SIZE, on `conn` if given (left open), else on the service's connection."""
+        owned = conn is None and self._external_conn is None
+        conn = conn or self._conn()
+        try:
+            cur = conn.execute(sql, params)
+            while True:
+                batch = cur.fetchmany(_FETCH_SIZE)
+                if not batch:
+                    break
+                for row in batch:
+                    yield tuple(row)
+        finally:
+            if owned:
+                conn.close()
 
     def export_excel(self, class_id: int, output_path: str, date_from: Optional[str] = None, date_to: Optional[str] = None) -> str:
         validate_date_range(date_from, date_to)
+        t0 = time.perf_counter()
 
         class_info = self._class_repo.get_by_id(class_id)
         if not class_info:
@@ -72,6 +284,9 @@ class ReportService:
             os.makedirs(output_path, exist_ok=True)
             file_path = os.path.join(output_path, f"Attendance_{class_info.class_code}.xlsx")
 
+        # openpyxl is heavy; only load it when an export is actually requested
+        from openpyxl import Workbook
+
         wb = Workbook()
         # remove default later
         self._create_summary_sheet(wb, class_id, date_from, date_to)
@@ -81,9 +296,173 @@ class ReportService:
             wb.remove(wb["Sheet"])
 
         wb.save(file_path)
+        _EXPORT_TIME.observe(time.perf_counter() - t0, labels=("xlsx",))
+        return file_path
+
+    def export_flat(
+        self,
+        class_id: int,
+        output_path: str,
+        *,
+        fmt: str = "csv",
+        dataset: str = "summary",
+        compress: bool = False,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> str:
+        """UC13 flat export: stream the summary or detail dataset to CSV / JSON Lines.
+
+        Rows are written straight from the DB cursor, so memory stays constant
+        regardless of class size. `compress=True` writes gzip (`.gz`).
+        """
+        validate_date_range(date_from, date_to)
+        t0 = time.perf_counter()
+        if fmt not in FLAT_FORMATS:
+            raise ValueError(f"fmt must be one of {list(FLAT_FORMATS)}, got '{fmt}'")
+        if dataset not in DATASETS:
+            raise ValueError(f"dataset must be one of {list(DATASETS)}, got '{dataset}'")
+
+        class_info = self._class_repo.get_by_id(class_id)
+        if not class_info:
+            raise ValueError(f"Class {class_id} not found")
+
+        ext = f".{fmt}" + (".gz" if compress else "")
+        if output_path.lower().endswith(ext):
+            file_path = output_path
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        else:
+            os.makedirs(output_path, exist_ok=True)
+            file_path = os.path.join(output_path, f"Attendance_{class_info.class_code}_{dataset}{ext}")
+
+        if dataset == "summary":
+            rows, headers, keys = self.iter_summary_rows(class_id, date_from, date_to), SUMMARY_HEADERS, SUMMARY_KEYS
+        else:
+            rows, headers, keys = self.iter_detail_rows(class_id, date_from, date_to), DETAIL_HEADERS, DETAIL_KEYS
+
+        opener = gzip.open if compress else open
+        with opener(file_path, "wt", encoding="utf-8", newline="") as f:
+            if fmt == "csv":
+                self._write_csv(f, headers, rows)
+            else:
+                self._write_jsonl(f, keys, rows)
+        _EXPORT_TIME.observe(time.perf_counter() - t0, labels=(fmt,))
         return file_path
 
+    def export_csv(self, class_id: int, output_path: str, **kwargs: Any) -> str:
+        return self.export_flat(class_id, output_path, fmt="csv", **kwargs)
+
+    def export_jsonl(self, class_id: int, output_path: str, **kwargs: Any) -> str:
+        return self.export_flat(class_id, output_path, fmt="jsonl", **kwargs)
+
+    @staticmethod
+    def _write_csv(f: TextIO, headers: list[str], rows: Iterator[tuple]) -> None:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+
+    @staticmethod
+    def _write_jsonl(f: TextIO, keys: list[str], rows: Iterator[tuple]) -> None:
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        f.writelines(dumps(dict(zip(keys, row))) + "\n" for row in rows)
+
+    def export_excel_bulk(
+        self,
+        output_dir: str,
+        *,
+        lecturer_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        progress: Optional[Callable[[int, int, BulkExportItem], None]] = None,
+    ) -> BulkExportResult:
+        """UC13 bulk: export every class (or every class of `lecturer_id`) to its own workbook.
+
+        Classes are fanned out across a process pool; each worker opens its own
+        read connection. A `manifest.json` listing the produced files is written
+        to `output_dir`. `progress(done, total, item)` is called as classes finish.
+        """
+        validate_date_range(date_from, date_to)
+        if output_dir.lower().endswith(".xlsx"):
+            raise ValueError("Bulk export needs an output folder, not a .xlsx file path.")
+        os.makedirs(output_dir, exist_ok=True)
+
+        classes = self._class_repo.list_by_filter(lecturer_id=lecturer_id)
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(classes) or 1))
+        result = BulkExportResult(workers=workers)
+        t0 = time.perf_counter()
+
+        db_path = self._db_path()
+        jobs = [(db_path, c.class_id, c.class_code, output_dir, date_from, date_to) for c in classes]
+        if workers == 1:
+            for n, args in enumerate(jobs, start=1):
+                item = _export_class_worker(*args)
+                result.items.append(item)
+                if progress:
+                    progress(n, len(jobs), item)
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_export_class_worker, *args) for args in jobs]
+                try:
+                    for n, fut in enumerate(as_completed(futures), start=1):
+                        item = fut.result()
+                        result.items.append(item)
+                        if progress:
+                            progress(n, len(jobs), item)
+                except BaseException:
+                    # e.g. progress() raising to cancel: don't start the classes still waiting
+                    for fut in futures:
+                        fut.cancel()
+                    raise
+
+        result.items.sort(key=lambda i: i.class_code)
+        result.wall_ms = (time.perf_counter() - t0) * 1000
+        _EXPORT_TIME.observe(result.wall_ms / 1000, labels=("xlsx_bulk",))
+        result.manifest_path = self._write_manifest(output_dir, result, lecturer_id, date_from, date_to)
+        return result
+
+    def _db_file(self) -> Optional[str]:
+        """Absolute path of the main database behind this service's connection (else db.DB_PATH); None if in-memory."""
+        if self._external_conn is None:
+            return os.path.abspath(db.DB_PATH)
+        for _, name, file in self._external_conn.execute("PRAGMA database_list"):
+            if name == "main":
+                return file or None
+        return None
+
+    def _db_path(self) -> str:
+        """File the workers must open: the one behind this service's connection, else db.DB_PATH."""
+        file = self._db_file()
+        if file is None:
+            raise ValueError("Bulk export needs a file database; this connection is in-memory.")
+        return file
+
+    def _write_manifest(
+        self,
+        output_dir: str,
+        result: BulkExportResult,
+        lecturer_id: Optional[int],
+        date_from: Optional[str],
+        date_to: Optional[str],
+    ) -> str:
+        manifest = {
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "lecturer_id": lecturer_id,
+            "date_from": date_from,
+            "date_to": date_to,
+            "workers": result.workers,
+            "wall_ms": round(result.wall_ms, 1),
+            "files": [vars(i) for i in result.items],
+        }
+        path = os.path.join(output_dir, MANIFEST_NAME)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return path
+
     def _style_header(self, ws, row_idx: int) -> None:
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
         header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
         header_font = Font(bold=True, color="FFFFFF")
         border = Border(left=Side(style="thin"), right=Side(style="thin"), top=Side(style="thin"), bottom=Side(style="thin"))
@@ -96,30 +475,22 @@ class ReportService:
     def _create_summary_sheet(self, wb: Workbook, class_id: int, date_from: Optional[str], date_to: Optional[str]) -> None:
         ws = wb.active
         ws.title = "Summary"
-        headers = ["Student ID", "Present", "Late", "Absent", "Excused", "Total"]
-        ws.append(headers)
+        ws.append(SUMMARY_HEADERS)
         self._style_header(ws, 1)
 
-        for s in self.summarize(class_id, date_from, date_to):
-            ws.append([s["student_id"], s["present"], s["late"], s["absent"], s["excused"], s["total"]])
+        for summary in self.summarize(class_id, date_from, date_to):
+            ws.append([summary[k] for k in SUMMARY_KEYS])
 
         for col in ["A","B","C","D","E","F"]:
             ws.column_dimensions[col].width = 14
 
     def _create_detail_sheet(self, wb: Workbook, class_id: int, date_from: Optional[str], date_to: Optional[str]) -> None:
         ws = wb.create_sheet("Detail")
-        headers = ["Session ID", "Date", "Time", "Student ID", "Status", "Note"]
-        ws.append(headers)
+        ws.append(DETAIL_HEADERS)
         self._style_header(ws, 1)
 
-        sessions = self._session_repo.list_by_filter(class_id=class_id, date_from=date_from, date_to=date_to)
-        enrollments = self._enrollment_repo.list_by_filter(class_id=class_id)
-        for sess in sessions:
-            for e in enrollments:
-                rec = self._attendance_repo.get_by_session_student(sess.session_id, e.student_id)
-                status = rec.status if rec else AttendanceStatus.ABSENT.value
-                note = rec.note if rec and rec.note else "-"
-                ws.append([sess.session_id, sess.session_date, sess.start_time, e.student_id, status, note])
+        for row in self.detail(class_id, date_from, date_to):
+            ws.append(row)
 
         for col in ["A","B","C","D","E","F"]:
             ws.column_dimensions[col].width = 16
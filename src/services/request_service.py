@@ -45,9 +45,9 @@ class RequestService:
     def list_by_student(self, student_id: int) -> list[dict[str, Any]]:
         conn = get_conn()
         rows = conn.execute(
-            """
+            f"""
             SELECT
-                r.request_id, r.session_id, r.request_type, r.status, r.reason, r.created_at, r.updated_at,
+                r.request_id, r.session_id, r.request_type, {RequestStatus.sql_label('r.status')} AS status, r.reason, r.created_at, r.updated_at,
                 s.session_date, s.start_time, s.class_id,
                 c.class_code, c.class_name
             FROM absence_requests r
@@ -65,7 +65,7 @@ class RequestService:
         conn = get_conn()
         row = conn.execute(
             "SELECT COUNT(*) AS n FROM absence_requests WHERE student_id=? AND status=?",
-            (student_id, RequestStatus.PENDING.value),
+            (student_id, RequestStatus.PENDING.code),
         ).fetchone()
         conn.close()
         return int(row["n"])
@@ -73,9 +73,10 @@ class RequestService:
     def list_pending_for_lecturer(self, lecturer_id: int) -> list[dict[str, Any]]:
         conn = get_conn()
         rows = conn.execute(
-            """
+            f"""
             SELECT
-                r.request_id, r.student_id, r.session_id, r.request_type, r.reason, r.status, r.created_at,
+                r.request_id, r.student_id, r.session_id, r.request_type, r.reason,
+                {RequestStatus.sql_label('r.status')} AS status, r.created_at,
                 s.session_date, s.start_time,
                 c.class_id, c.class_code, c.class_name,
                 COALESCE(u.full_name, u.username) AS student_name
@@ -86,7 +87,7 @@ class RequestService:
             WHERE r.status = ? AND c.lecturer_id = ?
             ORDER BY r.created_at DESC
             """,
-            (RequestStatus.PENDING.value, lecturer_id),
+            (RequestStatus.PENDING.code, lecturer_id),
         ).fetchall()
         conn.close()
         return [dict(x) for x in rows]
@@ -101,7 +102,7 @@ class RequestService:
             JOIN classes c ON s.class_id = c.class_id
             WHERE r.status=? AND c.lecturer_id=?
             """,
-            (RequestStatus.PENDING.value, lecturer_id),
+            (RequestStatus.PENDING.code, lecturer_id),
         ).fetchone()
         conn.close()
         return int(row["n"])
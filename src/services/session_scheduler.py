@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.models.enums import SessionStatus
+from src.repositories.session_repo import SessionRepo, SessionRow
+from src.services.warning_service import WarningService
+from src.utils.time_utils import now
+
+REFRESH_INTERVAL_S = 60.0
+
+# Heap tags; at the same instant a session is opened before it is closed.
+_OPEN, _CLOSE = 0, 1
+
+
+def session_start(session: SessionRow) -> datetime:
+    return datetime.strptime(f"{session.session_date} {session.start_time}", "%Y-%m-%d %H:%M")
+
+
+def session_end(session: SessionRow) -> datetime:
+    return session_start(session) + timedelta(minutes=int(session.duration_min))
+
+
+@dataclass
+class ExpiryResult:
+    closed_session_ids: list[int] = field(default_factory=list)
+    class_ids: list[int] = field(default_factory=list)
+    warnings_created: int = 0
+    opened_session_ids: list[int] = field(default_factory=list)
+
+
+class SessionExpiryScheduler:
+    """Open SCHEDULED sessions at start_time; auto-close OPEN sessions once start_time + duration_min has passed.
+
+    Due transitions are kept in a min-heap ordered by time, so each tick only
+    looks at the sessions that actually reached their start or end. All due
+    sessions are opened, then closed, in one transaction each, and warnings are
+    evaluated once per class that had a session closed.
+    """
+
+    def __init__(self, session_repo: Optional[SessionRepo] = None, warning_service: Optional[WarningService] = None) -> None:
+        self.session_repo = session_repo or SessionRepo()
+        self.warning_service = warning_service or WarningService()
+        self._heap: list[tuple[datetime, int, int, int]] = []  # (when, _OPEN/_CLOSE, session_id, class_id)
+        self.last_error: Optional[Exception] = None
+
+    def refresh(self, at: Optional[datetime] = None) -> int:
+        """Reload the heap from the DB (picks up sessions created by other processes).
+
+        SCHEDULED sessions are only loaded up to the day after `at`; later ones
+        are picked up by a later refresh.
+        """
+        at = at or now()
+        heap = [(session_end(s), _CLOSE, s.session_id, s.class_id)
+                for s in self.session_repo.list_by_filter(status=SessionStatus.OPEN.value)]
+        horizon = (at + timedelta(days=1)).strftime("%Y-%m-%d")
+        for s in self.session_repo.list_by_filter(status=SessionStatus.SCHEDULED.value, date_to=horizon):
+            heap.append((session_start(s), _OPEN, s.session_id, s.class_id))
+            heap.append((session_end(s), _CLOSE, s.session_id, s.class_id))
+        heapq.heapify(heap)
+        self._heap = heap
+        return len(self._heap)
+
+    def next_expiry(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    def close_expired(self, at: Optional[datetime] = None) -> ExpiryResult:
+        """Open the SCHEDULED sessions that have started, then close the OPEN ones that have ended."""
+        at = at or now()
+        due: dict[int, list[tuple[int, int]]] = {_OPEN: [], _CLOSE: []}
+        while self._heap and self._heap[0][0] <= at:
+            _, action, session_id, class_id = heapq.heappop(self._heap)
+            due[action].append((session_id, class_id))
+
+        result = ExpiryResult()
+        if due[_OPEN]:
+            result.opened_session_ids = self.session_repo.set_status_many(
+                [sid for sid, _ in due[_OPEN]],
+                from_status=SessionStatus.SCHEDULED.value,
+                to_status=SessionStatus.OPEN.value,
+            )
+        expired = due[_CLOSE]
+        if not expired:
+            return result
+
+        # sessions someone else closed (or deleted) in the meantime are not ours to report
+        closed = set(self.session_repo.set_status_many(
+            [sid for sid, _ in expired],
+            from_status=SessionStatus.OPEN.value,
+            to_status=SessionStatus.CLOSED.value,
+        ))
+        result.closed_session_ids = [sid for sid, _ in expired if sid in closed]
+        result.class_ids = sorted({cid for sid, cid in expired if sid in closed})
+        for class_id in result.class_ids:
+            result.warnings_created += self.warning_service.evaluate_and_generate_for_class(class_id)
+        return result
+
+    def run_once(self, at: Optional[datetime] = None) -> ExpiryResult:
+        self.refresh(at)
+        return self.close_expired(at)
+
+    def run_forever(self, stop_event: threading.Event, *, refresh_interval_s: float = REFRESH_INTERVAL_S) -> None:
+        """Sleep until the next start/end (or the next refresh), open/close, repeat until `stop_event` is set."""
+        last_refresh: Optional[datetime] = None
+        while not stop_event.is_set():
+            current = now()
+            try:
+                if last_refresh is None or (current - last_refresh).total_seconds() >= refresh_interval_s:
+                    self.refresh(current)
+                    last_refresh = current
+                self.close_expired(current)
+                self.last_error = None
+            except sqlite3.Error as e:
+                # never let the scheduler take down the app; the next refresh retries
+                self.last_error, last_refresh = e, None
+
+            wait_s = refresh_interval_s
+            nxt = self.next_expiry()
+            if nxt is not None:
+                wait_s = min(wait_s, max(0.0, (nxt - now()).total_seconds()))
+            stop_event.wait(wait_s)
+
+
+class SessionExpiryDaemon(threading.Thread):
+    """Runs `SessionExpiryScheduler.run_forever` in a background thread."""
+
+    def __init__(self, scheduler: Optional[SessionExpiryScheduler] = None, *, refresh_interval_s: float = REFRESH_INTERVAL_S) -> None:
+        super().__init__(name="sas-session-expiry", daemon=True)
+        self.scheduler = scheduler or SessionExpiryScheduler()
+        self.refresh_interval_s = refresh_interval_s
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        self.scheduler.run_forever(self._stop_event, refresh_interval_s=self.refresh_interval_s)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        self.join(timeout)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from src.services.metrics_service import add_metrics_arguments, start_from_args as start_metrics
+
+    parser = argparse.ArgumentParser(description="Open scheduled and close expired attendance sessions")
+    parser.add_argument("--daemon", action="store_true", help="keep running and open/close sessions as they start/expire")
+    parser.add_argument("--refresh", type=float, default=REFRESH_INTERVAL_S, help="seconds between DB rescans in daemon mode")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    start_metrics(args)
+
+    scheduler = SessionExpiryScheduler()
+    if not args.daemon:
+        result = scheduler.run_once()
+        print(f"Opened {len(result.opened_session_ids)} session(s). "
+              f"Closed {len(result.closed_session_ids)} session(s) in {len(result.class_ids)} class(es); "
+              f"{result.warnings_created} new warning(s).")
+        return 0
+
+    stop = threading.Event()
+    try:
+        scheduler.run_forever(stop, refresh_interval_s=args.refresh)
+    except KeyboardInterrupt:
+        stop.set()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
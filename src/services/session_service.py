@@ -1,15 +1,23 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import secrets
 
 from src.models.enums import SessionStatus
-from src.utils.validators import validate_date, validate_time, validate_duration_minutes, validate_pin
+from src.utils.validators import (
+    validate_date, validate_date_range, validate_time, validate_duration_minutes, validate_pin,
+)
+from src.repositories.db import get_conn
+from src.repositories.transactions import run_write
 from src.repositories.session_repo import SessionRepo
 from src.repositories.class_repo import ClassRepo
 
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# Guard against typos such as a 2205 end date; a 15-week term of 5 classes x 3 slots is 225.
+MAX_SCHEDULE_SESSIONS = 2000
+
 
 @dataclass
 class CreateSessionInput:
@@ -22,6 +30,72 @@ class CreateSessionInput:
     lecturer_id: Optional[int] = None  # optional check ownership
 
 
+@dataclass
+class RecurringScheduleInput:
+    class_ids: list[int]
+    weekdays: list[int]            # 0 = Monday ... 6 = Sunday (date.weekday())
+    start_time: str                # HH:MM
+    duration_min: int
+    date_from: str                 # YYYY-MM-DD, first day of the term
+    date_to: str                   # YYYY-MM-DD, inclusive
+    pin_enabled: bool = False      # each session gets its own random 6-digit PIN
+    holidays: set[str] = field(default_factory=set)                   # no session on these dates
+    exceptions: dict[str, Optional[str]] = field(default_factory=dict)  # date -> other HH:MM, or None to cancel
+    lecturer_id: Optional[int] = None  # optional check ownership
+
+
+@dataclass
+class PlannedSession:
+    class_id: int
+    session_date: str
+    start_time: str
+
+
+@dataclass
+class SchedulePlan:
+    sessions: list[PlannedSession]   # what would be created
+    clashes: list[PlannedSession]    # same (class, date, start time) as an existing session
+    skipped_dates: list[str]         # matching weekdays dropped as holidays / cancelled exceptions
+
+
+def parse_weekdays(text: str) -> list[int]:
+    """'Mon,Wed' or 'mon wed fri' -> [0, 2, 4]."""
+    days = []
+    for token in text.replace(",", " ").split():
+        key = token.strip().lower()[:3]
+        if key not in WEEKDAYS:
+            raise ValueError(f"Unknown weekday '{token}'. Use Mon, Tue, Wed, Thu, Fri, Sat, Sun.")
+        days.append(WEEKDAYS.index(key))
+    if not days:
+        raise ValueError("At least one weekday is required.")
+    return sorted(set(days))
+
+
+def expand_dates(
+    weekdays: list[int], date_from: str, date_to: str, *, start_time: str,
+    holidays: Optional[set[str]] = None, exceptions: Optional[dict[str, Optional[str]]] = None,
+) -> tuple[list[tuple[str, str]], list[str]]:
+    """(date, start time) slots of a weekly rule, and the matching dates that were skipped."""
+    holidays = holidays or set()
+    exceptions = exceptions or {}
+    wanted = set(weekdays)
+    slots, skipped = [], []
+    day, last = date.fromisoformat(date_from), date.fromisoformat(date_to)
+    while day <= last:
+        if day.weekday() in wanted:
+            d = day.isoformat()
+            if d in holidays or (d in exceptions and exceptions[d] is None):
+                skipped.append(d)
+            else:
+                slots.append((d, exceptions.get(d) or start_time))
+        day += timedelta(days=1)
+    return slots, skipped
+
+
+def _new_pin() -> str:
+    return f"{secrets.randbelow(1_000_000):06d}"
+
+
 class SessionService:
     """UC06 Create Attendance Session; UC07 Close Session."""
 
@@ -46,7 +120,7 @@ class SessionService:
             if data.pin_code and data.pin_code.strip():
                 pin_code = validate_pin(data.pin_code.strip())
             else:
-                pin_code = f"{secrets.randbelow(1_000_000):06d}"
+                pin_code = _new_pin()
 
         created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -61,10 +135,116 @@ class SessionService:
             created_at=created_at,
         )
 
+    def open_session(self, session_id: int) -> None:
+        """Open a SCHEDULED session now instead of at its start time."""
+        session = self.session_repo.get_by_id(session_id)
+        if not session:
+            raise ValueError("Session not found.")
+        if session.status == SessionStatus.OPEN.value:
+            return
+        if session.status == SessionStatus.CLOSED.value:
+            raise ValueError("Session is closed.")
+        # conditional: the scheduler may open it at the same moment
+        self.session_repo.set_status_many(
+            [session_id], from_status=SessionStatus.SCHEDULED.value, to_status=SessionStatus.OPEN.value
+        )
+
     def close_session(self, session_id: int) -> None:
         session = self.session_repo.get_by_id(session_id)
         if not session:
             raise ValueError("Session not found.")
         if session.status == SessionStatus.CLOSED.value:
             return
+        if session.status == SessionStatus.SCHEDULED.value:
+            raise ValueError("Session has not started yet.")   # delete it to cancel; a closed session counts as held
         self.session_repo.update(session_id, status=SessionStatus.CLOSED.value)
+
+    # -----------------------
+    # Recurring schedule (a whole term at once)
+    # -----------------------
+    def plan_recurring(self, data: RecurringScheduleInput) -> SchedulePlan:
+        """Expand the rule and check it against existing sessions, without writing anything."""
+        self._validate_recurring(data)
+        return self._plan(data, self.session_repo)
+
+    def create_recurring(self, data: RecurringScheduleInput, *, skip_clashes: bool = False) -> SchedulePlan:
+        """Create every session of the rule in one transaction; returns the plan that was applied.
+
+        Clashes with existing sessions are re-checked inside the write
+        transaction. They abort the whole batch unless `skip_clashes`, in which
+        case only the free slots are created. Sessions are created SCHEDULED:
+        no check-in and no Absent counts until SessionExpiryScheduler opens
+        each one at its start time.
+        """
+        self._validate_recurring(data)
+        conn = get_conn()
+        repo = SessionRepo(conn)
+
+        def write() -> SchedulePlan:
+            plan = self._plan(data, repo)
+            if plan.clashes and not skip_clashes:
+                first = plan.clashes[0]
+                raise ValueError(
+                    f"{len(plan.clashes)} session(s) already exist, e.g. ClassID={first.class_id} "
+                    f"on {first.session_date} {first.start_time}."
+                )
+            created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            repo.create_many([
+                (
+                    p.class_id, p.session_date, p.start_time, data.duration_min,
+                    1 if data.pin_enabled else 0, _new_pin() if data.pin_enabled else None,
+                    SessionStatus.SCHEDULED.value, created_at,
+                )
+                for p in plan.sessions
+            ])
+            return plan
+
+        try:
+            return run_write(conn, write)
+        finally:
+            conn.close()
+
+    def _validate_recurring(self, data: RecurringScheduleInput) -> None:
+        validate_date(data.date_from)
+        validate_date(data.date_to)
+        validate_date_range(data.date_from, data.date_to)
+        validate_time(data.start_time)
+        validate_duration_minutes(data.duration_min)
+        for d, t in data.exceptions.items():
+            validate_date(d)
+            if t is not None:
+                validate_time(t)
+        for d in data.holidays:
+            validate_date(d)
+        if not data.class_ids:
+            raise ValueError("At least one class is required.")
+        if not data.weekdays or any(not 0 <= w <= 6 for w in data.weekdays):
+            raise ValueError("Weekdays must be between 0 (Monday) and 6 (Sunday).")
+
+        for class_id in set(data.class_ids):
+            cls = self.class_repo.get_by_id(class_id)
+            if not cls:
+                raise ValueError(f"Class not found (ClassID={class_id}).")
+            if data.lecturer_id is not None and cls.lecturer_id != data.lecturer_id:
+                raise ValueError(f"You are not the lecturer of ClassID={class_id}.")
+
+    def _plan(self, data: RecurringScheduleInput, repo: SessionRepo) -> SchedulePlan:
+        slots, skipped = expand_dates(
+            data.weekdays, data.date_from, data.date_to,
+            holidays=data.holidays, exceptions=data.exceptions, start_time=data.start_time,
+        )
+        class_ids = sorted(set(data.class_ids))
+        if len(slots) * len(class_ids) > MAX_SCHEDULE_SESSIONS:
+            raise ValueError(f"Schedule would create more than {MAX_SCHEDULE_SESSIONS} sessions; check the dates.")
+
+        # one indexed read of the UNIQUE keys in the range, then everything is checked in memory
+        taken = repo.list_keys(class_ids, date_from=data.date_from, date_to=data.date_to)
+        sessions, clashes = [], []
+        for class_id in class_ids:
+            for d, t in slots:
+                planned = PlannedSession(class_id, d, t)
+                if (class_id, d, t) in taken:
+                    clashes.append(planned)
+                else:
+                    sessions.append(planned)
+        return SchedulePlan(sessions, clashes, skipped)
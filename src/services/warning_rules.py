@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import ClassVar, Iterable, Optional
+
+from src.models.enums import AttendanceStatus, SessionStatus
+from src.repositories.db import get_conn
+
+
+@dataclass
+class StudentStats:
+    """Per (class, student) status counts over all sessions of the class (missing record = Absent)."""
+    class_id: int
+    student_id: int
+    total: int
+    present: int
+    late: int
+    absent: int
+    excused: int
+    longest_absent_streak: Optional[int] = None  # only computed when a rule needs sequences
+
+
+@dataclass(frozen=True)
+class WarningRule:
+    threshold: float
+    kind: ClassVar[str] = ""
+    needs_sequence: ClassVar[bool] = False
+
+    def message(self) -> str:
+        raise NotImplementedError
+
+    def matches(self, stats: StudentStats) -> bool:
+        raise NotImplementedError
+
+    def _n(self) -> str:
+        return f"{self.threshold:g}"
+
+
+@dataclass(frozen=True)
+class AbsenceCountRule(WarningRule):
+    kind: ClassVar[str] = "absence_count"
+
+    def message(self) -> str:
+        return f"Absence threshold reached ({self._n()})"
+
+    def matches(self, stats: StudentStats) -> bool:
+        return stats.absent >= self.threshold
+
+
+@dataclass(frozen=True)
+class LateCountRule(WarningRule):
+    kind: ClassVar[str] = "late_count"
+
+    def message(self) -> str:
+        return f"Late threshold reached ({self._n()})"
+
+    def matches(self, stats: StudentStats) -> bool:
+        return stats.late >= self.threshold
+
+
+@dataclass(frozen=True)
+class AbsencePercentRule(WarningRule):
+    kind: ClassVar[str] = "absence_percent"
+
+    def message(self) -> str:
+        return f"Absence rate reached ({self._n()}%)"
+
+    def matches(self, stats: StudentStats) -> bool:
+        return stats.total > 0 and stats.absent * 100.0 / stats.total >= self.threshold
+
+
+@dataclass(frozen=True)
+class ConsecutiveAbsenceRule(WarningRule):
+    kind: ClassVar[str] = "consecutive_absences"
+    needs_sequence: ClassVar[bool] = True
+
+    def message(self) -> str:
+        return f"Consecutive absences reached ({self._n()})"
+
+    def matches(self, stats: StudentStats) -> bool:
+        return (stats.longest_absent_streak or 0) >= self.threshold
+
+
+RULE_TYPES: dict[str, type[WarningRule]] = {
+    r.kind: r for r in (AbsenceCountRule, LateCountRule, AbsencePercentRule, ConsecutiveAbsenceRule)
+}
+
+
+def build_rule(kind: str, threshold: float) -> WarningRule:
+    if kind not in RULE_TYPES:
+        raise ValueError(f"Unknown rule kind '{kind}'. Allowed: {', '.join(sorted(RULE_TYPES))}.")
+    if threshold <= 0:
+        raise ValueError("Rule threshold must be > 0.")
+    return RULE_TYPES[kind](threshold)
+
+
+@dataclass
+class RuleEvaluation:
+    classes: int = 0
+    pairs: int = 0
+    hits: list[tuple[int, int, str]] = field(default_factory=list)  # (student_id, class_id, message)
+    hits_by_rule: dict[str, int] = field(default_factory=dict)
+    build_ms: float = 0.0
+    eval_ms: float = 0.0
+
+
+class WarningRuleEngine:
+    """Evaluates every configured rule against one precomputed per-class count/sequence structure.
+
+    Counts come from a single grouped query; the session-ordered status scan
+    (for streak rules) only runs when such a rule is configured.
+    """
+
+    def __init__(self, rules_by_class: dict[Optional[int], list[WarningRule]], default_rules: list[WarningRule]) -> None:
+        self.rules_by_class = rules_by_class  # None key = institution default
+        self.default_rules = default_rules
+
+    def rules_for(self, class_id: int) -> list[WarningRule]:
+        return self.rules_by_class.get(class_id) or self.rules_by_class.get(None) or self.default_rules
+
+    def evaluate(self, *, class_id: Optional[int] = None) -> RuleEvaluation:
+        result = RuleEvaluation()
+        t0 = time.perf_counter()
+        stats = self._load_stats(class_id)
+        if any(r.needs_sequence for rules in self._rule_sets(stats) for r in rules):
+            self._load_streaks(stats, class_id)
+        result.build_ms = (time.perf_counter() - t0) * 1000
+
+        t1 = time.perf_counter()
+        classes: set[int] = set()
+        for st in stats.values():
+            classes.add(st.class_id)
+            for rule in self.rules_for(st.class_id):
+                if rule.matches(st):
+                    result.hits.append((st.student_id, st.class_id, rule.message()))
+                    result.hits_by_rule[rule.kind] = result.hits_by_rule.get(rule.kind, 0) + 1
+        result.eval_ms = (time.perf_counter() - t1) * 1000
+        result.classes = len(classes)
+        result.pairs = len(stats)
+        return result
+
+    def _rule_sets(self, stats: dict[tuple[int, int], StudentStats]) -> Iterable[list[WarningRule]]:
+        return (self.rules_for(cid) for cid in {st.class_id for st in stats.values()})
+
+    def _load_stats(self, class_id: Optional[int]) -> dict[tuple[int, int], StudentStats]:
+        where, params = "", [
+            AttendanceStatus.PRESENT.code,
+            AttendanceStatus.LATE.code,
+            AttendanceStatus.EXCUSED.code,
+            SessionStatus.SCHEDULED.code,
+        ]
+        if class_id is not None:
+            where = "WHERE e.class_id = ?"
+            params.append(class_id)
+
+        conn = get_conn()
+        rows = conn.execute(
+            f"""
+            SELECT
+                e.class_id,
+                e.student_id,
+                COUNT(s.session_id) AS total,
+                COALESCE(SUM(ar.status = ?), 0) AS present,
+                COALESCE(SUM(ar.status = ?), 0) AS late,
+                COALESCE(SUM(ar.status = ?), 0) AS excused
+            FROM enrollments e
+            JOIN attendance_sessions s ON s.class_id = e.class_id AND s.status <> ?
+            LEFT JOIN attendance_records ar
+                ON ar.session_id = s.session_id AND ar.student_id = e.student_id
+            {where}
+            GROUP BY e.class_id, e.student_id
+            """,
+            tuple(params),
+        ).fetchall()
+        conn.close()
+
+        return {
+            (cid, sid): StudentStats(cid, sid, total, present, late, total - present - late - excused, excused)
+            for cid, sid, total, present, late, excused in rows
+        }
+
+    def _load_streaks(self, stats: dict[tuple[int, int], StudentStats], class_id: Optional[int]) -> None:
+        where, params = "", [
+            AttendanceStatus.PRESENT.code, AttendanceStatus.LATE.code, AttendanceStatus.EXCUSED.code, SessionStatus.SCHEDULED.code,
+        ]
+        if class_id is not None:
+            where = "WHERE e.class_id = ?"
+            params.append(class_id)
+
+        conn = get_conn()
+        cur = conn.execute(
+            f"""
+            SELECT e.class_id, e.student_id, COALESCE(ar.status IN (?, ?, ?), 0) AS attended
+            FROM enrollments e
+            JOIN attendance_sessions s ON s.class_id = e.class_id AND s.status <> ?
+            LEFT JOIN attendance_records ar
+                ON ar.session_id = s.session_id AND ar.student_id = e.student_id
+            {where}
+            ORDER BY e.class_id, e.student_id, s.session_date, s.start_time
+            """,
+            tuple(params),
+        )
+        key, run, best = None, 0, 0
+        for cid, sid, attended in cur:
+            if (cid, sid) != key:
+                if key in stats:
+                    stats[key].longest_absent_streak = best
+                key, run, best = (cid, sid), 0, 0
+            run = 0 if attended else run + 1
+            best = max(best, run)
+        if key in stats:
+            stats[key].longest_absent_streak = best
+        conn.close()
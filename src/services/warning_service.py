@@ -1,17 +1,38 @@
 from __future__ import annotations
 
+import argparse
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
 
-from src.models.enums import AttendanceStatus
 from src.repositories.warning_repo import WarningRepo
+from src.repositories.warning_rule_repo import WarningRuleRepo
 from src.repositories.enrollment_repo import EnrollmentRepo
 from src.repositories.session_repo import SessionRepo
 from src.repositories.attendance_repo import AttendanceRepo
 from src.repositories.class_repo import ClassRepo
+from src.services.warning_rules import (
+    RULE_TYPES,
+    AbsenceCountRule,
+    WarningRule,
+    WarningRuleEngine,
+    build_rule,
+)
 
 
-ABSENCE_THRESHOLD = 3  # from spec example "Absence threshold reached (3)"
+ABSENCE_THRESHOLD = 3  # default rule when none configured; spec example "Absence threshold reached (3)"
+
+
+@dataclass
+class SweepResult:
+    classes: int
+    pairs: int
+    created: int
+    elapsed_ms: float
+    build_ms: float = 0.0
+    eval_ms: float = 0.0
+    hits_by_rule: dict[str, int] = field(default_factory=dict)
 
 
 class WarningService:
@@ -23,6 +44,8 @@ class WarningService:
         self.session_repo = SessionRepo()
         self.attendance_repo = AttendanceRepo()
         self.class_repo = ClassRepo()
+        self.rule_repo = WarningRuleRepo()
+        self.last_result: Optional[SweepResult] = None
 
     def list_warnings_for_student(self, student_id: int) -> list[dict]:
         warnings = self.warning_repo.list_by_filter(student_id=student_id)
@@ -35,39 +58,100 @@ class WarningService:
         self.warning_repo.update(warning_id, seen=1)
 
     def evaluate_and_generate_for_class(self, class_id: int) -> int:
-        """Run rule for a class: if a student reaches ABSENCE_THRESHOLD absences -> create warning.
+        """Run the configured rules for a class (default: ABSENCE_THRESHOLD absences) -> create warnings.
         Returns number of new warnings created.
         """
         cls = self.class_repo.get_by_id(class_id)
         if not cls:
             return 0
-
-        # All sessions for class
-        sessions = self.session_repo.list_by_filter(class_id=class_id)
-        session_ids = [s.session_id for s in sessions]
-
-        enrollments = self.enrollment_repo.list_by_filter(class_id=class_id)
-        created = 0
-        for e in enrollments:
-            student_id = e.student_id
-
-            absent_count = 0
-            for sid in session_ids:
-                rec = self.attendance_repo.get_by_session_student(sid, student_id)
-                # Missing record counts as Absent
-                if not rec:
-                    absent_count += 1
-                elif rec.status == AttendanceStatus.ABSENT.value:
-                    absent_count += 1
-
-            if absent_count >= ABSENCE_THRESHOLD:
-                msg = f"Absence threshold reached ({ABSENCE_THRESHOLD})"
-                # avoid duplicates: if same message exists already for this student+class, don't add
-                existing = self.warning_repo.list_by_filter(student_id=student_id, class_id=class_id)
-                if any(w.message == msg for w in existing):
-                    continue
-                now_s = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.warning_repo.create(student_id=student_id, class_id=class_id, message=msg, created_at=now_s)
-                created += 1
-
-        return created
+        return self._generate(class_id=class_id).created
+
+    def sweep_all(self) -> SweepResult:
+        """Nightly sweep: evaluate every (class, student) pair in the institution at once."""
+        return self._generate(class_id=None)
+
+    # -----------------------
+    # Rule configuration
+    # -----------------------
+    def list_rules(self, class_id: Optional[int] = None) -> list[dict]:
+        return [vars(r) for r in self.rule_repo.list_by_filter(class_id=class_id)]
+
+    def add_rule(self, kind: str, threshold: float, *, class_id: Optional[int] = None) -> int:
+        build_rule(kind, threshold)  # validate
+        if class_id is not None and not self.class_repo.get_by_id(class_id):
+            raise ValueError("Class not found.")
+        return self.rule_repo.create(class_id=class_id, kind=kind, threshold=threshold)
+
+    def remove_rule(self, rule_id: int) -> None:
+        self.rule_repo.delete(rule_id)
+
+    def _engine(self) -> WarningRuleEngine:
+        rules_by_class: dict[Optional[int], list[WarningRule]] = {}
+        for row in self.rule_repo.list_by_filter(enabled_only=True):
+            rules_by_class.setdefault(row.class_id, []).append(build_rule(row.kind, row.threshold))
+        return WarningRuleEngine(rules_by_class, [AbsenceCountRule(ABSENCE_THRESHOLD)])
+
+    def _generate(self, *, class_id: Optional[int]) -> SweepResult:
+        t0 = time.perf_counter()
+        evaluation = self._engine().evaluate(class_id=class_id)
+
+        # avoid duplicates: one set lookup per hit instead of a warning listing per student
+        existing = self.warning_repo.list_keys(class_id=class_id)
+        now_s = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        new_rows = [(sid, cid, msg, now_s) for sid, cid, msg in evaluation.hits if (sid, cid, msg) not in existing]
+        created = self.warning_repo.create_many(new_rows)
+
+        self.last_result = SweepResult(
+            classes=evaluation.classes,
+            pairs=evaluation.pairs,
+            created=created,
+            elapsed_ms=(time.perf_counter() - t0) * 1000,
+            build_ms=evaluation.build_ms,
+            eval_ms=evaluation.eval_ms,
+            hits_by_rule=evaluation.hits_by_rule,
+        )
+        return self.last_result
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Attendance warning generation")
+    parser.add_argument("--class-id", type=int, help="only evaluate / configure this class (default: whole institution)")
+    parser.add_argument("--list-rules", action="store_true", help="show configured rules and exit")
+    parser.add_argument("--add-rule", nargs=2, metavar=("KIND", "THRESHOLD"),
+                        help=f"add a rule ({', '.join(sorted(RULE_TYPES))}) and exit")
+    parser.add_argument("--remove-rule", type=int, metavar="RULE_ID", help="delete a rule and exit")
+    args = parser.parse_args(argv)
+
+    service = WarningService()
+    if args.list_rules:
+        for r in service.list_rules(args.class_id):
+            scope = f"class {r['class_id']}" if r["class_id"] is not None else "default"
+            print(f"{r['rule_id']:<5} {scope:<12} {r['kind']:<22} {r['threshold']:g} {'on' if r['enabled'] else 'off'}")
+        return 0
+    if args.add_rule:
+        rid = service.add_rule(args.add_rule[0], float(args.add_rule[1]), class_id=args.class_id)
+        print(f"Rule added. RuleID={rid}")
+        return 0
+    if args.remove_rule is not None:
+        service.remove_rule(args.remove_rule)
+        print("Rule removed.")
+        return 0
+
+    if args.class_id is None:
+        result = service.sweep_all()
+    else:
+        service.evaluate_and_generate_for_class(args.class_id)
+        if service.last_result is None:
+            print("Class not found.")
+            return 1
+        result = service.last_result
+    print(f"Evaluated {result.pairs} enrollment(s) in {result.classes} class(es): "
+          f"{result.created} new warning(s) in {result.elapsed_ms:.0f} ms "
+          f"(build {result.build_ms:.0f} ms, rules {result.eval_ms:.1f} ms).")
+    for kind, n in sorted(result.hits_by_rule.items()):
+        print(f"  {kind}: {n} match(es)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
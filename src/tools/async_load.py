@@ -0,0 +1,136 @@
+"""Load and cancellation check for the async service facade.
+
+    python -m src.tools.async_load --coroutines 2000 --workers 8
+
+Seeds a throwaway database, fires N concurrent coroutines (roster, student
+history, pending requests, summaries) through AsyncServices and prints
+throughput and latency percentiles. It then checks that a timed-out report
+frees its worker promptly: with one worker, a slow detail export is given a
+tiny timeout and a point lookup queued behind it must finish well before the
+export would have.
+
+Throughput is bounded by the GIL (row building is Python); the point of the
+facade is that the event loop keeps ticking while queries run.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from src.repositories import db
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _load(n: int, workers: int, ids: dict[str, list[int]]) -> None:
+    from src.services.async_facade import AsyncServices
+
+    rng = random.Random(0)
+    latencies: list[float] = []
+
+    async with AsyncServices(max_workers=workers) as svc:
+        calls = [
+            lambda: svc.attendance.get_roster_for_session(rng.choice(ids["sessions"])),
+            lambda: svc.attendance.list_student_attendance(rng.choice(ids["students"])),
+            lambda: svc.requests.list_pending_for_lecturer(rng.choice(ids["lecturers"])),
+            lambda: svc.reports.iter_summary_rows(rng.choice(ids["classes"])),
+        ]
+
+        async def one() -> None:
+            t0 = time.perf_counter()
+            await rng.choice(calls)()
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        lags: list[float] = []
+        done = asyncio.Event()
+
+        async def ticker() -> None:
+            # how late a 10 ms sleep wakes up = how long the event loop was blocked
+            while not done.is_set():
+                t = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append((time.perf_counter() - t) * 1000 - 10)
+
+        tick = asyncio.create_task(ticker())
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n)))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await tick
+
+    print(f"{n} coroutines on {workers} workers: {elapsed:.2f} s, {n / elapsed:.0f} calls/s")
+    print(f"latency ms: p50={_pct(latencies, .5):.1f} p95={_pct(latencies, .95):.1f} "
+          f"p99={_pct(latencies, .99):.1f} mean={statistics.mean(latencies):.1f}")
+    print(f"event loop lag ms: p50={_pct(lags, .5):.1f} p99={_pct(lags, .99):.1f} max={max(lags):.1f}")
+
+
+async def _cancellation(class_id: int, session_id: int) -> bool:
+    from src.services.async_facade import AsyncServices
+    from src.services.report_service import ReportService
+
+    t0 = time.perf_counter()
+    list(ReportService().iter_detail_rows(class_id))
+    full_ms = (time.perf_counter() - t0) * 1000
+
+    async with AsyncServices(max_workers=1) as svc:
+        timeout_s = full_ms / 1000 / 20
+        slow = asyncio.create_task(svc.reports.iter_detail_rows(class_id, timeout=timeout_s))
+        await asyncio.sleep(0)
+        t0 = time.perf_counter()
+        await svc.attendance.get_roster_for_session(session_id)
+        freed_ms = (time.perf_counter() - t0) * 1000
+        try:
+            await slow
+            timed_out = False
+        except (asyncio.TimeoutError, TimeoutError):
+            timed_out = True
+
+    ok = timed_out and freed_ms < full_ms / 2
+    print(f"cancellation: detail export {full_ms:.0f} ms, timeout {timeout_s * 1000:.0f} ms, "
+          f"queued call done after {freed_ms:.0f} ms -> {'OK' if ok else 'FAIL'}")
+    return ok
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from src.tools.demo_data import DemoSize, populate
+
+    parser = argparse.ArgumentParser(description="Async facade load/cancellation check")
+    parser.add_argument("--coroutines", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    old_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "sas.db"
+        try:
+            db.init_db()
+            conn = db.get_conn()
+            populate(conn, DemoSize(students_per_class=200, sessions_per_class=60, students=4000))
+            q = lambda sql: [r[0] for r in conn.execute(sql)]  # noqa: E731
+            ids = {
+                "classes": q("SELECT class_id FROM classes WHERE class_code LIKE 'DEMO%'"),
+                "sessions": q("SELECT session_id FROM attendance_sessions"),
+                "students": q("SELECT DISTINCT student_id FROM enrollments"),
+                "lecturers": q("SELECT DISTINCT lecturer_id FROM classes"),
+            }
+            conn.close()
+
+            asyncio.run(_load(args.coroutines, args.workers, ids))
+            ok = asyncio.run(_cancellation(ids["classes"][0], ids["sessions"][0]))
+        finally:
+            db.DB_PATH = old_path
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Duplicate-submission check for AttendanceService.student_checkin.
+
+    python -m src.tools.checkin_race --students 200 --dupes 8
+
+Seeds a throwaway database with one OPEN session (and one PIN session), then
+for every enrolled student releases `dupes` threads at once, each submitting
+the same check-in on its own connection - a double-clicked button or a
+retried request. Exactly one submission per student must succeed, every other
+one must be rejected with "Already checked-in." (never an IntegrityError or a
+lock error), and the session must end up with one record per student. The
+rejection messages for a missing/closed session, a non-member and a
+missing/malformed/wrong PIN are checked as well. Exit 1 on any difference.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from src.models.enums import Role, SessionStatus
+from src.repositories import db
+
+_PIN = "4321"
+
+
+def _seed(students: int) -> tuple[int, int, int, list[int], int]:
+    """Returns (open session, PIN session, closed session, enrolled students, a student not enrolled)."""
+    from src.tools.demo_data import DemoSize, populate
+
+    db.init_db()
+    conn = db.get_conn()
+    try:
+        populate(conn, DemoSize(lecturers=2, classes=2, students=students + 1, students_per_class=students,
+                                sessions_per_class=3))
+        class_id = conn.execute("SELECT class_id FROM classes WHERE class_code = 'DEMO0000'").fetchone()[0]
+        open_id, pin_id, closed_id = [r[0] for r in conn.execute(
+            "SELECT session_id FROM attendance_sessions WHERE class_id = ? ORDER BY session_id LIMIT 3", (class_id,))]
+        conn.execute("DELETE FROM attendance_records WHERE session_id IN (?, ?)", (open_id, pin_id))
+        conn.execute("UPDATE attendance_sessions SET status = ? WHERE session_id IN (?, ?)",
+                     (SessionStatus.OPEN.code, open_id, pin_id))
+        conn.execute("UPDATE attendance_sessions SET status = ?, pin_enabled = 1, pin_code = ? WHERE session_id = ?",
+                     (SessionStatus.OPEN.code, _PIN, pin_id))
+        conn.execute("UPDATE attendance_sessions SET status = ? WHERE session_id = ?", (SessionStatus.CLOSED.code, closed_id))
+        conn.commit()
+        members = [r[0] for r in conn.execute("SELECT student_id FROM enrollments WHERE class_id = ?", (class_id,))]
+        outsider = conn.execute(
+            "SELECT user_id FROM users WHERE role = ? AND user_id NOT IN "
+            "(SELECT student_id FROM enrollments WHERE class_id = ?) LIMIT 1", (Role.STUDENT.value, class_id),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return open_id, pin_id, closed_id, members, outsider
+
+
+def _race(session_id: int, student_id: int, dupes: int, pin: Optional[str]) -> Counter[str]:
+    from src.services.attendance_service import AttendanceService
+
+    outcomes: Counter[str] = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(dupes)
+
+    def submit() -> None:
+        barrier.wait()
+        try:
+            AttendanceService().student_checkin(student_id, session_id, pin)
+            result = "ok"
+        except ValueError as e:
+            result = str(e)
+        except Exception as e:
+            result = f"{type(e).__name__}: {e}"
+        with lock:
+            outcomes[result] += 1
+
+    threads = [threading.Thread(target=submit) for _ in range(dupes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def _message(student_id: int, session_id: int, pin: Optional[str]) -> str:
+    from src.services.attendance_service import AttendanceService
+
+    try:
+        AttendanceService().student_checkin(student_id, session_id, pin)
+    except ValueError as e:
+        return str(e)
+    return "ok"
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fire duplicate check-ins concurrently and check the outcomes")
+    parser.add_argument("--students", type=int, default=200, help="students racing (one after another)")
+    parser.add_argument("--dupes", type=int, default=8, help="simultaneous submissions per student")
+    args = parser.parse_args(argv)
+
+    old_path = db.DB_PATH
+    failures: list[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "sas.db"
+        try:
+            open_id, pin_id, closed_id, members, outsider = _seed(args.students)
+
+            totals: Counter[str] = Counter()
+            t0 = time.perf_counter()
+            for i, student_id in enumerate(members):
+                session_id, pin = (pin_id, _PIN) if i % 2 else (open_id, None)
+                outcome = _race(session_id, student_id, args.dupes, pin)
+                totals.update(outcome)
+                if outcome != Counter({"ok": 1, "Already checked-in.": args.dupes - 1}):
+                    failures.append(f"student {student_id}: {dict(outcome)}")
+            elapsed = time.perf_counter() - t0
+
+            expected = {
+                "missing session": (_message(members[0], 10**9, None), "Session does not exist."),
+                "closed session": (_message(members[0], closed_id, None), "Session is not open."),
+                "not enrolled": (_message(outsider, open_id, None), "You are not enrolled in this class."),
+                "no PIN": (_message(members[0], pin_id, None), "PIN is required."),
+                "malformed PIN": (_message(members[0], pin_id, "12ab"), "Invalid PIN. PIN must be 4–6 digits."),
+                "wrong PIN": (_message(members[0], pin_id, "9999"), "Invalid PIN."),
+            }
+            for case, (got, want) in expected.items():
+                if got != want:
+                    failures.append(f"{case}: got {got!r}, want {want!r}")
+
+            conn = db.get_conn()
+            rows = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT student_id) FROM attendance_records WHERE session_id IN (?, ?)",
+                (open_id, pin_id),
+            ).fetchone()
+            conn.close()
+        finally:
+            db.DB_PATH = old_path
+
+    submissions = sum(totals.values())
+    print(f"Submissions: {submissions} ({len(members)} students x {args.dupes}) in {elapsed:.2f} s")
+    for result, n in totals.most_common():
+        print(f"  {n:6d} x {result}")
+    print(f"Records:     {rows[0]} ({rows[1]} distinct students, expected {len(members)})")
+    if rows[0] != len(members) or rows[1] != len(members):
+        failures.append(f"expected {len(members)} records, found {rows[0]}")
+    for f in failures[:10]:
+        print(f"FAIL {f}")
+    if failures:
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Multi-process write contention benchmark: student check-ins racing admin edits.
+
+    python -m src.tools.contention_bench --checkin 6 --admin 2 --seconds 10
+    python -m src.tools.contention_bench --compare   # no-wait baseline vs. configured write path
+
+Seeds a throwaway database, opens one session per demo class, then starts
+separate processes: check-in workers go through AttendanceService.student_checkin
+on their own slice of (open session, enrolled student) pairs (clearing their
+records and starting over when the slice runs out), admin workers call
+AdminService.edit_record on random existing records. Each role reports
+throughput, latency percentiles and errors by kind; lock-wait and retry
+counters come from transactions.write_stats() in every process.
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from src.models.enums import AttendanceStatus, SessionStatus
+from src.repositories import db
+
+
+@dataclass
+class WriteConfig:
+    busy_timeout_ms: int
+    retries: int
+    label: str
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _configure(db_path: str, cfg: WriteConfig) -> None:
+    from src.repositories import transactions
+
+    db.DB_PATH = Path(db_path)
+    db.BUSY_TIMEOUT_MS = cfg.busy_timeout_ms
+    transactions.WRITE_RETRIES = cfg.retries
+
+
+def _checkin_worker(db_path: str, cfg: WriteConfig, pairs: list[tuple[int, int]], start, seconds: float, out) -> None:
+    from src.repositories.attendance_repo import AttendanceRepo
+    from src.repositories.transactions import write_stats
+    from src.services.attendance_service import AttendanceService
+
+    _configure(db_path, cfg)
+    svc, repo = AttendanceService(), AttendanceRepo()
+    latencies: list[float] = []
+    errors: Counter[str] = Counter()
+    done: list[tuple[int, int]] = []
+    i = 0
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if i == len(pairs):
+            for session_id, student_id in done:
+                try:
+                    repo.delete(session_id, student_id)
+                except Exception as e:
+                    errors[f"reset: {type(e).__name__}: {e}"] += 1
+            done.clear()
+            i = 0
+        session_id, student_id = pairs[i]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            svc.student_checkin(student_id, session_id, None)
+        except Exception as e:
+            errors[f"{type(e).__name__}: {e}"] += 1
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+        done.append((session_id, student_id))
+    out.put(("checkin", latencies, errors, vars(write_stats())))
+
+
+def _admin_worker(db_path: str, cfg: WriteConfig, records: list[tuple[int, int]], seed: int, start, seconds: float, out) -> None:
+    from src.repositories.transactions import write_stats
+    from src.services.admin_service import AdminService
+
+    _configure(db_path, cfg)
+    svc = AdminService()
+    rng = random.Random(seed)
+    statuses = [s.value for s in AttendanceStatus]
+    latencies: list[float] = []
+    errors: Counter[str] = Counter()
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        session_id, student_id = rng.choice(records)
+        t0 = time.perf_counter()
+        try:
+            svc.edit_record(session_id, student_id, rng.choice(statuses), note="bench")
+        except Exception as e:
+            errors[f"{type(e).__name__}: {e}"] += 1
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+    out.put(("admin", latencies, errors, vars(write_stats())))
+
+
+def _seed(db_path: Path) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+    """Demo data with one open, empty session per class. Returns (check-in pairs, editable records)."""
+    from src.tools.demo_data import DemoSize, populate
+
+    db.DB_PATH = db_path
+    db.init_db()
+    conn = db.get_conn()
+    try:
+        populate(conn, DemoSize(lecturers=10, classes=20, students=2000, students_per_class=100, sessions_per_class=10))
+        open_ids = [r[0] for r in conn.execute("SELECT MIN(session_id) FROM attendance_sessions GROUP BY class_id")]
+        marks = ",".join("?" * len(open_ids))
+        conn.execute(f"UPDATE attendance_sessions SET status=? WHERE session_id IN ({marks})", (SessionStatus.OPEN.code, *open_ids))
+        conn.execute(f"DELETE FROM attendance_records WHERE session_id IN ({marks})", open_ids)
+        conn.commit()
+        pairs = [
+            (r[0], r[1])
+            for r in conn.execute(
+                f"""
+                SELECT s.session_id, e.student_id
+                FROM attendance_sessions s JOIN enrollments e ON e.class_id = s.class_id
+                WHERE s.session_id IN ({marks})
+                """,
+                open_ids,
+            )
+        ]
+        records = [(r[0], r[1]) for r in conn.execute("SELECT session_id, student_id FROM attendance_records")]
+    finally:
+        conn.close()
+    return pairs, records
+
+
+def run(cfg: WriteConfig, *, checkin: int, admin: int, seconds: float) -> dict[str, float]:
+    """One benchmark round on a fresh database. Prints a report and returns the headline numbers."""
+    ctx = mp.get_context("spawn")
+    old_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            pairs, records = _seed(Path(tmp) / "sas.db")
+            rng = random.Random(0)
+            rng.shuffle(pairs)
+            start, out = ctx.Event(), ctx.Queue()
+            procs = [
+                ctx.Process(target=_checkin_worker, args=(str(db.DB_PATH), cfg, pairs[i::checkin], start, seconds, out))
+                for i in range(checkin)
+            ] + [
+                ctx.Process(target=_admin_worker, args=(str(db.DB_PATH), cfg, records, i, start, seconds, out))
+                for i in range(admin)
+            ]
+            for p in procs:
+                p.start()
+            time.sleep(1.0)  # let the spawned interpreters finish importing
+            start.set()
+            results = [out.get() for _ in procs]
+            for p in procs:
+                p.join()
+        finally:
+            db.DB_PATH = old_path
+
+    print(f"== {cfg.label}: busy_timeout={cfg.busy_timeout_ms} ms, retries={cfg.retries}, "
+          f"{checkin} check-in + {admin} admin processes, {seconds:.0f} s")
+    summary: dict[str, float] = {}
+    for role in ("checkin", "admin"):
+        lat = [x for r, l, _, _ in results if r == role for x in l]
+        errors: Counter[str] = Counter()
+        for r, _, e, _ in results:
+            if r == role:
+                errors.update(e)
+        failed = sum(errors.values())
+        total = len(lat) + failed
+        rate = failed / total if total else 0.0
+        print(f"{role:8s} {len(lat) / seconds:8.0f} ops/s  error rate {rate:6.2%}  "
+              f"latency ms p50={_pct(lat, .5):.1f} p95={_pct(lat, .95):.1f} p99={_pct(lat, .99):.1f}")
+        for msg, n in errors.most_common(5):
+            print(f"{'':8s} {n:8d} x {msg}")
+        summary[f"{role}_ops"] = len(lat) / seconds
+        summary[f"{role}_error_rate"] = rate
+
+    stats = [s for _, _, _, s in results]
+    tx = sum(s["transactions"] for s in stats)
+    wait = sum(s["lock_wait_ms_total"] for s in stats)
+    print(f"writes   {tx} transactions, {sum(s['retries'] for s in stats)} retries, "
+          f"{sum(s['busy_failures'] for s in stats)} gave up; lock wait mean {wait / tx if tx else 0:.2f} ms, "
+          f"max {max(s['lock_wait_ms_max'] for s in stats):.1f} ms")
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from src.repositories import transactions
+
+    parser = argparse.ArgumentParser(description="Concurrent check-in / admin-edit write benchmark")
+    parser.add_argument("--checkin", type=int, default=6, help="check-in processes")
+    parser.add_argument("--admin", type=int, default=2, help="admin edit processes")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--busy-timeout-ms", type=int, default=db.BUSY_TIMEOUT_MS)
+    parser.add_argument("--retries", type=int, default=transactions.WRITE_RETRIES)
+    parser.add_argument("--compare", action="store_true", help="also run with busy_timeout=0 and no retries first")
+    args = parser.parse_args(argv)
+
+    rounds = [WriteConfig(args.busy_timeout_ms, args.retries, "configured")]
+    if args.compare:
+        rounds.insert(0, WriteConfig(0, 0, "no wait"))
+    for i, cfg in enumerate(rounds):
+        if i:
+            print()
+        result = run(cfg, checkin=args.checkin, admin=args.admin, seconds=args.seconds)
+    return 0 if result["checkin_error_rate"] == 0 and result["admin_error_rate"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+from dataclasses import dataclass
+
+from src.models.enums import AttendanceStatus, RequestStatus, RequestType, Role, SessionStatus
+from src.utils.security import hash_password
+
+# Roughly what one attendance record status distribution looks like in practice.
+_STATUS_WEIGHTS = [
+    (AttendanceStatus.PRESENT, 70),
+    (AttendanceStatus.LATE, 12),
+    (AttendanceStatus.ABSENT, 10),
+    (AttendanceStatus.EXCUSED, 3),
+]
+
+
+@dataclass
+class DemoSize:
+    lecturers: int = 20
+    classes: int = 40
+    students: int = 3000
+    students_per_class: int = 120
+    sessions_per_class: int = 30
+    record_ratio: float = 0.95      # share of (session, student) pairs with a record
+    request_ratio: float = 0.02     # share of records with an absence request
+    password: str = "123456"
+
+
+def populate(conn: sqlite3.Connection, size: DemoSize | None = None, *, seed: int = 0) -> dict[str, int]:
+    """Bulk-insert a realistic data set on top of an initialized schema. Returns row counts."""
+    size = size or DemoSize()
+    rng = random.Random(seed)
+    pw = hash_password(size.password).value  # one hash for everyone; pbkdf2 is slow on purpose
+
+    cur = conn.cursor()
+    base = cur.execute("SELECT COALESCE(MAX(user_id), 0) FROM users").fetchone()[0]
+    cur.executemany(
+        "INSERT INTO users(username, full_name, role, password_hash) VALUES (?,?,?,?)",
+        [(f"demo_lect{i}", f"Lecturer {i:03d}", Role.LECTURER.value, pw) for i in range(size.lecturers)]
+        + [(f"demo_stu{i}", f"Student {rng.randrange(10**6):06d}", Role.STUDENT.value, pw) for i in range(size.students)],
+    )
+    lecturer_ids = list(range(base + 1, base + 1 + size.lecturers))
+    student_ids = list(range(base + 1 + size.lecturers, base + 1 + size.lecturers + size.students))
+
+    cur.executemany(
+        "INSERT INTO classes(class_code, class_name, lecturer_id) VALUES (?,?,?)",
+        [(f"DEMO{i:04d}", f"Demo class {i}", rng.choice(lecturer_ids)) for i in range(size.classes)],
+    )
+    class_ids = [r[0] for r in cur.execute("SELECT class_id FROM classes WHERE class_code LIKE 'DEMO%' ORDER BY class_id")]
+
+    statuses = [s for s, _ in _STATUS_WEIGHTS]
+    weights = [w for _, w in _STATUS_WEIGHTS]
+    counts = {"enrollments": 0, "sessions": 0, "records": 0, "requests": 0}
+    for class_id in class_ids:
+        members = rng.sample(student_ids, min(size.students_per_class, len(student_ids)))
+        cur.executemany("INSERT INTO enrollments(class_id, student_id) VALUES (?,?)", [(class_id, s) for s in members])
+        counts["enrollments"] += len(members)
+
+        for n in range(size.sessions_per_class):
+            month, day = divmod(n, 28)
+            cur.execute(
+                """
+                INSERT INTO attendance_sessions(
+                    class_id, session_date, start_time, duration_min,
+                    pin_enabled, pin_code, status, created_at
+                ) VALUES (?,?,?,?,?,?,?,?)
+                """,
+                (
+                    class_id, f"2025-{month % 12 + 1:02d}-{day + 1:02d}", f"{8 + class_id % 8:02d}:00", 90,
+                    0, None, SessionStatus.CLOSED.code, "2025-01-01 00:00:00",
+                ),
+            )
+            session_id = cur.lastrowid
+            counts["sessions"] += 1
+
+            records, requests = [], []
+            for student_id in members:
+                if rng.random() >= size.record_ratio:
+                    continue
+                status = rng.choices(statuses, weights)[0]
+                records.append((session_id, student_id, status.code, None, None))
+                if rng.random() < size.request_ratio:
+                    kind = RequestType.LATE if status is AttendanceStatus.LATE else RequestType.ABSENT
+                    state = rng.choice(list(RequestStatus))
+                    requests.append((student_id, session_id, kind.value, "demo", None, state.code, None, "2025-01-01 00:00:00", "2025-01-01 00:00:00"))
+            cur.executemany(
+                "INSERT INTO attendance_records(session_id, student_id, status, checkin_time, note) VALUES (?,?,?,?,?)",
+                records,
+            )
+            cur.executemany(
+                """
+                INSERT INTO absence_requests(
+                    student_id, session_id, request_type, reason, evidence_path,
+                    status, lecturer_comment, created_at, updated_at
+                ) VALUES (?,?,?,?,?,?,?,?,?)
+                """,
+                requests,
+            )
+            counts["records"] += len(records)
+            counts["requests"] += len(requests)
+
+    conn.commit()
+    return {"users": size.lecturers + size.students, "classes": len(class_ids), **counts}
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Cold-start budget for `import src.main` / `import src.cli` (measured with `python -X importtime`).
+IMPORT_TIME_BUDGET_MS = 250.0
+IMPORTED_MODULES_BUDGET = 120
+
+# Modules that must only be loaded on first use, never at startup.
+LAZY_MODULES = (
+    "openpyxl",
+    "numpy",
+    "src.services.report_service",
+    "src.ui.student_handlers",
+    "src.ui.lecturer_handlers",
+    "src.ui.admin_handlers",
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+@dataclass
+class ImportProfile:
+    target: str
+    cumulative_ms: float
+    modules: list[str] = field(default_factory=list)
+
+    @property
+    def module_count(self) -> int:
+        return len(self.modules)
+
+
+def _run_importtime(code: str) -> list[tuple[int, str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{proc.stderr}")
+
+    entries: list[tuple[int, str]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header line
+        entries.append((int(parts[1]), parts[2].strip()))
+    return entries
+
+
+def profile_import(target: str = "src.main") -> ImportProfile:
+    """Import `target` in a fresh interpreter and return the modules it pulled in."""
+    baseline = {name for _, name in _run_importtime("pass")}
+    entries = _run_importtime(f"import {target}")
+
+    modules = [name for _, name in entries if name not in baseline]
+    cumulative_us = next((us for us, name in entries if name == target), 0)
+    return ImportProfile(target=target, cumulative_ms=cumulative_us / 1000, modules=modules)
+
+
+def check_budget(
+    profile: ImportProfile,
+    *,
+    time_budget_ms: float = IMPORT_TIME_BUDGET_MS,
+    module_budget: int = IMPORTED_MODULES_BUDGET,
+) -> list[str]:
+    """Return a list of budget violations (empty when within budget)."""
+    problems: list[str] = []
+    if profile.cumulative_ms > time_budget_ms:
+        problems.append(f"import time {profile.cumulative_ms:.1f} ms > budget {time_budget_ms:.0f} ms")
+    if profile.module_count > module_budget:
+        problems.append(f"{profile.module_count} modules imported > budget {module_budget}")
+    for lazy in LAZY_MODULES:
+        if any(m == lazy or m.startswith(lazy + ".") for m in profile.modules):
+            problems.append(f"'{lazy}' is imported at startup (must be lazy)")
+    return problems
+
+
+def main() -> int:
+    failed = False
+    # src.cli starts once per cron/pipeline step, so it is held to the same budget
+    for target in ("src.main", "src.cli"):
+        profile = profile_import(target)
+        print(f"{profile.target}: {profile.cumulative_ms:.1f} ms, {profile.module_count} modules")
+        problems = check_budget(profile)
+        for p in problems:
+            print(f"FAIL: {p}")
+        failed = failed or bool(problems)
+    if not failed:
+        print("OK: within import budget.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+"""EXPLAIN QUERY PLAN regression check for every statement the repos and services issue.
+
+Builds a throwaway database with demo data, runs each scenario below with a
+statement hook installed on get_conn(), then asks SQLite for the plan of every
+captured statement. A full scan of a large table or a temp B-tree sort fails
+the check unless the scenario lists it in `allow` with a reason; a step listed
+in a scenario's `expect` must appear in one of its plans.
+
+    python -m src.tools.query_plans            # exit 1 on any regression
+    python -m src.tools.query_plans --verbose  # print every plan
+"""
+from __future__ import annotations
+
+import argparse
+import inspect
+import re
+import sqlite3
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.repositories import db
+
+# Tables that stay tiny no matter how big the institution gets.
+SMALL_TABLES = {"warning_rules", "class_versions", "sqlite_sequence", "change_consumers"}
+
+_SKIP_PREFIXES = ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "EXPLAIN", "VACUUM", "ANALYZE")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|SET\b|JOIN\b|LEFT\b|ORDER\b|GROUP\b|VALUES\b)(\w+))?", re.I)
+_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+@dataclass
+class Ctx:
+    """Ids picked from the demo data so scenarios hit real rows."""
+    class_id: int
+    lecturer_id: int
+    student_id: int
+    session_id: int
+    open_session_id: int
+    request_id: int
+    warning_id: int
+    job_id: int
+
+
+@dataclass
+class Scenario:
+    name: str                       # "<Class>.<method>" or "<Class>.<method>[variant]"
+    run: Callable[[Ctx], Any]
+    allow: dict[str, str] = field(default_factory=dict)  # plan-detail regex -> why it is acceptable
+    expect: dict[str, str] = field(default_factory=dict)  # plan-detail regex that must appear -> why
+
+
+@dataclass
+class Violation:
+    scenario: str
+    sql: str
+    detail: str
+
+
+def _scenarios() -> list[Scenario]:
+    from src.models.enums import AttendanceStatus, SessionStatus
+    from src.repositories.attendance_repo import AttendanceRepo
+    from src.repositories.audit_repo import AuditRepo
+    from src.repositories.change_log_repo import ChangeLogRepo
+    from src.repositories.class_repo import ClassRepo
+    from src.repositories.enrollment_repo import EnrollmentRepo
+    from src.repositories.report_job_repo import ReportJobRepo
+    from src.repositories.request_repo import RequestRepo
+    from src.repositories.session_repo import SessionRepo
+    from src.repositories.user_repo import UserRepo
+    from src.repositories.warning_repo import WarningRepo
+    from src.repositories.warning_rule_repo import WarningRuleRepo
+    from src.services.admin_service import AdminService
+    from src.services.analytics_service import load_matrix
+    from src.services.attendance_service import AttendanceService
+    from src.services.audit_service import AuditService
+    from src.services.auth_service import AuthService
+    from src.services.change_feed_service import ChangeFeedService
+    from src.services.live_roster import LiveRoster
+    from src.services.report_service import ReportService
+    from src.services.request_service import RequestService
+    from src.services.session_scheduler import SessionExpiryScheduler
+    from src.services.session_service import RecurringScheduleInput, SessionService
+    from src.services.warning_service import WarningService
+
+    whole_table = "lists the whole table by design (admin / nightly job)"
+    sweep = "institution-wide sweep reads every enrollment by design"
+    return [
+        # --- repositories ---
+        Scenario("UserRepo.get_by_username", lambda c: UserRepo().get_by_username("demo_stu1")),
+        Scenario("UserRepo.update_failed_attempts", lambda c: UserRepo().update_failed_attempts(c.student_id, 0)),
+        Scenario("UserRepo.set_lock", lambda c: UserRepo().set_lock(c.student_id, None)),
+        Scenario("UserRepo.reset_login_state", lambda c: UserRepo().reset_login_state(c.student_id)),
+        Scenario("ClassRepo.get_by_id", lambda c: ClassRepo().get_by_id(c.class_id)),
+        Scenario("ClassRepo.get_version", lambda c: ClassRepo().get_version(c.class_id)),
+        Scenario("ClassRepo.list_by_filter", lambda c: ClassRepo().list_by_filter(lecturer_id=c.lecturer_id)),
+        Scenario("ClassRepo.list_by_filter[all]", lambda c: ClassRepo().list_by_filter(),
+                 {r"^SCAN classes USING INDEX": whole_table}),
+        Scenario("ClassRepo.update", lambda c: ClassRepo().update(c.class_id, class_name="Demo class")),
+        Scenario("EnrollmentRepo.get_by_id", lambda c: EnrollmentRepo().get_by_id(c.class_id, c.student_id)),
+        Scenario("EnrollmentRepo.list_by_filter", lambda c: EnrollmentRepo().list_by_filter(class_id=c.class_id)),
+        Scenario("EnrollmentRepo.list_by_filter[student]", lambda c: EnrollmentRepo().list_by_filter(student_id=c.student_id)),
+        Scenario("EnrollmentRepo.list_by_filter[all]", lambda c: EnrollmentRepo().list_by_filter(),
+                 {r"^SCAN enrollments": whole_table}),
+        Scenario("SessionRepo.get_by_id", lambda c: SessionRepo().get_by_id(c.session_id)),
+        Scenario("SessionRepo.list_by_filter", lambda c: SessionRepo().list_by_filter(class_id=c.class_id)),
+        Scenario("SessionRepo.list_by_filter[open]", lambda c: SessionRepo().list_by_filter(status=SessionStatus.OPEN.value)),
+        Scenario("SessionRepo.count_by_status", lambda c: SessionRepo().count_by_status(SessionStatus.OPEN.value)),
+        Scenario("SessionRepo.update", lambda c: SessionRepo().update(c.open_session_id, pin_code="123456")),
+        Scenario("SessionRepo.list_keys", lambda c: SessionRepo().list_keys(
+            [c.class_id], date_from="2024-01-01", date_to="2024-06-30")),
+        Scenario("SessionRepo.set_status_many", lambda c: SessionRepo().set_status_many(
+            [c.session_id], from_status=SessionStatus.OPEN.value, to_status=SessionStatus.CLOSED.value)),
+        Scenario("AttendanceRepo.get_by_id", lambda c: AttendanceRepo().get_by_id(1)),
+        Scenario("AttendanceRepo.get_by_session_student", lambda c: AttendanceRepo().get_by_session_student(c.session_id, c.student_id)),
+        Scenario("AttendanceRepo.list_by_filter", lambda c: AttendanceRepo().list_by_filter(student_id=c.student_id)),
+        Scenario("AttendanceRepo.list_by_filter[session]", lambda c: AttendanceRepo().list_by_filter(session_id=c.session_id)),
+        Scenario("AttendanceRepo.list_by_filter[class]", lambda c: AttendanceRepo().list_by_filter(class_id=c.class_id),
+                 {r"TEMP B-TREE": "sorts the records of one class"}),
+        Scenario("AttendanceRepo.checkin", lambda c: AttendanceRepo().checkin(
+            c.open_session_id, c.student_id, None, checkin_time="2099-01-01 08:01:00")),
+        Scenario("AttendanceRepo.get_checkin_state", lambda c: AttendanceRepo().get_checkin_state(c.open_session_id, c.student_id)),
+        Scenario("AttendanceRepo.set_status_for_roster", lambda c: AttendanceRepo().set_status_for_roster(
+            c.open_session_id, c.class_id, AttendanceStatus.PRESENT.value)),
+        Scenario("AttendanceRepo.update", lambda c: AttendanceRepo().update(c.session_id, c.student_id, note="qp")),
+        Scenario("RequestRepo.get_by_id", lambda c: RequestRepo().get_by_id(c.request_id)),
+        Scenario("RequestRepo.list_by_filter", lambda c: RequestRepo().list_by_filter(student_id=c.student_id)),
+        Scenario("RequestRepo.list_by_filter[session]", lambda c: RequestRepo().list_by_filter(session_id=c.session_id),
+                 {r"TEMP B-TREE": "a session has a handful of requests"}),
+        Scenario("RequestRepo.update", lambda c: RequestRepo().update(c.request_id, lecturer_comment="qp")),
+        Scenario("WarningRepo.get_by_id", lambda c: WarningRepo().get_by_id(c.warning_id)),
+        Scenario("WarningRepo.list_by_filter", lambda c: WarningRepo().list_by_filter(student_id=c.student_id)),
+        Scenario("WarningRepo.list_by_filter[class]", lambda c: WarningRepo().list_by_filter(class_id=c.class_id)),
+        Scenario("WarningRepo.list_keys", lambda c: WarningRepo().list_keys(class_id=c.class_id)),
+        Scenario("WarningRepo.list_keys[all]", lambda c: WarningRepo().list_keys(), {r"^SCAN warnings": sweep}),
+        Scenario("WarningRepo.update", lambda c: WarningRepo().update(c.warning_id, seen=0)),
+        Scenario("WarningRuleRepo.list_by_filter", lambda c: WarningRuleRepo().list_by_filter(enabled_only=True)),
+        Scenario("WarningRuleRepo.update", lambda c: WarningRuleRepo().update(1, enabled=1)),
+        Scenario("AuditRepo.list_page", lambda c: AuditRepo().list_page(student_id=c.student_id, before_id=10**9)),
+        Scenario("AuditRepo.list_page[session]", lambda c: AuditRepo().list_page(session_id=c.session_id)),
+        Scenario("AuditRepo.list_page[actor]", lambda c: AuditRepo().list_page(actor_id=c.lecturer_id, before_id=10**9)),
+        Scenario("AuditRepo.list_page[all]", lambda c: AuditRepo().list_page(),
+                 {r"^SCAN a$": "walks the rowid backwards; LIMIT stops it after one page"}),
+        Scenario("ChangeLogRepo.list_since", lambda c: ChangeLogRepo().list_since(1000, 500)),
+        Scenario("ChangeLogRepo.head", lambda c: ChangeLogRepo().head()),
+        Scenario("ChangeLogRepo.compacted_through", lambda c: ChangeLogRepo().compacted_through()),
+        Scenario("ChangeLogRepo.set_cursor", lambda c: ChangeLogRepo().set_cursor("qp", 0, updated_at="2099-01-01")),
+        Scenario("ChangeLogRepo.get_consumer", lambda c: ChangeLogRepo().get_consumer("qp")),
+        Scenario("ChangeLogRepo.list_consumers", lambda c: ChangeLogRepo().list_consumers()),
+        Scenario("ReportJobRepo.get_by_id", lambda c: ReportJobRepo().get_by_id(c.job_id)),
+        Scenario("ReportJobRepo.list_by_owner", lambda c: ReportJobRepo().list_by_owner(c.lecturer_id)),
+        Scenario("ReportJobRepo.count_active", lambda c: ReportJobRepo().count_active(c.lecturer_id)),
+        Scenario("ReportJobRepo.count_active[all]", lambda c: ReportJobRepo().count_active()),
+        Scenario("ReportJobRepo.claim_next", lambda c: ReportJobRepo().claim_next("qp", now=1)),
+        Scenario("ReportJobRepo.set_progress", lambda c: ReportJobRepo().set_progress(c.job_id, "qp", 1, 2, now=1)),
+        Scenario("ReportJobRepo.heartbeat", lambda c: ReportJobRepo().heartbeat(c.job_id, "qp", now=1)),
+        Scenario("ReportJobRepo.retry", lambda c: ReportJobRepo().retry(c.job_id, "qp", run_after=0, error="qp")),
+        Scenario("ReportJobRepo.request_cancel", lambda c: ReportJobRepo().request_cancel(c.job_id, now=1)),
+        Scenario("ReportJobRepo.requeue_stale", lambda c: ReportJobRepo().requeue_stale(stale_before=0, now=1)),
+        Scenario("ReportJobRepo.finish", lambda c: ReportJobRepo().finish(c.job_id, "qp", "DONE", now=1)),
+        # --- services ---
+        Scenario("AuthService.login", lambda c: AuthService().login("demo_stu1", "wrong")),
+        Scenario("AttendanceService.list_student_attendance", lambda c: AttendanceService().list_student_attendance(c.student_id),
+                 {r"TEMP B-TREE": "sorts one student's records by session date"}),
+        Scenario("AttendanceService.student_history_page", lambda c: AttendanceService().student_history_page(
+            c.student_id, cursor=("2100-01-01", "00:00", 0))),
+        Scenario("AttendanceService.student_attendance_totals", lambda c: AttendanceService().student_attendance_totals(c.student_id),
+                 {r"TEMP B-TREE FOR GROUP BY": "groups one student's records by (class, status)"}),
+        Scenario("AttendanceService.get_roster_for_session", lambda c: AttendanceService().get_roster_for_session(c.session_id),
+                 {r"TEMP B-TREE": "sorts one class roster by name; rows come from enrollments, so a users.full_name index cannot help"}),
+        Scenario("AttendanceService.student_checkin[duplicate]", _duplicate_checkin),
+        Scenario("AttendanceService.update_status", lambda c: AttendanceService().update_status(
+            c.open_session_id, c.student_id, AttendanceStatus.LATE.value)),
+        Scenario("AttendanceService.mark_all_present", lambda c: AttendanceService().mark_all_present(
+            c.open_session_id, actor_id=c.lecturer_id)),
+        Scenario("AdminService.edit_record", lambda c: AdminService().edit_record(
+            c.session_id, c.student_id, AttendanceStatus.PRESENT.value, actor_id=c.lecturer_id)),
+        Scenario("AdminService.import_records", lambda c: AdminService().import_records(
+            [{"session_id": c.session_id, "student_id": c.student_id, "status": AttendanceStatus.LATE.value}],
+            actor_id=c.lecturer_id)),
+        Scenario("AuditService.history", lambda c: AuditService().history(student_id=c.student_id)),
+        Scenario("AdminService.search_attendance", lambda c: AdminService().search_attendance(student_id=c.student_id)),
+        Scenario("RequestService.list_by_student", lambda c: RequestService().list_by_student(c.student_id)),
+        Scenario("RequestService.count_pending_for_student", lambda c: RequestService().count_pending_for_student(c.student_id)),
+        Scenario("RequestService.list_pending_for_lecturer", lambda c: RequestService().list_pending_for_lecturer(c.lecturer_id),
+                 {r"TEMP B-TREE": "sorts the pending requests of one lecturer"}),
+        Scenario("RequestService.count_pending_for_lecturer", lambda c: RequestService().count_pending_for_lecturer(c.lecturer_id)),
+        Scenario("ReportService.iter_summary_rows", lambda c: list(ReportService().iter_summary_rows(c.class_id))),
+        Scenario("ReportService.iter_detail_rows", lambda c: list(ReportService().iter_detail_rows(c.class_id))),
+        Scenario("analytics.load_matrix", lambda c: load_matrix(c.class_id)),
+        Scenario("WarningService.evaluate_and_generate_for_class", lambda c: WarningService().evaluate_and_generate_for_class(c.class_id)),
+        Scenario("WarningService.sweep_all", lambda c: WarningService().sweep_all(),
+                 {r"^SCAN (e|warnings)\b": sweep}),
+        Scenario("WarningService.list_warnings_for_student", lambda c: WarningService().list_warnings_for_student(c.student_id)),
+        Scenario("ChangeFeedService.changes_since", lambda c: ChangeFeedService().changes_since(1000, 500)),
+        Scenario("ChangeFeedService.compact", lambda c: ChangeFeedService().compact()),
+        Scenario("LiveRoster.load", lambda c: LiveRoster(c.session_id).load(),
+                 {r"TEMP B-TREE": "sorts one class roster by name, once per session view"}),
+        Scenario("LiveRoster.poll", lambda c: _poll_after_change(LiveRoster(c.open_session_id), c),
+                 {r"TEMP B-TREE": "the initial load() sorts one class roster by name"},
+                 expect={r"^SEARCH ar USING INTEGER PRIMARY KEY \(rowid=\?\)$":
+                         "changed records are looked up from change_log, not found by scanning the roster"}),
+        Scenario("SessionService.create_recurring", lambda c: SessionService().create_recurring(RecurringScheduleInput(
+            [c.class_id], [0, 2], "07:00", 90, "2099-02-01", "2099-05-31", pin_enabled=True))),
+        Scenario("SessionExpiryScheduler.refresh", lambda c: SessionExpiryScheduler().refresh()),
+    ]
+
+
+def _duplicate_checkin(c: Ctx) -> str:
+    """The rejected path: the conditional insert, then the state read that explains it."""
+    from src.services.attendance_service import AttendanceService
+
+    try:
+        AttendanceService().student_checkin(c.student_id, c.open_session_id, None)
+    except ValueError as e:
+        return str(e)
+    raise AssertionError("second check-in into the same session was accepted")
+
+
+def _poll_after_change(roster: Any, c: Ctx) -> Any:
+    from src.models.enums import AttendanceStatus
+    from src.services.attendance_service import AttendanceService
+
+    roster.load()
+    AttendanceService().update_status(c.open_session_id, c.student_id, AttendanceStatus.PRESENT.value)
+    return roster.poll()
+
+
+# Repository methods that must have a scenario. Inserts and single-row deletes
+# are keyed on the primary key and cannot pick a bad plan.
+_NOT_PLANNED = ("create", "delete")
+_NO_SQL = {"EnrollmentRepo.update"}
+
+
+def _required_repo_methods() -> set[str]:
+    from src.repositories import (
+        attendance_repo, audit_repo, change_log_repo, class_repo, enrollment_repo, report_job_repo, request_repo,
+        session_repo, user_repo, warning_repo, warning_rule_repo,
+    )
+    names = set()
+    for module in (attendance_repo, audit_repo, change_log_repo, class_repo, enrollment_repo, report_job_repo,
+                   request_repo, session_repo, user_repo, warning_repo, warning_rule_repo):
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls_name.endswith("Repo") and cls.__module__ == module.__name__:
+                names.update(
+                    f"{cls_name}.{meth}" for meth in vars(cls)
+                    if not meth.startswith(("_", *_NOT_PLANNED))
+                )
+    return names - _NO_SQL
+
+
+def _table_aliases(sql: str) -> dict[str, str]:
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def check_plan(conn: sqlite3.Connection, sql: str, allow: dict[str, str]) -> tuple[list[str], list[str]]:
+    """Return (plan details, offending details) for one statement."""
+    details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    aliases = _table_aliases(sql)
+    bad = []
+    for detail in details:
+        if any(re.search(pattern, detail) for pattern in allow):
+            continue
+        scan = _SCAN.match(detail)
+        if scan and aliases.get(scan.group(1), scan.group(1)) not in SMALL_TABLES:
+            bad.append(detail)
+        elif detail.startswith("USE TEMP B-TREE") and not set(aliases.values()) <= SMALL_TABLES:
+            bad.append(detail)
+    return details, bad
+
+
+def _context(conn: sqlite3.Connection) -> Ctx:
+    from src.models.enums import SessionStatus
+
+    one = lambda sql, *p: conn.execute(sql, p).fetchone()[0]  # noqa: E731
+    class_id = one("SELECT class_id FROM classes WHERE class_code = 'DEMO0000'")
+    student_id = one("SELECT student_id FROM enrollments WHERE class_id = ? LIMIT 1", class_id)
+    session_id = one("SELECT session_id FROM attendance_sessions WHERE class_id = ? LIMIT 1", class_id)
+    open_session_id = conn.execute(
+        """
+        INSERT INTO attendance_sessions(class_id, session_date, start_time, duration_min,
+                                        pin_enabled, pin_code, status, created_at)
+        VALUES (?, '2099-01-01', '08:00', 60, 0, NULL, ?, '2099-01-01 00:00:00')
+        """,
+        (class_id, SessionStatus.OPEN.code),
+    ).lastrowid
+    request_id = conn.execute(
+        """
+        INSERT INTO absence_requests(student_id, session_id, request_type, reason, evidence_path,
+                                     status, lecturer_comment, created_at, updated_at)
+        VALUES (?, ?, 'Absent', 'qp', NULL, 0, NULL, '2099-01-01', '2099-01-01')
+        """,
+        (student_id, session_id),
+    ).lastrowid
+    warning_id = conn.execute(
+        "INSERT INTO warnings(student_id, class_id, message, created_at, seen) VALUES (?, ?, 'qp', '2099-01-01', 0)",
+        (student_id, class_id),
+    ).lastrowid
+    job_id = conn.execute(
+        "INSERT INTO report_jobs(owner_id, params, status, run_after, created_at) VALUES (NULL, '{}', 0, 0, 0)"
+    ).lastrowid
+    conn.commit()
+    return Ctx(
+        class_id=class_id,
+        lecturer_id=one("SELECT lecturer_id FROM classes WHERE class_id = ?", class_id),
+        student_id=student_id,
+        session_id=session_id,
+        open_session_id=open_session_id,
+        request_id=request_id,
+        warning_id=warning_id,
+        job_id=job_id,
+    )
+
+
+def run(*, analyze: bool = False, verbose: bool = False, size: Optional[Any] = None) -> list[Violation]:
+    from src.services.maintenance_service import MaintenanceService
+    from src.tools.demo_data import populate
+
+    violations: list[Violation] = []
+    old_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "sas.db"
+        try:
+            db.init_db()
+            conn = db.get_conn()
+            populate(conn, size)
+            ctx = _context(conn)
+            if analyze:
+                MaintenanceService(db.DB_PATH).optimize(full_analyze=True)
+
+            scenarios = _scenarios()
+            missing = _required_repo_methods() - {s.name.split("[")[0] for s in scenarios}
+            for name in sorted(missing):
+                violations.append(Violation(name, "", "no scenario covers this repository method"))
+
+            for scenario in scenarios:
+                captured: list[str] = []
+                db.add_statement_hook(captured.append)
+                try:
+                    scenario.run(ctx)
+                finally:
+                    db.remove_statement_hook(captured.append)
+
+                seen, plans = set(), []
+                for sql in captured:
+                    text = " ".join(sql.split())
+                    upper = text.upper()
+                    if upper.startswith(_SKIP_PREFIXES) or text in seen:
+                        continue
+                    if upper.startswith("INSERT") and " SELECT " not in upper:
+                        continue  # plain VALUES insert, nothing to plan
+                    seen.add(text)
+                    details, bad = check_plan(conn, text, scenario.allow)
+                    plans.extend(details)
+                    if verbose:
+                        print(f"[{scenario.name}] {text[:120]}")
+                        for d in details:
+                            print(f"    {d}")
+                    violations.extend(Violation(scenario.name, text, d) for d in bad)
+                for pattern, why in scenario.expect.items():
+                    if not any(re.search(pattern, d) for d in plans):
+                        violations.append(Violation(scenario.name, "", f"expected plan step {pattern!r} missing: {why}"))
+            conn.close()
+        finally:
+            db.DB_PATH = old_path
+    return violations
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check query plans of all repository/service SQL")
+    parser.add_argument("--analyze", action="store_true", help="run ANALYZE first (plans as seen after maintenance)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="print every statement and its plan")
+    args = parser.parse_args(argv)
+
+    violations = run(analyze=args.analyze, verbose=args.verbose)
+    for v in violations:
+        print(f"FAIL [{v.scenario}] {v.detail}")
+        if v.sql:
+            print(f"     {v.sql[:200]}")
+    if violations:
+        print(f"{len(violations)} query plan regression(s).")
+        return 1
+    print("OK: no full scans or temp B-tree sorts outside the allow-list.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
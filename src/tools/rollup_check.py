@@ -0,0 +1,137 @@
+"""Correctness and cost check for the daily_rollups summaries.
+
+    python -m src.tools.rollup_check --ranges 300 --edits 2000
+
+Seeds a throwaway database, then mixes in the writes the triggers have to
+follow: status edits (AdminService.edit_record), record deletes, session
+deletes and sessions moved to another day. Afterwards every random
+(class, date_from, date_to) summary from ReportService.iter_summary_rows is
+compared with the same summary grouped from the raw records, and
+MaintenanceService.verify_rollups must find no difference. Median timings of
+both ways are printed; exit 1 on any mismatch.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from src.repositories import db
+
+# The per-record grouping iter_summary_rows used before daily_rollups: the oracle.
+_RAW_SUMMARY = """
+    SELECT
+        e.student_id,
+        COALESCE(SUM(ar.status = ?), 0) AS present,
+        COALESCE(SUM(ar.status = ?), 0) AS late,
+        COALESCE(SUM(ar.status = ?), 0) AS excused,
+        COUNT(s.session_id) AS total
+    FROM enrollments e
+    LEFT JOIN attendance_sessions s
+        ON s.class_id = e.class_id AND s.session_date >= ? AND s.session_date <= ?
+    LEFT JOIN attendance_records ar
+        ON ar.session_id = s.session_id AND ar.student_id = e.student_id
+    WHERE e.class_id = ?
+    GROUP BY e.student_id
+    ORDER BY e.student_id
+"""
+
+
+def _raw_summary(conn, class_id: int, date_from: str, date_to: str) -> list[tuple]:
+    from src.models.enums import AttendanceStatus
+
+    rows = conn.execute(_RAW_SUMMARY, (
+        AttendanceStatus.PRESENT.code, AttendanceStatus.LATE.code, AttendanceStatus.EXCUSED.code,
+        date_from, date_to, class_id,
+    )).fetchall()
+    return [(sid, p, l, total - p - l - x, x, total) for sid, p, l, x, total in rows]
+
+
+def _mutate(conn, edits: int, rng: random.Random) -> None:
+    from src.models.enums import AttendanceStatus
+    from src.services.admin_service import AdminService
+
+    records = conn.execute("SELECT session_id, student_id FROM attendance_records").fetchall()
+    admin = AdminService()
+    statuses = [s.value for s in AttendanceStatus]
+    for session_id, student_id in rng.sample(records, min(edits, len(records))):
+        admin.edit_record(session_id, student_id, rng.choice(statuses), actor_id=None)
+
+    for session_id, student_id in rng.sample(records, min(edits // 10, len(records))):
+        conn.execute("DELETE FROM attendance_records WHERE session_id = ? AND student_id = ?", (session_id, student_id))
+    sessions = [r[0] for r in conn.execute("SELECT session_id FROM attendance_sessions")]
+    for session_id in rng.sample(sessions, min(10, len(sessions))):
+        conn.execute("DELETE FROM attendance_sessions WHERE session_id = ?", (session_id,))
+    sessions = [r[0] for r in conn.execute("SELECT session_id FROM attendance_sessions")]
+    for session_id in rng.sample(sessions, min(10, len(sessions))):
+        # a time no generated session uses, so the UNIQUE key cannot clash
+        conn.execute(
+            "UPDATE attendance_sessions SET session_date = date(session_date, ?), start_time = '23:59' WHERE session_id = ?",
+            (f"{rng.randint(-20, 20)} days", session_id),
+        )
+    conn.commit()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from src.services.maintenance_service import MaintenanceService
+    from src.services.report_service import ReportService
+    from src.tools.demo_data import DemoSize, populate
+
+    parser = argparse.ArgumentParser(description="Check daily_rollups summaries against the raw records")
+    parser.add_argument("--ranges", type=int, default=300, help="random (class, date range) summaries to compare")
+    parser.add_argument("--edits", type=int, default=2000, help="status edits before comparing")
+    parser.add_argument("--sessions", type=int, default=60, help="sessions per class")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    old_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "sas.db"
+        try:
+            db.init_db()
+            conn = db.get_conn()
+            populate(conn, DemoSize(classes=10, students=1000, students_per_class=100, sessions_per_class=args.sessions))
+            _mutate(conn, args.edits, rng)
+            classes = [r[0] for r in conn.execute("SELECT class_id FROM classes")]
+            days = [r[0] for r in conn.execute("SELECT DISTINCT session_date FROM attendance_sessions ORDER BY 1")]
+
+            reports = ReportService(conn)   # same connection as the raw query: compare SQL, not connects
+            mismatches = 0
+            rollup_ms, raw_ms = [], []
+            for _ in range(args.ranges):
+                class_id = rng.choice(classes)
+                date_from, date_to = sorted(rng.sample(days, 2))
+                t0 = time.perf_counter()
+                got = list(reports.iter_summary_rows(class_id, date_from, date_to))
+                t1 = time.perf_counter()
+                want = _raw_summary(conn, class_id, date_from, date_to)
+                t2 = time.perf_counter()
+                rollup_ms.append((t1 - t0) * 1000)
+                raw_ms.append((t2 - t1) * 1000)
+                if got != want:
+                    mismatches += 1
+                    if mismatches <= 5:
+                        print(f"MISMATCH class {class_id} {date_from}..{date_to}")
+            conn.close()
+
+            check = MaintenanceService().verify_rollups()
+        finally:
+            db.DB_PATH = old_path
+
+    print(f"Ranges compared: {args.ranges}, mismatches: {mismatches}")
+    print(f"Summary median:  rollups {statistics.median(rollup_ms):.2f} ms, raw records {statistics.median(raw_ms):.2f} ms")
+    print(f"verify_rollups:  {check.rows} rows, {check.missing} missing/different, {check.extra} extra")
+    if mismatches or not check.ok:
+        print("FAIL")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from src.services.admin_service import AdminService
 from src.ui.prompts import prompt_choice, prompt_text
 
@@ -7,8 +9,9 @@ from src.ui.prompts import prompt_choice, prompt_text
 class AdminHandlers:
     """UC05 Search Attendance; UC10 Manage Attendance handlers."""
 
-    def __init__(self) -> None:
+    def __init__(self, actor_id: Optional[int] = None) -> None:
         self._admin_service = AdminService()
+        self.actor_id = actor_id  # logged-in admin, recorded in the audit log
 
     def admin_menu(self) -> None:
         """Main admin menu - Navigate between Search and Manage."""
@@ -18,7 +21,8 @@ class AdminHandlers:
             print("=" * 60)
             print("\n1. Search Attendance (UC05)")
             print("2. Manage Attendance (UC10)")
-            print("3. Done")
+            print("3. Audit Log")
+            print("4. Done")
 
             choice = prompt_choice("\nSelection: ")
 
@@ -27,6 +31,8 @@ class AdminHandlers:
             elif choice == "2":
                 self.manage_attendance_menu()
             elif choice == "3":
+                self.audit_log_menu()
+            elif choice == "4":
                 print("\n Goodbye!")
                 break
             else:
@@ -84,6 +90,49 @@ class AdminHandlers:
         except Exception as e:
             print(f"\n Error: {e}")
 
+    def audit_log_menu(self) -> None:
+        """Who changed which attendance record, newest first, one page at a time."""
+        from src.services.audit_service import AuditService
+
+        print("\n" + "=" * 60)
+        print("AUDIT LOG")
+        print("=" * 60)
+        print("\nFilters (bỏ trống để bỏ qua):")
+        try:
+            student_id_input = prompt_text("Student ID (optional): ")
+            session_id_input = prompt_text("Session ID (optional): ")
+            actor_id_input = prompt_text("Changed by user ID (optional): ")
+            filters = {
+                "student_id": int(student_id_input) if student_id_input else None,
+                "session_id": int(session_id_input) if session_id_input else None,
+                "actor_id": int(actor_id_input) if actor_id_input else None,
+            }
+
+            service = AuditService()
+            cursor = None
+            while True:
+                page = service.history(**filters, cursor=cursor, limit=20)
+                if not page.rows and cursor is None:
+                    print("\n  No audit entries found.")
+                    return
+                print(f"\n{'When':<20} {'By':<6} {'Action':<17} {'Session':<8} {'Student':<8} {'Before':<9} {'After':<9}")
+                print("-" * 81)
+                for r in page.rows:
+                    actor = r["actor_id"] if r["actor_id"] is not None else "-"
+                    print(
+                        f"{r['at']:<20} {actor:<6} {r['action']:<17} {r['session_id']:<8} {r['student_id']:<8} "
+                        f"{r['before_status'] or '-':<9} {r['after_status'] or '-':<9}"
+                    )
+                if page.next_cursor is None:
+                    return
+                if prompt_choice("\nEnter = older entries, 0 = back: ") == "0":
+                    return
+                cursor = page.next_cursor
+        except ValueError as e:
+            print(f"\n Invalid input: {e}")
+        except Exception as e:
+            print(f"\n Error: {e}")
+
     def manage_attendance_menu(self) -> None:
         """UC10: Manage Attendance - Thêm/sửa/xoá bản ghi."""
         print("\n" + "=" * 60)
@@ -118,6 +167,7 @@ class AdminHandlers:
                 student_id=student_id,
                 status=status,
                 note=note if note else None,
+                actor_id=self.actor_id,
             )
             print(f"\n Record added successfully (ID: {record_id})")
         except ValueError as e:
@@ -139,6 +189,7 @@ class AdminHandlers:
                 student_id=student_id,
                 status=status,
                 note=note if note else None,
+                actor_id=self.actor_id,
             )
             print("\n Record updated successfully")
         except ValueError as e:
@@ -158,6 +209,7 @@ class AdminHandlers:
                 self._admin_service.delete_record(
                     session_id=session_id,
                     student_id=student_id,
+                    actor_id=self.actor_id,
                 )
                 print(" Record deleted successfully")
             else:
@@ -1,14 +1,35 @@
 from __future__ import annotations
 
-from src.models.enums import AttendanceStatus, RequestType
-from src.services.session_service import SessionService, CreateSessionInput
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from src.models.enums import AttendanceStatus, JobStatus, RequestType
+from src.services.session_service import SessionService, CreateSessionInput, RecurringScheduleInput, parse_weekdays
 from src.services.attendance_service import AttendanceService
+from src.services.live_roster import LiveRoster
+from src.services.report_job_service import ReportJobService, ReportJobWorker
 from src.services.request_service import RequestService
 from src.services.report_service import ReportService
 from src.services.warning_service import WarningService
 from src.repositories.class_repo import ClassRepo
 from src.ui.menus import show_lecturer_menu
 from src.ui.prompts import prompt_choice, prompt_text, prompt_yes_no
+from src.utils.validators import validate_date
+
+
+LIVE_REFRESH_S = 3.0
+
+# One background export worker per console process, started with the first lecturer dashboard.
+_job_worker: Optional[ReportJobWorker] = None
+
+
+def _ensure_job_worker() -> ReportJobWorker:
+    global _job_worker
+    if _job_worker is None or not _job_worker.is_alive():
+        _job_worker = ReportJobWorker()
+        _job_worker.start()
+    return _job_worker
 
 
 def _prompt_int(label: str) -> int:
@@ -42,13 +63,18 @@ def run_lecturer_dashboard(user) -> None:
     report_service = ReportService()
     warning_service = WarningService()
     class_repo = ClassRepo()
+    job_service = ReportJobService()
+    _ensure_job_worker()
 
     while True:
         pending_count = request_service.count_pending_for_lecturer(user.user_id)
+        jobs = job_service.active_counts(user.user_id)
 
         print("\n[LECTURER DASHBOARD]")
         print(f"User: {user.full_name} (ID: {user.user_id})")
         print(f"Pending Requests: {pending_count}")
+        if any(jobs.values()):
+            print(f"Report jobs: {jobs['RUNNING']} running, {jobs['QUEUED']} queued")
         print("-" * 50)
         show_lecturer_menu()
         print("-" * 50)
@@ -60,13 +86,19 @@ def run_lecturer_dashboard(user) -> None:
         if c == "1":
             _ui_create_session(session_service, class_repo, user.user_id)
         elif c == "2":
-            _ui_record_attendance(attendance_service, session_service, warning_service)
+            _ui_record_attendance(attendance_service, session_service, warning_service, user.user_id)
         elif c == "3":
             _ui_process_requests(request_service, user.user_id)
         elif c == "4":
             _ui_summarize(report_service, class_repo, user.user_id)
         elif c == "5":
-            _ui_export(report_service, class_repo, user.user_id)
+            _ui_export(report_service, class_repo, user.user_id, job_service)
+        elif c == "6":
+            _ui_analytics(report_service, class_repo, user.user_id)
+        elif c == "7":
+            _ui_create_schedule(session_service, class_repo, user.user_id)
+        elif c == "8":
+            _ui_report_jobs(job_service, user.user_id)
         else:
             print("Invalid selection. Please try again.")
 
@@ -108,7 +140,73 @@ def _ui_create_session(session_service: SessionService, class_repo: ClassRepo, l
         print(f"Error: {e}")
 
 
-def _ui_record_attendance(attendance_service: AttendanceService, session_service: SessionService, warning_service: WarningService) -> None:
+def _ui_create_schedule(session_service: SessionService, class_repo: ClassRepo, lecturer_id: int) -> None:
+    print("\n[CREATE RECURRING SCHEDULE]")
+    classes = class_repo.list_by_filter(lecturer_id=lecturer_id)
+    if not classes:
+        print("You have no classes.")
+        return
+
+    print("Your classes:")
+    for c in classes:
+        print(f"- ClassID={c.class_id} | {c.class_code} | {c.class_name}")
+
+    try:
+        ids = prompt_text("Enter Class IDs (comma-separated, blank = all): ")
+        class_ids = [int(x) for x in ids.replace(",", " ").split()] if ids else [c.class_id for c in classes]
+        weekdays = parse_weekdays(prompt_text("Weekdays (e.g. Mon,Wed): "))
+        start_time = prompt_text("Enter Start Time (HH:MM): ")
+        duration = _prompt_int("Enter Duration (minutes): ")
+        date_from = prompt_text("First day of term (YYYY-MM-DD): ")
+        weeks = _prompt_int("Number of weeks: ")
+        if weeks <= 0:
+            raise ValueError("Number of weeks must be positive.")
+        date_to = (date.fromisoformat(validate_date(date_from)) + timedelta(weeks=weeks, days=-1)).isoformat()
+        holidays = set(prompt_text("Holidays (YYYY-MM-DD, comma-separated, blank = none): ").replace(",", " ").split())
+        exceptions: dict[str, Optional[str]] = {}
+        raw = prompt_text("Exceptions (YYYY-MM-DD=HH:MM to move, YYYY-MM-DD=- to cancel; blank = none): ")
+        for item in raw.replace(",", " ").split():
+            d, _, t = item.partition("=")
+            exceptions[d] = None if t in ("", "-") else t
+        pin_enabled = prompt_yes_no("Enable PIN (a random PIN per session)? (Y/N): ")
+
+        data = RecurringScheduleInput(
+            class_ids=class_ids, weekdays=weekdays, start_time=start_time, duration_min=duration,
+            date_from=date_from, date_to=date_to, pin_enabled=pin_enabled,
+            holidays=holidays, exceptions=exceptions, lecturer_id=lecturer_id,
+        )
+        plan = session_service.plan_recurring(data)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+
+    print(f"\n{date_from} .. {date_to}: {len(plan.sessions)} session(s) to create, "
+          f"{len(plan.skipped_dates)} date(s) skipped, {len(plan.clashes)} clash(es).")
+    for p in plan.clashes[:10]:
+        print(f"  ! already exists: ClassID={p.class_id} {p.session_date} {p.start_time}")
+    if len(plan.clashes) > 10:
+        print(f"  ... and {len(plan.clashes) - 10} more")
+    if not plan.sessions:
+        print("Nothing to create.")
+        return
+    skip_clashes = False
+    if plan.clashes:
+        if not prompt_yes_no("Skip the clashing slots and create the rest? (Y/N): "):
+            return
+        skip_clashes = True
+    elif not prompt_yes_no(f"Create {len(plan.sessions)} session(s)? (Y/N): "):
+        return
+
+    try:
+        done = session_service.create_recurring(data, skip_clashes=skip_clashes)
+        print(f"Created {len(done.sessions)} session(s), status SCHEDULED (each opens automatically at its start time).")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def _ui_record_attendance(
+    attendance_service: AttendanceService, session_service: SessionService, warning_service: WarningService, lecturer_id: int
+) -> None:
     print("\n[RECORD ATTENDANCE]")
     session_id = _prompt_int("Enter Session ID: ")
 
@@ -118,12 +216,15 @@ def _ui_record_attendance(attendance_service: AttendanceService, session_service
             print("Session not found.")
             return
 
+        roster = LiveRoster(session_id)   # full read on first view, deltas afterwards
         while True:
             print("\nActions:")
             print("1. View roster/status")
             print("2. Update one student status")
             print("3. Mark ALL Present")
             print("4. Close session")
+            print("5. Live check-in monitor")
+            print("6. Open session now (scheduled sessions)")
             print("0. Back")
             sel = prompt_choice("Selection: ")
 
@@ -131,11 +232,17 @@ def _ui_record_attendance(attendance_service: AttendanceService, session_service
                 return
 
             if sel == "1":
-                roster = attendance_service.get_roster_for_session(session_id)
+                roster.poll()
                 print("StudentID | StudentName | Status")
                 print("-" * 60)
-                for r in roster:
-                    print(f"{r['student_id']} | {r['student_name']} | {r['status']}")
+                for r in roster.entries:
+                    print(f"{r.student_id} | {r.student_name} | {r.status}")
+                print("-" * 60)
+                print(_roster_counts(roster))
+                continue
+
+            if sel == "5":
+                _ui_live_roster(roster)
                 continue
 
             if sel == "2":
@@ -145,7 +252,7 @@ def _ui_record_attendance(attendance_service: AttendanceService, session_service
                 if not prompt_yes_no("Confirm (Y/N): "):
                     print("Cancelled.")
                     continue
-                attendance_service.update_status(session_id, student_id, status, note=note)
+                attendance_service.update_status(session_id, student_id, status, note=note, actor_id=lecturer_id)
                 print("Updated.")
                 continue
 
@@ -153,7 +260,7 @@ def _ui_record_attendance(attendance_service: AttendanceService, session_service
                 if not prompt_yes_no("Mark all present? (Y/N): "):
                     print("Cancelled.")
                     continue
-                attendance_service.mark_all_present(session_id)
+                attendance_service.mark_all_present(session_id, actor_id=lecturer_id)
                 print("Done.")
                 continue
 
@@ -167,11 +274,46 @@ def _ui_record_attendance(attendance_service: AttendanceService, session_service
                 print("Session closed.")
                 continue
 
+            if sel == "6":
+                session_service.open_session(session_id)
+                roster.poll()
+                print("Session is open.")
+                continue
+
             print("Invalid selection.")
     except Exception as e:
         print(f"Error: {e}")
 
 
+def _roster_counts(roster: LiveRoster) -> str:
+    counts = roster.counts()
+    arrived = counts[AttendanceStatus.PRESENT.value] + counts[AttendanceStatus.LATE.value]
+    return f"Arrived {arrived}/{len(roster.entries)} | " + " ".join(f"{k}={v}" for k, v in counts.items())
+
+
+def _ui_live_roster(roster: LiveRoster, interval_s: float = LIVE_REFRESH_S) -> None:
+    """Print new arrivals every few seconds until Ctrl+C or the session closes."""
+    roster.poll()
+    print(f"\n[LIVE] {_roster_counts(roster)}")
+    print(f"Refreshing every {interval_s:g}s. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(interval_s)
+            delta = roster.poll()
+            if delta.reloaded:
+                print("(roster reloaded)")
+            for e in delta.arrivals:
+                print(f"  + {e.checkin_time or '':<19} {e.student_id} | {e.student_name} | {e.status}")
+            if delta.changed:
+                print(f"[LIVE] {_roster_counts(roster)} | +{len(delta.arrivals)} now, "
+                      f"{roster.arrivals_since_load} since opened ({roster.arrival_rate_per_min():.1f}/min)")
+            if delta.session_closed:
+                print("Session is closed.")
+                return
+    except KeyboardInterrupt:
+        print("\nLive monitor stopped.")
+
+
 def _ui_process_requests(request_service: RequestService, lecturer_id: int) -> None:
     print("\n[PROCESS REQUESTS]")
     pending = request_service.list_pending_for_lecturer(lecturer_id)
@@ -228,8 +370,40 @@ def _ui_summarize(report_service: ReportService, class_repo: ClassRepo, lecturer
         print(f"Error: {e}")
 
 
-def _ui_export(report_service: ReportService, class_repo: ClassRepo, lecturer_id: int) -> None:
-    print("\n[EXPORT EXCEL REPORT]")
+def _ui_analytics(report_service: ReportService, class_repo: ClassRepo, lecturer_id: int) -> None:
+    print("\n[CLASS ANALYTICS]")
+    classes = class_repo.list_by_filter(lecturer_id=lecturer_id)
+    if not classes:
+        print("You have no classes.")
+        return
+    for c in classes:
+        print(f"- ClassID={c.class_id} | {c.class_code} | {c.class_name}")
+    class_id = _prompt_int("Enter Class ID: ")
+    date_from = prompt_text("From date (YYYY-MM-DD) or blank: ") or None
+    date_to = prompt_text("To date (YYYY-MM-DD) or blank: ") or None
+
+    try:
+        a = report_service.class_analytics(class_id, date_from=date_from, date_to=date_to)
+        print(f"Students: {a['students']} | Sessions: {a['sessions']}")
+        print(f"Mean attendance rate: {a['mean_attendance_rate']:.1%} | Mean late ratio: {a['mean_late_ratio']:.1%} "
+              f"| Longest absence streak: {a['max_absence_streak']}")
+        if a["session_turnout"]:
+            low = min(a["session_turnout"], key=lambda t: t["turnout"])
+            print(f"Lowest turnout: Session {low['session_id']} ({low['session_date']}) {low['turnout']:.1%}")
+        if not a["at_risk"]:
+            print("No at-risk students.")
+            return
+        print("At-risk students:")
+        print("StudentID | Rate   | Absences | Longest streak")
+        print("-" * 50)
+        for r in a["at_risk"]:
+            print(f"{r['student_id']:<9} | {r['attendance_rate']:.1%} | {r['absences']:<8} | {r['longest_absence_streak']}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def _ui_export(report_service: ReportService, class_repo: ClassRepo, lecturer_id: int, job_service: ReportJobService) -> None:
+    print("\n[EXPORT REPORT]")
     classes = class_repo.list_by_filter(lecturer_id=lecturer_id)
     if not classes:
         print("You have no classes.")
@@ -237,13 +411,132 @@ def _ui_export(report_service: ReportService, class_repo: ClassRepo, lecturer_id
     for c in classes:
         print(f"- ClassID={c.class_id} | {c.class_code} | {c.class_name}")
 
+    print("1. Export one class")
+    print("2. Export ALL my classes (parallel)")
+    print("3. Run in background (keep working; see Background Report Jobs)")
+    mode = prompt_choice("Selection: ")
+    if mode == "2":
+        _ui_export_bulk(report_service, lecturer_id)
+        return
+    if mode == "3":
+        _ui_queue_export(job_service, class_repo, lecturer_id)
+        return
+
     class_id = _prompt_int("Enter Class ID: ")
     date_from = prompt_text("From date (YYYY-MM-DD) or blank: ") or None
     date_to = prompt_text("To date (YYYY-MM-DD) or blank: ") or None
-    output_path = prompt_text("Output folder OR full .xlsx path (default: reports): ").strip() or "reports"
+    print("Format: 1. Excel (.xlsx)  2. CSV  3. JSON Lines")
+    fmt = {"1": "xlsx", "2": "csv", "3": "jsonl"}.get(prompt_choice("Selection: "), "xlsx")
+
+    try:
+        if fmt == "xlsx":
+            output_path = prompt_text("Output folder OR full .xlsx path (default: reports): ").strip() or "reports"
+            file_path = report_service.export_excel(class_id, output_path, date_from=date_from, date_to=date_to)
+            print(f"Exported: {file_path}")
+            return
+
+        output_path = prompt_text("Output folder (default: reports): ").strip() or "reports"
+        compress = prompt_yes_no("Compress with gzip? (Y/N): ")
+        for dataset in ("summary", "detail"):
+            file_path = report_service.export_flat(
+                class_id,
+                output_path,
+                fmt=fmt,
+                dataset=dataset,
+                compress=compress,
+                date_from=date_from,
+                date_to=date_to,
+            )
+            print(f"Exported: {file_path}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def _ui_queue_export(job_service: ReportJobService, class_repo: ClassRepo, lecturer_id: int) -> None:
+    print("Export: 1. One class  2. ALL my classes (Excel)")
+    all_classes = prompt_choice("Selection: ") == "2"
+    class_id = None if all_classes else _prompt_int("Enter Class ID: ")
+    date_from = prompt_text("From date (YYYY-MM-DD) or blank: ") or None
+    date_to = prompt_text("To date (YYYY-MM-DD) or blank: ") or None
+    fmt, compress = "xlsx_bulk", False
+    if not all_classes:
+        print("Format: 1. Excel (.xlsx)  2. CSV  3. JSON Lines")
+        fmt = {"1": "xlsx", "2": "csv", "3": "jsonl"}.get(prompt_choice("Selection: "), "xlsx")
+        compress = fmt != "xlsx" and prompt_yes_no("Compress with gzip? (Y/N): ")
+    output_dir = prompt_text("Output folder (default: reports): ").strip() or "reports"
+
+    try:
+        if class_id is not None and not class_repo.get_by_id(class_id):
+            raise ValueError(f"Class {class_id} not found")
+        job_id = job_service.enqueue(
+            lecturer_id, fmt=fmt, class_id=class_id, lecturer_id=lecturer_id if all_classes else None,
+            date_from=date_from, date_to=date_to, output_dir=output_dir, compress=compress,
+        )
+        _ensure_job_worker().wake()
+        print(f"Queued as JobID={job_id}. You can keep working; check menu 8 for progress.")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def _ui_report_jobs(job_service: ReportJobService, lecturer_id: int) -> None:
+    while True:
+        print("\n[BACKGROUND REPORT JOBS]")
+        jobs = job_service.list_jobs(lecturer_id)
+        if not jobs:
+            print("No report jobs yet. Queue one from Export Attendance Report.")
+            return
+        print("JobID | Format | Status | Progress | Queued at | Result")
+        print("-" * 80)
+        for j in jobs:
+            progress = f"{j.progress_done}/{j.progress_total}" if j.progress_total else "-"
+            queued_at = datetime.fromtimestamp(j.created_at).strftime("%Y-%m-%d %H:%M")
+            if j.result_paths:
+                result = j.result_paths[-1] if len(j.result_paths) == 1 else f"{len(j.result_paths)} files in {j.params['output_dir']}"
+            else:
+                result = j.error or ""
+            attempt = f" (attempt {j.attempts}/{j.max_attempts})" if j.attempts > 1 else ""
+            print(f"{j.job_id} | {j.params['fmt']} | {j.status}{attempt} | {progress} | {queued_at} | {result}")
+
+        print("\n1. Refresh  2. Show files of a job  3. Cancel a job  0. Back")
+        sel = prompt_choice("Selection: ")
+        if sel == "0":
+            return
+        if sel == "2":
+            job = job_service.get(_prompt_int("Enter Job ID: "))
+            if not job or job.owner_id != lecturer_id:
+                print("Job not found.")
+                continue
+            for path in job.result_paths or ["(no files yet)"]:
+                print(f"  {path}")
+            if job.error:
+                print(f"  Last error: {job.error}")
+        elif sel == "3":
+            try:
+                status = job_service.cancel(_prompt_int("Enter Job ID: "), owner_id=lecturer_id)
+                print("Cancelled." if status == JobStatus.CANCELLED.value else "Cancellation requested; the job stops at its next step.")
+            except Exception as e:
+                print(f"Error: {e}")
+
+
+def _ui_export_bulk(report_service: ReportService, lecturer_id: int) -> None:
+    date_from = prompt_text("From date (YYYY-MM-DD) or blank: ") or None
+    date_to = prompt_text("To date (YYYY-MM-DD) or blank: ") or None
+    output_dir = prompt_text("Output folder (default: reports): ").strip() or "reports"
+
+    def _progress(done: int, total: int, item) -> None:
+        outcome = item.file_path if not item.error else f"FAILED: {item.error}"
+        print(f"[{done}/{total}] {item.class_code} -> {outcome}")
 
     try:
-        file_path = report_service.export_excel(class_id, output_path, date_from=date_from, date_to=date_to)
-        print(f"Exported: {file_path}")
+        result = report_service.export_excel_bulk(
+            output_dir,
+            lecturer_id=lecturer_id,
+            date_from=date_from,
+            date_to=date_to,
+            progress=_progress,
+        )
+        print(f"Exported {len(result.items) - len(result.failed)}/{len(result.items)} classes "
+              f"in {result.wall_ms / 1000:.2f}s using {result.workers} worker(s).")
+        print(f"Manifest: {result.manifest_path}")
     except Exception as e:
         print(f"Error: {e}")
@@ -25,7 +25,10 @@ def show_lecturer_menu() -> None:
     print("2. Record Attendance")
     print("3. Approve/Reject Absence/Late Requests")
     print("4. Summarize Attendance")
-    print("5. Export Attendance Report (Excel)")
+    print("5. Export Attendance Report (Excel/CSV/JSONL)")
+    print("6. Class Analytics")
+    print("7. Create Recurring Schedule (whole term)")
+    print("8. Background Report Jobs")
     print("0. Logout")
 
 
@@ -70,26 +70,32 @@ def _ui_view_attendance(attendance_service: AttendanceService, student_id: int)
     date_to = prompt_text("To (YYYY-MM-DD) (optional): ") or None
 
     try:
-        rows = attendance_service.list_student_attendance(
-            student_id,
-            class_id=class_id,
-            date_from=date_from,
-            date_to=date_to,
-        )
-        if not rows:
+        filters = {"class_id": class_id, "date_from": date_from, "date_to": date_to}
+        totals = attendance_service.student_attendance_totals(student_id, **filters)
+        if not totals.total:
             print("No attendance records.")
             return
 
-        print("SessionID | Date       | Time  | Status   | Note")
-        print("-" * 70)
-        summary = {"Present": 0, "Late": 0, "Absent": 0, "Excused": 0}
-        for r in rows:
-            st = r["status"]
-            summary[st] = summary.get(st, 0) + 1
-            note = r.get("note") or "-"
-            print(f"{r['session_id']:<8} | {r['session_date']} | {r['start_time']:<5} | {st:<8} | {note}")
-        print("-" * 70)
-        print(f"Summary: Present={summary.get('Present',0)}, Late={summary.get('Late',0)}, Absent={summary.get('Absent',0)}")
+        print(f"Summary: Present={totals.by_status['Present']}, Late={totals.by_status['Late']}, "
+              f"Absent={totals.by_status['Absent']}, Excused={totals.by_status['Excused']} (total {totals.total})")
+        if len(totals.by_class) > 1:
+            for cid, counts in sorted(totals.by_class.items()):
+                print(f"  Class {cid}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+        cursor = None
+        while True:
+            page = attendance_service.student_history_page(student_id, **filters, cursor=cursor)
+            print("SessionID | Date       | Time  | Status   | Note")
+            print("-" * 70)
+            for r in page.rows:
+                note = r.get("note") or "-"
+                print(f"{r['session_id']:<8} | {r['session_date']} | {r['start_time']:<5} | {r['status']:<8} | {note}")
+            print("-" * 70)
+            if page.next_cursor is None:
+                return
+            if prompt_choice("Enter = older sessions, 0 = back: ") == "0":
+                return
+            cursor = page.next_cursor
     except Exception as e:
         print(f"Error: {e}")
 
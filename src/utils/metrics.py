@@ -0,0 +1,236 @@
+"""In-process metrics (counters, gauges, histograms) rendered in Prometheus text format.
+
+Counters and histograms are sharded per thread: the hot path only touches
+the calling thread's own dict (no lock), and shards are summed when the
+registry is rendered. Gauges are either set directly (under a lock; they are
+rarely written) or computed by a callback at render time. Exposition lives in
+src/services/metrics_service.py.
+
+    CHECKINS = default_registry().counter("sas_checkins_total", "Check-ins", ("result",))
+    CHECKINS.inc(labels=("ok",))
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Optional, Union
+
+LabelValues = tuple[str, ...]
+Samples = Union[float, dict[LabelValues, float]]
+
+# Prometheus client defaults (seconds), plus a few longer ones for exports.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class _Sharded(_Metric):
+    """Per-thread dict of label values -> state; merged at render time."""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshot(self) -> list[dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [dict(s) for s in shards]   # dict() copies atomically under the GIL
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, labels: LabelValues = ()) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def value(self, labels: LabelValues = ()) -> float:
+        return sum(s.get(labels, 0.0) for s in self._snapshot())
+
+    def _samples(self) -> list[str]:
+        totals: dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            for key, v in shard.items():
+                totals[key] = totals.get(key, 0.0) + v
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in sorted(totals.items())]
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]   # per-bucket counts (+Inf last), sum
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _samples(self) -> list[str]:
+        merged: dict[LabelValues, list[float]] = {}
+        for shard in self._snapshot():
+            for key, state in shard.items():
+                acc = merged.setdefault(key, [0] * len(state))
+                for i, v in enumerate(list(state)):
+                    acc[i] += v
+        lines = []
+        for key, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), state[:-1]):
+                cumulative += n
+                le = 'le="' + _num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {_num(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(state[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {_num(cumulative)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, labels: LabelValues = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: LabelValues = ()) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: LabelValues = ()) -> None:
+        self.inc(-amount, labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter whose value is read at render time, e.g. from an existing stats() method.
+
+    `fn` returns a number, or {label values: number} for labelled metrics.
+    """
+
+    def __init__(
+        self, name: str, help_text: str, fn: Callable[[], Samples], *, kind: str = "gauge", labelnames: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def _samples(self) -> list[str]:
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in sorted(values.items())]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric '{metric.name}' is already registered with a different type/labels")
+                if isinstance(metric, CallbackMetric):
+                    self._metrics[metric.name] = metric   # re-registering a callback replaces it
+                    return metric
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))  # type: ignore[return-value]
+
+    def register_callback(
+        self, name: str, help_text: str, fn: Callable[[], Samples], *, kind: str = "gauge", labelnames: tuple[str, ...] = ()
+    ) -> CallbackMetric:
+        return self._add(CallbackMetric(name, help_text, fn, kind=kind, labelnames=labelnames))  # type: ignore[return-value]
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every metric in Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: list[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # one failing callback (e.g. DB locked) must not take down the whole scrape
+                lines.append(f"# {metric.name} unavailable: {type(e).__name__}: {_escape(str(e))}")
+        return "\n".join(lines) + "\n"
+
+
+_default_registry = MetricsRegistry()
+
+
+def default_registry() -> MetricsRegistry:
+    return _default_registry